@@ -0,0 +1,217 @@
+"""
+Fingerprinted, precompressed static assets.
+
+`python -m app.assets` (run after `npx tsc`) copies every script in
+`app/static/js` to `app/static/dist/js/<name>.<hash>.js`, writes `.gz`
+and `.br` siblings next to it, and records the mapping in
+`app/static/dist/manifest.json`. Templates resolve asset URLs through
+`static_url()`, and `PrecompressedStaticFiles` serves the fingerprinted
+files with immutable cache headers, picking the precompressed variant the
+client accepts. Without a build, `static_url()` falls back to the plain
+files, which are served as before.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+import shutil
+import sys
+from typing import Any, Dict, Final, List, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+try:
+    import brotli
+except ImportError:  # Optional: only .gz variants are produced without it
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+STATIC_DIRECTORY: Final[str] = "app/static"
+"""Directory mounted at /static, relative to the project root."""
+
+SOURCE_SUBDIRECTORIES: Final[Tuple[str, ...]] = ("js",)
+"""Subdirectories of STATIC_DIRECTORY whose files are fingerprinted."""
+
+DIST_SUBDIRECTORY: Final[str] = "dist"
+"""Subdirectory of STATIC_DIRECTORY receiving the build output."""
+
+MANIFEST_NAME: Final[str] = "manifest.json"
+"""File name of the logical-path -> fingerprinted-path manifest inside DIST_SUBDIRECTORY."""
+
+IMMUTABLE_CACHE_CONTROL: Final[str] = "public, max-age=31536000, immutable"
+"""Cache-Control for fingerprinted files: their content never changes under a given name."""
+
+FINGERPRINT_PATTERN: Final[re.Pattern] = re.compile(r"\.[0-9a-f]{12}\.[^./]+$")
+"""Matches the `.<hash>.<ext>` suffix of a fingerprinted file name."""
+
+ENCODINGS: Final[Tuple[Tuple[str, str], ...]] = (("br", ".br"), ("gzip", ".gz"))
+"""Supported content encodings and their file suffixes, in order of preference."""
+
+# --- Build ---
+
+def _fingerprinted_name(relative_path: str, content: bytes) -> str:
+    stem, ext = os.path.splitext(relative_path)
+    return f"{stem}.{hashlib.sha256(content).hexdigest()[:12]}{ext}"
+
+
+def build(static_directory: str = STATIC_DIRECTORY) -> Dict[str, str]:
+    """Writes fingerprinted and precompressed copies of the static sources.
+
+    The dist directory is recreated from scratch, so stale builds never
+    linger. Gzip output is reproducible (no timestamp in the header).
+
+    Args:
+        static_directory: The **static root** (the directory mounted at /static).
+
+    Returns:
+        Dict[str, str]: The manifest, mapping logical paths such as
+        `js/main.js` to fingerprinted paths relative to the static root.
+    """
+    dist_directory = os.path.join(static_directory, DIST_SUBDIRECTORY)
+    shutil.rmtree(dist_directory, ignore_errors=True)
+
+    manifest: Dict[str, str] = {}
+    for subdirectory in SOURCE_SUBDIRECTORIES:
+        source_directory = os.path.join(static_directory, subdirectory)
+        if not os.path.isdir(source_directory):
+            continue
+        for name in sorted(os.listdir(source_directory)):
+            source_path = os.path.join(source_directory, name)
+            if not os.path.isfile(source_path):
+                continue
+            with open(source_path, "rb") as fh:
+                content = fh.read()
+
+            logical_path = f"{subdirectory}/{name}"
+            built_path = f"{DIST_SUBDIRECTORY}/{_fingerprinted_name(logical_path, content)}"
+            target = os.path.join(static_directory, built_path)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+
+            with open(target, "wb") as fh:
+                fh.write(content)
+            with open(target + ".gz", "wb") as fh:
+                fh.write(gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                with open(target + ".br", "wb") as fh:
+                    fh.write(brotli.compress(content, quality=11))
+
+            manifest[logical_path] = built_path
+
+    os.makedirs(dist_directory, exist_ok=True)
+    with open(os.path.join(dist_directory, MANIFEST_NAME), "w", encoding="utf-8") as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    return manifest
+
+# --- URL Resolution ---
+
+_manifest: Optional[Dict[str, str]] = None
+
+
+def load_manifest(static_directory: str = STATIC_DIRECTORY) -> Dict[str, str]:
+    """Reads the build manifest, returning an empty mapping if there is no build."""
+    path = os.path.join(static_directory, DIST_SUBDIRECTORY, MANIFEST_NAME)
+    try:
+        with open(path, "r", encoding="utf-8") as fh:
+            return json.load(fh)
+    except FileNotFoundError:
+        logger.info("No asset manifest at %s; serving unfingerprinted static files.", path)
+        return {}
+
+
+def static_url(logical_path: str) -> str:
+    """Returns the public URL of a static asset (the fingerprinted one if built).
+
+    Registered as a Jinja global, e.g. `{{ static_url('js/main.js') }}`.
+    The manifest is read once per process.
+    """
+    global _manifest
+    if _manifest is None:
+        _manifest = load_manifest()
+    return f"/static/{_manifest.get(logical_path, logical_path)}"
+
+# --- Serving ---
+
+def _accepted_encodings(scope: Dict[str, Any]) -> List[str]:
+    """Parses Accept-Encoding into the codings not explicitly refused (q=0)."""
+    accepted = []
+    for part in Headers(scope=scope).get("accept-encoding", "").split(","):
+        coding, _, params = part.strip().partition(";")
+        q = params.strip()
+        if q.startswith("q="):
+            try:
+                if float(q[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.append(coding.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles serving fingerprinted files with long-lived cache headers.
+
+    For fingerprinted files, a `.br` or `.gz` sibling is served instead of
+    the original when the client accepts that encoding. Other files are
+    served exactly like `StaticFiles` does.
+    """
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self._variants: Dict[str, List[Tuple[str, str, os.stat_result]]] = {}
+
+    def _precompressed_variants(self, full_path: str) -> List[Tuple[str, str, os.stat_result]]:
+        """Returns (encoding, path, stat) for each existing sibling; cached, as built files never change."""
+        variants = self._variants.get(full_path)
+        if variants is None:
+            variants = []
+            for encoding, suffix in ENCODINGS:
+                try:
+                    variants.append((encoding, full_path + suffix, os.stat(full_path + suffix)))
+                except OSError:
+                    pass
+            self._variants[full_path] = variants
+        return variants
+
+    def file_response(
+        self,
+        full_path: Any,
+        stat_result: os.stat_result,
+        scope: Dict[str, Any],
+        status_code: int = 200,
+    ) -> Response:
+        full_path = os.fspath(full_path)
+        if not FINGERPRINT_PATTERN.search(full_path):
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        headers = {"Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+        media_type = mimetypes.guess_type(full_path)[0] or "application/octet-stream"
+        accepted = _accepted_encodings(scope)
+        for encoding, variant_path, variant_stat in self._precompressed_variants(full_path):
+            if encoding in accepted:
+                headers["Content-Encoding"] = encoding
+                full_path, stat_result = variant_path, variant_stat
+                break
+
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result,
+            media_type=media_type, headers=headers
+        )
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+if __name__ == "__main__":
+    built = build()
+    for logical_path, built_path in built.items():
+        print(f"{logical_path} -> {built_path}")
+    if brotli is None:
+        print("brotli is not installed; only .gz variants were written.", file=sys.stderr)
@@ -0,0 +1,174 @@
+"""
+Recent chat history per room, with sequence numbers for gap-free reconnects.
+
+Every message broadcast to a room gets the room's next sequence number
+(`"seq"`) and is kept in a bounded ring buffer of the last
+`CHAT_HISTORY_SIZE` messages. With `CHAT_HISTORY_BACKEND=redis` the
+numbers come from Redis, so they are shared by all workers. Messages are
+also mirrored into a capped Redis stream whose entry ids *are* the sequence
+numbers (`<seq>-0`). Replaying a gap is then a single range read.
+
+A reconnecting client passes the last sequence number it saw
+(`/ws/realtime/{user_id}?last_seq=41`). It first receives a
+`{"type": "history", "count": n, "complete": bool}` frame, then the `n`
+messages it missed in order. `complete` is false when older messages have
+already been dropped from the buffer, or when the history was reset
+(`last_seq` is ahead of the room), in which case everything still buffered
+is sent. A negative `last_seq` is ignored. Live messages may arrive while the replay is running, so clients
+should ignore any `seq` they have already seen.
+
+No database is involved. While Redis is unreachable, numbers and replays
+come from this worker's buffer only.
+"""
+import collections
+import json
+import logging
+import time
+from typing import Any, Deque, Dict, Final, List, Optional, Tuple
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROOM: Final[str] = "lobby"
+"""The room every realtime connection currently joins."""
+
+APPEND_SCRIPT: Final[str] = """
+local seq = redis.call('INCR', KEYS[2])
+redis.call('XADD', KEYS[1], 'MAXLEN', '~', ARGV[2], seq .. '-0', 'm', ARGV[1])
+return seq
+"""
+"""Numbers a message and appends it to the capped stream. KEYS: stream, counter; ARGV: message, size."""
+
+# --- Backends ---
+
+class RedisHistory:
+    """The Redis mirror: a capped stream per room plus its sequence counter."""
+
+    def __init__(self, url: str, size: int):
+        import redis.asyncio as redis
+        self._redis = redis.Redis.from_url(url)
+        self._size = size
+        self._append = self._redis.register_script(APPEND_SCRIPT)
+
+    async def append(self, room: str, message: Dict[str, Any]) -> int:
+        return int(await self._append(
+            keys=[f"chat:{room}:stream", f"chat:{room}:seq"],
+            args=[json.dumps(message, separators=(",", ":")), self._size],
+        ))
+
+    async def since(self, room: str, last_seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+        current = int(await self._redis.get(f"chat:{room}:seq") or 0)
+        # Also keeps a negative watermark from building an invalid stream id below
+        if not 0 <= last_seq <= current:
+            last_seq = -1
+        # Approximate trimming can leave more than `size` entries; replay the newest ones
+        entries = await self._redis.xrevrange(
+            f"chat:{room}:stream", max="+", min=f"{last_seq + 1}-0", count=self._size
+        )
+        messages = []
+        for entry_id, fields in reversed(entries):
+            message = json.loads(fields[b"m"])
+            message["seq"] = int(entry_id.split(b"-")[0])
+            messages.append(message)
+        first = messages[0]["seq"] if messages else current + 1
+        return messages, last_seq >= 0 and first <= last_seq + 1
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class ChatHistory:
+    """Numbers room messages and keeps the most recent ones for replay."""
+
+    def __init__(self, size: int):
+        """
+        Args:
+            size: The **number of messages** kept per room.
+        """
+        self._size = size
+        self._rooms: Dict[str, Deque[Dict[str, Any]]] = {}
+        # Highest sequence number seen per room
+        self._seq: Dict[str, int] = {}
+        self._redis: Optional[RedisHistory] = None
+        self._redis_down_until = 0.0
+
+    def _backend(self) -> Optional[RedisHistory]:
+        if settings.CHAT_HISTORY_BACKEND != "redis" or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = RedisHistory(settings.REDIS_URL, self._size)
+        return self._redis
+
+    def _backend_failed(self, e: Exception):
+        self._redis_down_until = time.monotonic() + 5.0
+        logger.warning("Chat history store unavailable, using this worker's buffer: %s", e)
+
+    async def append(self, room: str, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Numbers a message and records it.
+
+        Args:
+            room: The **room** the message is broadcast to.
+            message: The payload to broadcast (without `seq`).
+
+        Returns:
+            Dict[str, Any]: A copy of the message with its `seq` set, ready to broadcast.
+        """
+        seq = None
+        backend = self._backend()
+        if backend is not None:
+            try:
+                seq = await backend.append(room, message)
+            except Exception as e:
+                self._backend_failed(e)
+        if seq is None:
+            seq = self._seq.get(room, 0) + 1
+        self._seq[room] = max(seq, self._seq.get(room, 0))
+        numbered = {**message, "seq": seq}
+        buffer = self._rooms.get(room)
+        if buffer is None:
+            buffer = self._rooms[room] = collections.deque(maxlen=self._size)
+        buffer.append(numbered)
+        return numbered
+
+    async def since(self, room: str, last_seq: int) -> Tuple[List[Dict[str, Any]], bool]:
+        """Returns the messages after `last_seq`, oldest first.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], bool]: The messages, and whether they
+            cover the whole gap (False if some were already dropped or the
+            history was reset).
+        """
+        backend = self._backend()
+        if backend is not None:
+            try:
+                return await backend.since(room, last_seq)
+            except Exception as e:
+                self._backend_failed(e)
+        buffer = self._rooms.get(room, ())
+        current = self._seq.get(room, 0)
+        if not 0 <= last_seq <= current:
+            return list(buffer), False
+        messages = [message for message in buffer if message["seq"] > last_seq]
+        # Messages numbered by other workers are not in this buffer, so check for holes
+        expected = last_seq + 1
+        for message in messages:
+            if message["seq"] != expected:
+                return messages, False
+            expected += 1
+        return messages, expected == current + 1
+
+    async def close(self):
+        """Closes the Redis connection, if one was opened."""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def reset(self):
+        """Forgets the in-process history (tests)."""
+        self._rooms.clear()
+        self._seq.clear()
+
+
+history: Final[ChatHistory] = ChatHistory(settings.CHAT_HISTORY_SIZE)
+"""The process-wide chat history."""
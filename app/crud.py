@@ -1,9 +1,9 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
-from typing import List, Optional
-from . import models, schemas
-from .security import get_password_hash
+from sqlalchemy import update, delete, func
+from typing import Dict, List, Optional, Tuple
+from . import models, schemas, versions
+from .security import get_password_hash_async
 
 '''
 def get_password_hash(password: str):
@@ -15,7 +15,7 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User
     """
     Creates a new user in the database.
     """
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     
     db_user = models.User(
         email=user.email,
@@ -28,8 +28,10 @@ async def create_user(db: AsyncSession, user: schemas.UserCreate) -> models.User
         user_type=models.UserType.NORMAL 
     )
     db.add(db_user)
+    await _adjust_user_type_stats(db, db_user.user_type, 1, db_user.balance)
     await db.commit()
     await db.refresh(db_user)
+    versions.users.bump_collection()
     return db_user
 
 # --- READ ---
@@ -71,14 +73,55 @@ async def update_user(db: AsyncSession, user_id: int, user_update: schemas.UserU
         return None
 
     update_data = user_update.model_dump(exclude_unset=True)
+    old_type, old_balance = db_user.user_type, db_user.balance
 
     for key, value in update_data.items():
         setattr(db_user, key, value)
 
+    if db_user.user_type != old_type:
+        await _adjust_user_type_stats(db, old_type, -1, -old_balance)
+        await _adjust_user_type_stats(db, db_user.user_type, 1, db_user.balance)
+    elif db_user.balance != old_balance:
+        await _adjust_user_type_stats(db, old_type, 0, db_user.balance - old_balance)
+
     await db.commit()
+    versions.users.bump_collection()
     await db.refresh(db_user)
     return db_user
 
+async def add_to_balance(db: AsyncSession, user_id: int, amount: float) -> Optional[float]:
+    """
+    Atomically add `amount` to a user's balance in a single UPDATE.
+    Returns the new balance, or None if the user does not exist.
+    """
+    result = await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(balance=models.User.balance + amount)
+        .returning(models.User.balance, models.User.user_type)
+    )
+    row = result.one_or_none()
+    new_balance = None
+    if row is not None:
+        new_balance, user_type = row
+        await _adjust_user_type_stats(db, user_type, 0, amount)
+    await db.commit()
+    if new_balance is not None:
+        versions.users.bump_collection()
+    return new_balance
+
+async def update_password_hash(db: AsyncSession, user_id: int, hashed_password: str):
+    """
+    Replace a user's password hash (same password, upgraded scheme or cost).
+    The hash is not part of any API representation, so cached renders stay valid.
+    """
+    await db.execute(
+        update(models.User)
+        .where(models.User.id == user_id)
+        .values(hashed_password=hashed_password)
+    )
+    await db.commit()
+
 # --- DELETE ---
 async def delete_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
     """
@@ -88,6 +131,52 @@ async def delete_user(db: AsyncSession, user_id: int) -> Optional[models.User]:
     if not db_user:
         return None
         
+    await _adjust_user_type_stats(db, db_user.user_type, -1, -db_user.balance)
     await db.delete(db_user)
     await db.commit()
-    return db_user
\ No newline at end of file
+    versions.users.bump_collection()
+    return db_user
+
+# --- USER TYPE STATS ---
+async def _adjust_user_type_stats(db: AsyncSession, user_type: models.UserType, users: int, balance: float):
+    """
+    Apply a user write to the per-type totals, inside the caller's transaction.
+    """
+    await db.execute(
+        update(models.UserTypeStats)
+        .where(models.UserTypeStats.user_type == user_type)
+        .values(
+            user_count=models.UserTypeStats.user_count + users,
+            total_balance=models.UserTypeStats.total_balance + balance,
+        )
+    )
+
+async def get_user_type_stats(db: AsyncSession) -> List[models.UserTypeStats]:
+    """
+    Read the maintained per-type totals (one row per UserType, no scan of users).
+    """
+    result = await db.execute(select(models.UserTypeStats))
+    return result.scalars().all()
+
+async def compute_user_type_stats(db: AsyncSession) -> Dict[models.UserType, Tuple[int, float]]:
+    """
+    Recompute the per-type user count and total balance with a full scan of users.
+    """
+    result = await db.execute(
+        select(models.User.user_type, func.count(), func.coalesce(func.sum(models.User.balance), 0.0))
+        .group_by(models.User.user_type)
+    )
+    return {user_type: (count, total) for user_type, count, total in result.all()}
+
+async def set_user_type_stats(db: AsyncSession, totals: Dict[models.UserType, Tuple[int, float]]):
+    """
+    Overwrite the per-type totals (creating missing rows), e.g. after reconciliation.
+    """
+    existing = {row.user_type: row for row in await get_user_type_stats(db)}
+    for user_type, (count, total) in totals.items():
+        row = existing.get(user_type)
+        if row is None:
+            db.add(models.UserTypeStats(user_type=user_type, user_count=count, total_balance=total))
+        else:
+            row.user_count, row.total_balance = count, total
+    await db.commit()
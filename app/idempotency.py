@@ -0,0 +1,357 @@
+"""
+`Idempotency-Key` support for mutating requests.
+
+A client retrying a POST/PUT/PATCH/DELETE sends the same `Idempotency-Key`
+header as the original attempt. The first request with a key runs
+normally and its response is stored; repeats get the stored response back
+(marked `Idempotency-Replayed: true`) without running the endpoint again.
+A repeat arriving while the first request is still running waits for it
+instead of racing it.
+
+Keys are scoped to the method, path, query string and session cookie, so
+different users (or endpoints) never share responses. Reusing a key with a
+different request body is rejected with 422. Only final outcomes are
+stored: 5xx responses and transient refusals (408, 409, 425, 429) are not,
+so a retry after a server error or once a rate limit has passed runs again.
+
+Responses are kept in a bounded in-memory LRU (per process) or, with
+`IDEMPOTENCY_BACKEND=redis`, in Redis so every worker sees them.
+"""
+import asyncio
+import base64
+import collections
+import hashlib
+import json
+import logging
+import secrets
+import time
+from typing import Any, Dict, Final, List, Optional, OrderedDict, Tuple
+
+from app import metrics
+from app.sessions import SESSION_COOKIE_NAME
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+HEADER_NAME: Final[bytes] = b"idempotency-key"
+"""The request header carrying the client-chosen key (lower-cased, as in ASGI scopes)."""
+
+REPLAYED_HEADER: Final[bytes] = b"idempotency-replayed"
+"""Response header marking a replayed response."""
+
+IDEMPOTENT_METHODS: Final[frozenset] = frozenset({"POST", "PUT", "PATCH", "DELETE"})
+"""Methods the key is honoured for; safe methods never need it."""
+
+MAX_KEY_LENGTH: Final[int] = 255
+"""Longest accepted key; longer keys are rejected with 400."""
+
+MAX_STORED_BODY_BYTES: Final[int] = 1024 * 1024
+"""Responses with larger bodies are not stored (the request simply is not deduplicated)."""
+
+TRANSIENT_STATUSES: Final[frozenset] = frozenset({408, 409, 425, 429})
+"""Client-error statuses a retry may not get again; like 5xx, they are never stored."""
+
+RELEASE_SCRIPT: Final[str] = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+"""Deletes a claim only if it still holds the caller's token. KEYS: lock; ARGV: token."""
+
+# --- Stored Responses ---
+
+class StoredResponse:
+    """A completed response, together with the fingerprint of the request that produced it."""
+
+    __slots__ = ("fingerprint", "status", "headers", "body")
+
+    def __init__(self, fingerprint: str, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def dumps(self) -> str:
+        return json.dumps({
+            "f": self.fingerprint,
+            "s": self.status,
+            "h": [[k.decode("latin-1"), v.decode("latin-1")] for k, v in self.headers],
+            "b": base64.b64encode(self.body).decode("ascii"),
+        })
+
+    @classmethod
+    def loads(cls, data: str) -> "StoredResponse":
+        raw = json.loads(data)
+        headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in raw["h"]]
+        return cls(raw["f"], raw["s"], headers, base64.b64decode(raw["b"]))
+
+# --- Stores ---
+
+class MemoryIdempotencyStore:
+    """
+    Per-process store: an LRU of completed responses with a TTL, plus an
+    event per in-flight key that waiting duplicates block on.
+    """
+
+    def __init__(self, max_entries: int, ttl: float):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._responses: OrderedDict[str, Tuple[float, StoredResponse]] = collections.OrderedDict()
+        self._in_flight: Dict[str, asyncio.Event] = {}
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        return response
+
+    async def acquire(self, key: str) -> bool:
+        """Claims a key for execution; False if another request holds it."""
+        if key in self._in_flight:
+            return False
+        self._in_flight[key] = asyncio.Event()
+        return True
+
+    async def wait(self, key: str, timeout: float):
+        """Waits until the holder of `key` saves or releases it, or `timeout` passes."""
+        event = self._in_flight.get(key)
+        if event is not None:
+            try:
+                await asyncio.wait_for(event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def save(self, key: str, response: StoredResponse):
+        self._responses[key] = (time.monotonic() + self._ttl, response)
+        self._responses.move_to_end(key)
+        while len(self._responses) > self._max_entries:
+            self._responses.popitem(last=False)
+        await self.release(key)
+
+    async def release(self, key: str):
+        event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+
+class RedisIdempotencyStore:
+    """
+    Shared store in Redis: `SET NX` claims a key with a random token,
+    completed responses are stored with a TTL, and duplicates poll for the
+    response. A claim is only released by the request holding its token, so
+    a holder that outlived its claim cannot release a later request's one.
+    """
+
+    POLL_INTERVAL: Final[float] = 0.05
+
+    def __init__(self, url: str, ttl: float, lock_ttl: float):
+        import redis.asyncio as redis
+        self._redis = redis.Redis.from_url(url)
+        self._ttl = int(ttl)
+        # Outlives the wait timeout, so a crashed holder's claim eventually expires
+        self._lock_ttl_ms = int(lock_ttl * 1000)
+        self._tokens: Dict[str, str] = {}  # key -> token of the claim held by this process
+        self._release = self._redis.register_script(RELEASE_SCRIPT)
+
+    async def get(self, key: str) -> Optional[StoredResponse]:
+        data = await self._redis.get(f"idempotency:response:{key}")
+        return StoredResponse.loads(data) if data is not None else None
+
+    async def acquire(self, key: str) -> bool:
+        token = secrets.token_hex(16)
+        if not await self._redis.set(f"idempotency:lock:{key}", token, nx=True, px=self._lock_ttl_ms):
+            return False
+        self._tokens[key] = token
+        return True
+
+    async def wait(self, key: str, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not await self._redis.exists(f"idempotency:lock:{key}"):
+                return
+            await asyncio.sleep(self.POLL_INTERVAL)
+
+    async def save(self, key: str, response: StoredResponse):
+        await self._redis.set(f"idempotency:response:{key}", response.dumps(), ex=self._ttl)
+        await self.release(key)
+
+    async def release(self, key: str):
+        token = self._tokens.pop(key, None)
+        if token is not None:
+            await self._release(keys=[f"idempotency:lock:{key}"], args=[token])
+
+
+def create_store():
+    """Builds the store selected by `IDEMPOTENCY_BACKEND`."""
+    if settings.IDEMPOTENCY_BACKEND == "redis":
+        return RedisIdempotencyStore(
+            settings.REDIS_URL,
+            ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+            lock_ttl=settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS * 2,
+        )
+    return MemoryIdempotencyStore(settings.IDEMPOTENCY_MAX_ENTRIES, settings.IDEMPOTENCY_TTL_SECONDS)
+
+# --- ASGI Middleware ---
+
+def _scoped_key(scope: Dict[str, Any], key: bytes) -> str:
+    """Hashes the client key together with everything identifying the caller and target."""
+    session = b""
+    for name, value in scope["headers"]:
+        if name == b"cookie":
+            for part in value.split(b";"):
+                cookie_name, _, cookie_value = part.strip().partition(b"=")
+                if cookie_name == SESSION_COOKIE_NAME.encode():
+                    session = cookie_value
+    digest = hashlib.sha256()
+    for part in (scope["method"].encode(), scope["path"].encode(), scope["query_string"], session, key):
+        digest.update(len(part).to_bytes(4, "big") + part)
+    return digest.hexdigest()
+
+
+async def _send_json(send: Any, status: int, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware deduplicating mutating requests by `Idempotency-Key`."""
+
+    def __init__(self, app: Any, store: Any = None):
+        self.app = app
+        self.store = store
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any):
+        if (
+            not settings.IDEMPOTENCY_ENABLED
+            or scope["type"] != "http"
+            or scope["method"] not in IDEMPOTENT_METHODS
+        ):
+            await self.app(scope, receive, send)
+            return
+        client_key = next((v for k, v in scope["headers"] if k == HEADER_NAME), None)
+        if client_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not client_key or len(client_key) > MAX_KEY_LENGTH:
+            await _send_json(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+        # The body is needed up front to fingerprint it, then replayed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        key = _scoped_key(scope, client_key)
+
+        try:
+            claimed = await self._claim(key, fingerprint, send)
+        except Exception as e:
+            # A store outage (e.g. Redis down) must not take the endpoints down with it
+            logger.warning("Idempotency store unavailable, running request unprotected: %s", e)
+            await self._execute(scope, body, None, None, receive, send)
+            return
+        if claimed:
+            metrics.IDEMPOTENCY_REQUESTS.labels("executed").inc()
+            await self._execute(scope, body, fingerprint, key, receive, send)
+
+    async def _claim(self, key: str, fingerprint: str, send: Any) -> bool:
+        """Claims `key` for this request, or answers from the store (replay, 409 or 422).
+
+        Returns:
+            bool: True if the key was claimed and the request must be executed.
+        """
+        if self.store is None:
+            self.store = create_store()
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT_SECONDS
+        while True:
+            stored = await self.store.get(key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    metrics.IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+                    await _send_json(send, 422, "Idempotency-Key was already used with a different request body")
+                    return False
+                metrics.IDEMPOTENCY_REQUESTS.labels("replayed").inc()
+                await self._replay(stored, send)
+                return False
+            if await self.store.acquire(key):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics.IDEMPOTENCY_REQUESTS.labels("conflict").inc()
+                await _send_json(send, 409, "A request with this Idempotency-Key is still in progress")
+                return False
+            await self.store.wait(key, remaining)
+
+    async def _execute(
+        self,
+        scope: Dict[str, Any],
+        body: bytes,
+        fingerprint: Optional[str],
+        key: Optional[str],
+        receive: Any,
+        send: Any
+    ):
+        """Runs the app on the buffered body, storing the response under `key` if given."""
+        body_sent = False
+
+        async def replay_receive() -> Dict[str, Any]:
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        if key is None:
+            await self.app(scope, replay_receive, send)
+            return
+
+        status = 500
+        headers: List[Tuple[bytes, bytes]] = []
+        response_chunks: List[bytes] = []
+        size = 0
+
+        async def capture_send(message: Dict[str, Any]):
+            nonlocal status, headers, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if size <= MAX_STORED_BODY_BYTES:
+                    response_chunks.append(message.get("body", b""))
+            await send(message)
+
+        saved = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            if status < 500 and status not in TRANSIENT_STATUSES and size <= MAX_STORED_BODY_BYTES:
+                await self.store.save(key, StoredResponse(fingerprint, status, headers, b"".join(response_chunks)))
+                saved = True
+        finally:
+            if not saved:
+                await self.store.release(key)
+
+    @staticmethod
+    async def _replay(stored: StoredResponse, send: Any):
+        await send({
+            "type": "http.response.start",
+            "status": stored.status,
+            "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+        })
+        await send({"type": "http.response.body", "body": stored.body})
@@ -1,15 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
-from faker import Faker
 import random
 import os
 import asyncio
+import logging
 
 # Use absolute imports for consistency
 from app import crud, schemas, models
 from app.models import UserType
 from app.database import engine, Base, DATABASE_URL
 
-fake = Faker()
+logger = logging.getLogger(__name__)
 
 async def run_app_setup(db_session_maker: async_sessionmaker[AsyncSession], num_users: int = 15):
     """
@@ -20,16 +20,16 @@ async def run_app_setup(db_session_maker: async_sessionmaker[AsyncSession], num_
     # Logic to remove old database file (for local SQLite development)
     if "sqlite" in DATABASE_URL and db_file in DATABASE_URL:
         if os.path.exists(db_file):
-            print(f"Removing old database file: {db_file}")
+            logger.info("Removing old database file: %s", db_file)
             os.remove(db_file)
             
     # Create tables
     async with engine.begin() as conn:
-        print("Creating database tables...")
+        logger.info("Creating database tables...")
         await conn.run_sync(Base.metadata.create_all)
     
     # Seed data
-    print("Starting database seeding...")
+    logger.info("Starting database seeding...")
     
     # 1. Create the default Admin User
     await create_admin_user(db_session_maker)
@@ -37,14 +37,14 @@ async def run_app_setup(db_session_maker: async_sessionmaker[AsyncSession], num_
     # 2. Seed random users
     await create_random_users(db_session_maker, num_users=num_users)
     
-    print("Database setup complete.")
+    logger.info("Database setup complete.")
 
 
 async def create_admin_user(db_session_maker: async_sessionmaker[AsyncSession]):
     """
     Creates a default admin user if one does not already exist.
     """
-    print("--- Checking for Admin user... ---")
+    logger.info("--- Checking for Admin user... ---")
     admin_email = "admin"
     admin_pass  = "admin" 
     admin_nick  = "AdminUser"
@@ -53,11 +53,11 @@ async def create_admin_user(db_session_maker: async_sessionmaker[AsyncSession]):
         # Check if admin user already exists
         existing_admin = await crud.get_user_by_email(session, email=admin_email)
         if existing_admin:
-            print(f"Admin user ({admin_email}) already exists. Skipping creation.")
+            logger.info("Admin user (%s) already exists. Skipping creation.", admin_email)
             return
 
         # Create the admin user
-        print(f"Creating default admin user: {admin_email}")
+        logger.info("Creating default admin user: %s", admin_email)
         try:
             admin_in = schemas.UserCreate(
                 email=admin_email,
@@ -77,11 +77,11 @@ async def create_admin_user(db_session_maker: async_sessionmaker[AsyncSession]):
             )
             await crud.update_user(session, user_id=db_user.id, user_update=admin_update)
             
-            print(f"Successfully created admin user: {db_user.nickname}")
-            print(f"Admin Login: {admin_email} / {admin_pass}")
+            logger.info("Successfully created admin user: %s", db_user.nickname)
+            logger.info("Admin Login: %s / %s", admin_email, admin_pass)
 
         except Exception as e:
-            print(f"CRITICAL: Error creating admin user {admin_email}: {type(e).__name__} - {e}")
+            logger.critical("Error creating admin user %s: %s - %s", admin_email, type(e).__name__, e)
             await session.rollback()
 
 
@@ -89,7 +89,10 @@ async def create_random_users(db_session_maker: async_sessionmaker[AsyncSession]
     """
     Creates a specified number of random users in the database.
     """
-    print(f"--- Seeding database with {num_users} random users... ---")
+    logger.info("--- Seeding database with %s random users... ---", num_users)
+    # Imported here: faker is slow to import and only ever needed for seeding
+    from faker import Faker
+    fake = Faker()
     
     async with db_session_maker() as session:
         for i in range(num_users):
@@ -108,7 +111,7 @@ async def create_random_users(db_session_maker: async_sessionmaker[AsyncSession]
             
             try:
                 if await crud.get_user_by_email(session, email) or await crud.get_user_by_nickname(session, nickname):
-                    print(f"Skipping duplicate user: {nickname}")
+                    logger.info("Skipping duplicate user: %s", nickname)
                     continue
 
                 db_user = await crud.create_user(session, user_in)
@@ -119,10 +122,10 @@ async def create_random_users(db_session_maker: async_sessionmaker[AsyncSession]
                 )
                 await crud.update_user(session, user_id=db_user.id, user_update=update_data)
                 
-                print(f"Created user: {db_user.nickname} ({db_user.email})")
+                logger.debug("Created user: %s (%s)", db_user.nickname, db_user.email)
 
             except Exception as e:
-                print(f"Error creating user {email}: {type(e).__name__} - {e}")
+                logger.error("Error creating user %s: %s - %s", email, type(e).__name__, e)
                 await session.rollback()
 
-    print("--- Database seeding complete. ---")
\ No newline at end of file
+    logger.info("--- Database seeding complete. ---")
\ No newline at end of file
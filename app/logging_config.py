@@ -0,0 +1,145 @@
+"""
+Structured, non-blocking logging configuration.
+
+Log calls made on the event loop only enqueue the record: a `QueueHandler`
+on the root logger hands it to a `QueueListener`, whose background thread
+formats it as JSON (or plain text) and performs the actual write. The
+request, chat and game paths therefore never block on stdout.
+"""
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Any, Dict, Final, Optional, TextIO
+
+from app.settings import settings
+
+_RESERVED_ATTRS: Final[frozenset] = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", (), None)).keys() | {"message", "asctime"}
+)
+"""Standard `LogRecord` attributes; anything else on a record came from `extra=`."""
+
+_listener: Optional[logging.handlers.QueueListener] = None
+"""The running background writer, if `setup_logging` has been called."""
+
+# --- Formatters ---
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats log records as single-line JSON objects.
+
+    Every record carries `ts`, `level`, `logger` and `message`. Fields
+    passed through `extra=` are added as top-level keys, and exceptions
+    are rendered into an `exc_info` string.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created))
+                  + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    A `QueueHandler` that leaves all formatting to the writer thread.
+
+    The stock `prepare()` formats and copies every record on the calling
+    thread. Here only the message arguments are merged (they may be mutable
+    objects changed after the call returns); JSON encoding and traceback
+    rendering happen in the listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+TEXT_FORMAT: Final[str] = "%(asctime)s %(levelname)-8s %(name)s: %(message)s"
+"""Format string used when JSON output is disabled (e.g. for local development)."""
+
+# --- Setup ---
+
+def parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parses a `"logger=LEVEL,other.logger=LEVEL"` specification.
+
+    Args:
+        spec: The comma-separated **logger=level** pairs. Empty entries are ignored.
+
+    Returns:
+        Dict[str, str]: The upper-cased level name for each logger.
+
+    Raises:
+        ValueError: If an entry has no `=` or names an unknown level.
+    """
+    levels: Dict[str, str] = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, level = entry.partition("=")
+        level = level.strip().upper()
+        if not sep or not isinstance(logging.getLevelName(level), int):
+            raise ValueError(f"Invalid log level entry: {entry!r}")
+        levels[name.strip()] = level
+    return levels
+
+
+def setup_logging(
+    level: str = settings.LOG_LEVEL,
+    module_levels: str = settings.LOG_LEVELS,
+    json_output: bool = settings.LOG_JSON,
+    stream: Optional[TextIO] = None
+) -> logging.handlers.QueueListener:
+    """
+    Routes all logging through a queue drained by a background writer thread.
+
+    Replaces the root logger's handlers with a single `QueueHandler` and
+    starts a `QueueListener` writing to `stream`. Calling it again restarts
+    the listener with the new configuration.
+
+    Args:
+        level: The **root log level** name.
+        module_levels: Per-logger overrides, see `parse_module_levels`.
+        json_output: Emit JSON lines when True, human-readable text otherwise.
+        stream: The destination stream, defaulting to stdout.
+
+    Returns:
+        QueueListener: The started listener (stopped by `shutdown_logging`).
+    """
+    global _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter() if json_output else logging.Formatter(TEXT_FORMAT))
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    for name, module_level in parse_module_levels(module_levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown_logging():
+    """Stops the background writer, flushing every queued record first."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
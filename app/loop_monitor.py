@@ -0,0 +1,93 @@
+"""
+Event-loop lag monitor and blocking-code watchdog.
+
+Anything that runs on the event loop without awaiting (bcrypt, synchronous
+seeding, a large `json.dumps`) delays every other request and WebSocket.
+With `LOOP_MONITOR_ENABLED`:
+
+- a task sleeps for `LOOP_MONITOR_INTERVAL_SECONDS` at a time and records
+  how late it wakes up in the `event_loop_lag_seconds` histogram;
+- a watchdog thread notices when that task has not woken up for longer than
+  `LOOP_MONITOR_SLOW_THRESHOLD_SECONDS` and logs the loop thread's current
+  stack, i.e. the callback or coroutine step that is blocking it, once
+  per stall.
+
+Disabled (the default), nothing is started and nothing is measured.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Final, Optional
+
+from app import metrics
+from app.settings import settings
+from app.tasks import tasks
+
+logger = logging.getLogger(__name__)
+
+
+class LoopMonitor:
+    """Measures event-loop lag and reports code that blocks the loop."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        # Written by the loop, read by the watchdog; a float assignment is atomic under the GIL
+        self._last_tick = 0.0
+        self._reported_tick = 0.0
+
+    def start(self):
+        """Starts monitoring the running loop (no-op when disabled or already running)."""
+        if not settings.LOOP_MONITOR_ENABLED or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._task = tasks.spawn(self._measure(), name="loop-monitor", service=True)
+        if settings.LOOP_MONITOR_SLOW_THRESHOLD_SECONDS > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+            self._thread.start()
+
+    async def stop(self):
+        """Stops the measuring task and the watchdog thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _measure(self):
+        interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            metrics.EVENT_LOOP_LAG.observe(max(0.0, now - expected))
+            self._last_tick = now
+
+    def _watch(self):
+        interval = settings.LOOP_MONITOR_INTERVAL_SECONDS
+        threshold = settings.LOOP_MONITOR_SLOW_THRESHOLD_SECONDS
+        while not self._stop.wait(threshold / 2):
+            last_tick = self._last_tick
+            blocked = time.monotonic() - last_tick - interval
+            if blocked < threshold or last_tick == self._reported_tick:
+                continue
+            # Report each stall once, with the stack of whatever holds the loop right now
+            self._reported_tick = last_tick
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "  <unavailable>\n"
+            metrics.EVENT_LOOP_STALLS.inc()
+            logger.warning("Event loop blocked for %.3fs so far, in:\n%s", blocked, stack.rstrip())
+
+
+loop_monitor: Final[LoopMonitor] = LoopMonitor()
+"""The process-wide loop monitor, started by the application lifespan."""
@@ -1,25 +1,44 @@
 """
 Main entry point and configuration for the application.
 """
-from fastapi import Cookie, Response
+from fastapi import Cookie
 from fastapi.responses import RedirectResponse
 from typing import Optional
 from fastapi import FastAPI, Request, Depends, status
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
 from contextlib import asynccontextmanager
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Final, AsyncGenerator 
 
+from app import assets
+from app import idempotency
 from app import init_db
+from app import logging_config
+from app import metrics
+from app import profiling
+from app import rate_limit
+from app import sessions
 from app import services
 from app.settings import settings 
+from app.templating import templates
 from app.routers import feel_lucky_game, users, realtime, auth
-from app.database import AsyncSessionLocal, get_db
+from app.routers import metrics as metrics_router
+from app.routers import presence as presence_router
+from app.routers import profiling as profiling_router
+from app.routers import stats as stats_router
+from app.chat_history import history
+from app.database import AsyncSessionLocal, engine, get_db
+from app.loop_monitor import loop_monitor
+from app.presence import presence
+from app.redis_client import redis_client
+from app.stats import reconciler
+from app.tasks import tasks
+from app.websockets import manager
 from app import crud 
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
 
-templates: Final[Jinja2Templates] = Jinja2Templates(directory="app/templates")
-"""Jinja2 template engine instance configured to load templates from 'app/templates'."""
 
 # --- LIFESPAN STARTUP EVENT ---
 @asynccontextmanager
@@ -28,7 +47,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Handles application startup and shutdown events gracefully.
 
     On startup, it ensures the database is set up and seeded.
-    On shutdown, it performs any necessary cleanup operations.
+    On shutdown, it drains WebSocket connections (gradually, see
+    `ConnectionManager.drain`), stops background tasks, then closes the
+    Redis connections and the database engine, all within
+    `SHUTDOWN_TIMEOUT_SECONDS`.
 
     Args:
         app: The main FastAPI application instance.
@@ -36,15 +58,42 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     Yields:
         None: Control yields back to the application after startup.
     """
-    print("--- Starting Application Setup ---")
+    # Move all log output to the background writer before anything logs
+    logging_config.setup_logging()
+    logger.info("--- Starting Application Setup ---")
+    # Started first, so blocking work during setup (seeding, hashing) is reported too
+    loop_monitor.start()
     
-    # Calls the extracted setup function (database creation and seeding)
-    await init_db.run_app_setup(AsyncSessionLocal, num_users=15)
+    # Calls the extracted setup function (database creation and seeding);
+    # app.serve runs it once before forking workers instead
+    if settings.RUN_SETUP_ON_STARTUP:
+        await init_db.run_app_setup(AsyncSessionLocal, num_users=15)
+
+    # Pings WebSocket clients and reaps the ones that stopped answering
+    manager.start_heartbeats()
+    # Checks the per-type user totals against a full recompute, now and periodically
+    # (in one worker only when app.serve forks several)
+    reconciler.start(AsyncSessionLocal)
         
-    print("--- Application startup complete. ---")
+    logger.info("--- Application startup complete. ---")
     yield
     
-    print("--- Application shutting down. ---")
+    logger.info("--- Application shutting down. ---")
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.SHUTDOWN_TIMEOUT_SECONDS
+    await manager.drain(settings.SHUTDOWN_TIMEOUT_SECONDS)
+    # Services (heartbeat) stop at once; one-off jobs get the rest of the deadline to finish writing
+    await tasks.shutdown(max(deadline - loop.time(), 0.0))
+    await loop_monitor.stop()
+
+    await redis_client.disconnect()
+    await presence.close()
+    await history.close()
+    await rate_limit.limiter.close()
+    await sessions.denylist.close()
+    await engine.dispose()
+    logger.info("--- Application shutdown complete. ---")
+    logging_config.shutdown_logging()
 # ------------------------------
 
 app = FastAPI(
@@ -57,53 +106,69 @@ app = FastAPI(
 The main FastAPI application instance.
 """
 
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
-"""Mounts the 'app/static' directory under the /static URL path for serving static assets."""
+app.add_middleware(idempotency.IdempotencyMiddleware)
+"""Replays stored responses for retried requests carrying an Idempotency-Key."""
+
+metrics.install_db_hooks()
+app.add_middleware(metrics.MetricsMiddleware)
+"""Records per-route latency and per-request query counts, exposed at /metrics."""
+
+app.add_middleware(profiling.ProfilingMiddleware)
+"""Captures sampled request profiles when enabled (off by default, see /admin/profiling)."""
+
+app.mount("/static", assets.PrecompressedStaticFiles(directory=assets.STATIC_DIRECTORY), name="static")
+"""Mounts the 'app/static' directory under the /static URL path, serving built assets precompressed."""
 
 # Include API Routers
 app.include_router(auth.router)
 app.include_router(feel_lucky_game.router) 
 app.include_router(users.router) 
 app.include_router(realtime.router)
-"""Includes the dedicated routers for the game, user management, and real-time features."""
+app.include_router(presence_router.router)
+app.include_router(stats_router.router)
+app.include_router(metrics_router.router)
+app.include_router(profiling_router.router)
+"""Includes the dedicated routers for the game, user management, real-time features, presence, stats, monitoring and profiling."""
 
 @app.get("/") 
 async def read_root(
     request: Request, 
-    response: Response,
     db: AsyncSession = Depends(get_db),
     user_id: Optional[str] = Cookie(None)
 ):
     """
-    Renders the welcome page and fetches the user leaderboard.
+    Renders the welcome page with the (cached) user leaderboard.
+
+    The session cookie is a signed token (see `app.sessions`), so the
+    current user is known without a database lookup.
 
     Args:
         request: The incoming **HTTP request object**. Required by Jinja2 templates.
         db: The **AsyncSession** dependency for database access.
+        user_id: The **session cookie** (named after the original user-id cookie).
 
     Returns:
         TemplateResponse: The rendered **index.html** page with the user leaderboard.
     """
 
-    # --- ADD THIS AUTHENTICATION CHECK ---
+    # --- AUTHENTICATION CHECK ---
     if user_id is None:
         # No cookie, redirect to login page
         return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
 
-    try:
-        current_user = await crud.get_user(db, user_id=int(user_id))
-    except (ValueError, TypeError):
-        current_user = None
+    current_user = await sessions.verify_session_token(user_id)
 
     if current_user is None:
-        # Invalid or expired cookie
-        response.delete_cookie(key="user_id")
-        return RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        # Invalid, expired or revoked token
+        redirect_response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
+        redirect_response.delete_cookie(key=sessions.SESSION_COOKIE_NAME)
+        return redirect_response
     # --- END OF AUTH CHECK ---
 
-    sorted_users = await services.get_sorted_leaderboard_users(db)
+    # The leaderboard fragment is shared by all viewers and cached per version
+    leaderboard_html = await services.render_leaderboard_fragment(db)
     
     return templates.TemplateResponse(
         "index.html", 
-        {"request": request, "users": sorted_users, "current_user": current_user}
+        {"request": request, "leaderboard_html": leaderboard_html, "current_user": current_user}
     )
\ No newline at end of file
@@ -0,0 +1,425 @@
+"""
+In-process metrics collection with Prometheus text exposition.
+
+This module provides lightweight counter, gauge and histogram primitives,
+the ASGI middleware that records per-route request latency, and the
+SQLAlchemy event hooks that count queries and database time per request.
+Everything is kept in plain Python objects updated on the event loop, so
+recording a sample costs a dict lookup and a bisect.
+"""
+import bisect
+import contextvars
+import math
+import os
+import resource
+import sys
+import time
+from typing import Any, Dict, Final, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# --- Metric Primitives ---
+
+DEFAULT_LATENCY_BUCKETS: Final[Tuple[float, ...]] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+"""Histogram bucket upper bounds (in seconds) used for latency metrics."""
+
+QUERY_COUNT_BUCKETS: Final[Tuple[float, ...]] = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 50)
+"""Histogram bucket upper bounds used for per-request query counts."""
+
+LOOP_LAG_BUCKETS: Final[Tuple[float, ...]] = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0
+)
+"""Histogram bucket upper bounds (in seconds) for event-loop lag, finer at the low end."""
+
+
+def _format_value(value: float) -> str:
+    """Formats a sample value the way the Prometheus text format expects."""
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Escapes a label value for the exposition format."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Renders a `{name="value",...}` label block (empty string if no labels)."""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    """A single labelled counter series."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    """A single labelled gauge series."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramChild:
+    """A single labelled histogram series with fixed bucket bounds."""
+
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class _Metric:
+    """
+    Base class for a named metric family with optional labels.
+
+    Label children are created on first use and cached, so the hot path is
+    a single dict lookup. Unlabelled metrics delegate directly to their one
+    child series.
+    """
+
+    kind: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """
+        Args:
+            name: The **metric name**, e.g. `http_requests_total`.
+            documentation: The help text emitted in the `# HELP` line.
+            labelnames: The label names, in the order `labels()` expects values.
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        if not self.labelnames:
+            self._default = self._new_child()
+            self._children[()] = self._default
+        REGISTRY.register(self)
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def labels(self, *values: Any) -> Any:
+        """Returns the child series for the given label values, creating it if needed."""
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children[key] = self._new_child()
+        return child
+
+    def collect(self) -> List[str]:
+        """Renders the family's samples as exposition-format lines."""
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(self._collect_child(key, child))
+        return lines
+
+    def _collect_child(self, key: Tuple[str, ...], child: Any) -> Iterable[str]:
+        yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(child.value)}"
+
+
+class Counter(_Metric):
+    """A monotonically increasing counter."""
+
+    kind = "counter"
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    """A value that can go up and down."""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+    def set(self, value: float):
+        self._default.set(value)
+
+
+class Histogram(_Metric):
+    """A cumulative histogram with fixed bucket upper bounds."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def _collect_child(self, key: Tuple[str, ...], child: _HistogramChild) -> Iterable[str]:
+        cumulative = 0
+        for bound, count in zip(self.buckets + (math.inf,), child.counts):
+            cumulative += count
+            labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+            yield f"{self.name}_bucket{labels} {cumulative}"
+        labels = _format_labels(self.labelnames, key)
+        yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+        yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    """Holds every metric family and renders them for the `/metrics` endpoint."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+
+    def render(self) -> str:
+        """Returns all metrics in the Prometheus text exposition format (v0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY: Final[Registry] = Registry()
+"""The process-wide metrics registry exposed at `/metrics`."""
+
+CONTENT_TYPE: Final[str] = "text/plain; version=0.0.4; charset=utf-8"
+"""The Content-Type of the Prometheus text exposition format."""
+
+# --- Application Metrics ---
+
+HTTP_REQUEST_DURATION: Final[Histogram] = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by method, route template and status code.",
+    ("method", "route", "status"),
+)
+HTTP_REQUEST_DB_QUERIES: Final[Histogram] = Histogram(
+    "http_request_db_queries",
+    "Number of SQL statements executed per HTTP request.",
+    ("method", "route"),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+HTTP_REQUEST_DB_DURATION: Final[Histogram] = Histogram(
+    "http_request_db_duration_seconds",
+    "Time spent executing SQL statements per HTTP request.",
+    ("method", "route"),
+)
+DB_QUERIES_TOTAL: Final[Counter] = Counter(
+    "db_queries_total",
+    "SQL statements executed, including those outside HTTP requests.",
+)
+WS_ACTIVE_CONNECTIONS: Final[Gauge] = Gauge(
+    "ws_active_connections",
+    "Currently registered WebSocket connections.",
+)
+WS_BROADCAST_DURATION: Final[Histogram] = Histogram(
+    "ws_broadcast_duration_seconds",
+    "Time to fan a broadcast out to every active WebSocket connection.",
+)
+WS_MESSAGES_SENT: Final[Counter] = Counter(
+    "ws_messages_sent_total",
+    "WebSocket frames successfully sent by broadcasts.",
+)
+WS_SEND_FAILURES: Final[Counter] = Counter(
+    "ws_send_failures_total",
+    "WebSocket sends that raised during a broadcast.",
+)
+WS_REJECTED_CONNECTIONS: Final[Counter] = Counter(
+    "ws_rejected_connections_total",
+    "WebSocket connections refused by admission control, by reason (worker_limit, user_limit, accept_rate).",
+    ("reason",),
+)
+WS_HEARTBEAT_EVICTIONS: Final[Counter] = Counter(
+    "ws_heartbeat_evictions_total",
+    "WebSocket connections closed for missing heartbeats.",
+)
+
+EVENT_LOOP_LAG: Final[Histogram] = Histogram(
+    "event_loop_lag_seconds",
+    "How late the loop monitor's timer fired (time other code held the event loop).",
+    buckets=LOOP_LAG_BUCKETS,
+)
+EVENT_LOOP_STALLS: Final[Counter] = Counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked longer than the slow-callback threshold.",
+)
+
+PROCESS_RESIDENT_MEMORY: Final[Gauge] = Gauge(
+    "process_resident_memory_bytes",
+    "Resident set size of this worker process.",
+)
+
+IDEMPOTENCY_REQUESTS: Final[Counter] = Counter(
+    "idempotency_requests_total",
+    "Requests carrying an Idempotency-Key, by outcome (executed, replayed, conflict, mismatch).",
+    ("outcome",),
+)
+
+RATE_LIMITED: Final[Counter] = Counter(
+    "rate_limited_total",
+    "Requests and messages rejected by a rate limit, by limit name.",
+    ("limit",),
+)
+
+USER_STATS_CORRECTIONS: Final[Counter] = Counter(
+    "user_stats_corrections_total",
+    "Per-type user totals found drifted from a full recompute and corrected.",
+)
+
+# --- Process Metrics ---
+
+def resident_memory_bytes() -> int:
+    """Returns the current resident set size, or the peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def update_process_metrics():
+    """Refreshes the sampled process gauges (called on scrape and by the heartbeat)."""
+    PROCESS_RESIDENT_MEMORY.set(resident_memory_bytes())
+
+# --- Per-Request Database Accounting ---
+
+class RequestDBStats:
+    """Mutable query counters for the request currently being served."""
+
+    __slots__ = ("queries", "duration")
+
+    def __init__(self):
+        self.queries = 0
+        self.duration = 0.0
+
+
+_current_db_stats: contextvars.ContextVar[Optional[RequestDBStats]] = contextvars.ContextVar(
+    "current_db_stats", default=None
+)
+"""The stats object of the request running in the current context, if any."""
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+    DB_QUERIES_TOTAL.inc()
+    stats = _current_db_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.duration += elapsed
+
+
+def install_db_hooks():
+    """
+    Registers the query-counting hooks on every SQLAlchemy engine.
+
+    The listeners are attached to the `Engine` class, so engines created
+    later (tests, benchmarks) are covered too. Calling this more than once
+    is harmless.
+    """
+    if not event.contains(Engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(Engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(Engine, "after_cursor_execute", _after_cursor_execute)
+
+# --- ASGI Middleware ---
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording latency and database usage per route.
+
+    Requests are labelled with the matched route *template* (e.g.
+    `/users/{user_id}`), never the raw path, to keep label cardinality
+    bounded. Unmatched requests share the `__unmatched__` label.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Dict[str, Any]):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        stats = RequestDBStats()
+        token = _current_db_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _current_db_stats.reset(token)
+            # Mounted sub-apps (e.g. /static) carry no route, only their mount prefix.
+            route = getattr(scope.get("route"), "path", None) or scope.get("root_path") or "__unmatched__"
+            method = scope["method"]
+            HTTP_REQUEST_DURATION.labels(method, route, status_code).observe(elapsed)
+            HTTP_REQUEST_DB_QUERIES.labels(method, route).observe(stats.queries)
+            HTTP_REQUEST_DB_DURATION.labels(method, route).observe(stats.duration)
@@ -1,8 +1,8 @@
 """
-SQLAlchemy ORM models defining the database structure for the User entity.
+SQLAlchemy ORM models defining the database structure for the User entity and its per-type totals.
 """
 import enum
-from sqlalchemy import Column, Integer, String, Boolean, Float, Enum
+from sqlalchemy import Column, Integer, String, Boolean, Float, Enum, event
 from sqlalchemy.orm import Mapped, mapped_column
 from typing import Optional, Final
 
@@ -70,4 +70,31 @@ class User(Base):
     """
     
     is_active: Mapped[bool] = mapped_column(default=True)
-    """The user's active status, defaulting to True."""
\ No newline at end of file
+    """The user's active status, defaulting to True."""
+
+class UserTypeStats(Base):
+    """
+    Running totals of the users table per UserType, so dashboards read a
+    handful of rows instead of scanning every user.
+
+    Maintained by `app.crud` in the same transaction as each user write,
+    and checked against a full recompute by `app.stats`.
+    """
+    __tablename__: Final[str] = "user_type_stats"
+
+    user_type: Mapped[UserType] = mapped_column(Enum(UserType), primary_key=True)
+    """The user type these totals cover."""
+
+    user_count: Mapped[int] = mapped_column(Integer, default=0)
+    """Number of users of this type."""
+
+    total_balance: Mapped[float] = mapped_column(Float, default=0.0)
+    """Sum of the balances of users of this type."""
+
+
+@event.listens_for(UserTypeStats.__table__, "after_create")
+def _seed_user_type_stats(target, connection, **kw):
+    """Creates a zero row per type with the table, so maintenance only ever needs UPDATEs."""
+    connection.execute(target.insert(), [
+        {"user_type": user_type, "user_count": 0, "total_balance": 0.0} for user_type in UserType
+    ])
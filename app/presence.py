@@ -0,0 +1,269 @@
+"""
+Who is online, across every worker.
+
+Each worker counts its own WebSocket connections per user. With
+`PRESENCE_BACKEND=redis` it also publishes them to Redis:
+
+- `presence:online`, a sorted set of user ids scored by when a worker last
+  vouched for them. Online counts and user lists are range queries on it,
+  O(log N) and O(log N + k), never scans of connection lists;
+- `presence:worker:<id>`, the users connected to one worker, and
+  `presence:user:<id>`, the workers one user is connected to. Both are
+  expiring keys, so a crashed worker's entries age out on their own.
+
+The WebSocket heartbeat (`app.websockets`) calls `refresh()`, which
+re-scores the worker's users, renews its keys and prunes users no worker
+refreshed within `ttl()`. Presence therefore needs heartbeats enabled when
+Redis is used. A user goes offline as soon as their last connection on
+the last worker closes.
+
+Without Redis, or while it is unreachable, answers cover this worker only
+(`scope="worker"`).
+"""
+import itertools
+import logging
+import os
+import secrets
+import socket
+import time
+from typing import Dict, Final, List, NamedTuple, Optional
+
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ONLINE_KEY: Final[str] = "presence:online"
+"""Sorted set of online user ids, scored by last refresh (ms, Redis clock)."""
+
+# --- Lua Scripts ---
+
+ONLINE_SCRIPT: Final[str] = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('SADD', KEYS[2], ARGV[2])
+redis.call('PEXPIRE', KEYS[2], ARGV[3])
+redis.call('SADD', KEYS[3], ARGV[1])
+redis.call('PEXPIRE', KEYS[3], ARGV[3])
+redis.call('ZADD', KEYS[1], now, ARGV[1])
+return 1
+"""
+"""Marks a user online on a worker. KEYS: online, user, worker; ARGV: user id, worker id, ttl ms."""
+
+OFFLINE_SCRIPT: Final[str] = """
+redis.call('SREM', KEYS[2], ARGV[2])
+redis.call('SREM', KEYS[3], ARGV[1])
+-- Workers whose own key expired are dead; they no longer keep the user online
+for _, worker in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    if redis.call('EXISTS', 'presence:worker:' .. worker) == 0 then
+        redis.call('SREM', KEYS[2], worker)
+    end
+end
+if redis.call('SCARD', KEYS[2]) == 0 then
+    redis.call('ZREM', KEYS[1], ARGV[1])
+end
+return 1
+"""
+"""Removes a worker from a user, and the user from the online set if no worker is left."""
+
+REFRESH_SCRIPT: Final[str] = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local ttl = tonumber(ARGV[1])
+for i = 3, #ARGV do
+    local user = 'presence:user:' .. ARGV[i]
+    redis.call('ZADD', KEYS[1], now, ARGV[i])
+    redis.call('SADD', user, ARGV[2])
+    redis.call('PEXPIRE', user, ttl)
+    redis.call('SADD', KEYS[2], ARGV[i])
+end
+redis.call('PEXPIRE', KEYS[2], ttl)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - ttl)
+return 1
+"""
+"""Re-vouches for a worker's users and prunes stale ones. KEYS: online, worker; ARGV: ttl ms, worker id, user ids."""
+
+SNAPSHOT_SCRIPT: Final[str] = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local since = now - tonumber(ARGV[1])
+local count = redis.call('ZCOUNT', KEYS[1], since, '+inf')
+local users = {}
+if tonumber(ARGV[2]) > 0 then
+    users = redis.call('ZREVRANGEBYSCORE', KEYS[1], '+inf', since, 'LIMIT', 0, ARGV[2])
+end
+return {count, users}
+"""
+"""Counts online users and lists up to ARGV[2] of them (most recently refreshed first)."""
+
+IS_ONLINE_SCRIPT: Final[str] = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local score = redis.call('ZSCORE', KEYS[1], ARGV[1])
+if score and tonumber(score) >= now - tonumber(ARGV[2]) then
+    return 1
+end
+return 0
+"""
+"""Tells whether one user is online (O(1))."""
+
+# --- Backends ---
+
+class PresenceSnapshot(NamedTuple):
+    """Online users at one point in time."""
+    online: int
+    users: List[int]
+    scope: str  # "cluster" (all workers, via Redis) or "worker" (this process only)
+
+
+def ttl() -> float:
+    """Seconds a user stays online without a refresh: one heartbeat round more than the reaper allows."""
+    interval = settings.WS_HEARTBEAT_INTERVAL_SECONDS or 30.0
+    return interval * (settings.WS_HEARTBEAT_MAX_MISSED + 1)
+
+
+class RedisPresence:
+    """The presence keys described in the module docstring, updated by Lua scripts."""
+
+    def __init__(self, url: str, worker_id: str):
+        import redis.asyncio as redis
+        self._redis = redis.Redis.from_url(url)
+        self._worker_id = worker_id
+        self._worker_key = f"presence:worker:{worker_id}"
+        self._online = self._redis.register_script(ONLINE_SCRIPT)
+        self._offline = self._redis.register_script(OFFLINE_SCRIPT)
+        self._refresh = self._redis.register_script(REFRESH_SCRIPT)
+        self._snapshot = self._redis.register_script(SNAPSHOT_SCRIPT)
+        self._is_online = self._redis.register_script(IS_ONLINE_SCRIPT)
+
+    @staticmethod
+    def _ttl_ms() -> int:
+        return int(ttl() * 1000)
+
+    async def online(self, user_id: int):
+        await self._online(
+            keys=[ONLINE_KEY, f"presence:user:{user_id}", self._worker_key],
+            args=[user_id, self._worker_id, self._ttl_ms()],
+        )
+
+    async def offline(self, user_id: int):
+        await self._offline(
+            keys=[ONLINE_KEY, f"presence:user:{user_id}", self._worker_key],
+            args=[user_id, self._worker_id],
+        )
+
+    async def refresh(self, user_ids: List[int]):
+        await self._refresh(keys=[ONLINE_KEY, self._worker_key], args=[self._ttl_ms(), self._worker_id, *user_ids])
+
+    async def snapshot(self, limit: int) -> PresenceSnapshot:
+        count, users = await self._snapshot(keys=[ONLINE_KEY], args=[self._ttl_ms(), limit])
+        return PresenceSnapshot(int(count), [int(user) for user in users], "cluster")
+
+    async def is_online(self, user_id: int) -> bool:
+        return bool(await self._is_online(keys=[ONLINE_KEY], args=[user_id, self._ttl_ms()]))
+
+    async def close(self):
+        await self._redis.aclose()
+
+# --- Service ---
+
+class PresenceService:
+    """Tracks this worker's connected users and mirrors them to the configured backend."""
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        # Each worker needs its own id: workers forked by app.serve must not share
+        # the parent's, or one worker's OFFLINE/REFRESH would overwrite another's
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{secrets.token_hex(4)}"
+        # Connections per user on this worker, in order of arrival
+        self._local: Dict[int, int] = {}
+        self._redis: Optional[RedisPresence] = None
+        self._redis_down_until = 0.0
+
+    def _backend(self) -> Optional[RedisPresence]:
+        if settings.PRESENCE_BACKEND != "redis" or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = RedisPresence(settings.REDIS_URL, self.worker_id)
+        return self._redis
+
+    def _backend_failed(self, e: Exception):
+        # Retry Redis after a pause; the next refresh re-publishes everything missed meanwhile
+        self._redis_down_until = time.monotonic() + 5.0
+        logger.warning("Presence store unavailable, answering for this worker only: %s", e)
+
+    async def connected(self, user_id: int):
+        """Records a new connection; the user's first one on this worker marks them online."""
+        count = self._local.get(user_id, 0) + 1
+        self._local[user_id] = count
+        backend = self._backend()
+        if count == 1 and backend is not None:
+            try:
+                await backend.online(user_id)
+            except Exception as e:
+                self._backend_failed(e)
+
+    async def disconnected(self, user_id: int):
+        """Records a closed connection; the user's last one on this worker withdraws it."""
+        remaining = self._local.get(user_id, 0) - 1
+        if remaining > 0:
+            self._local[user_id] = remaining
+            return
+        self._local.pop(user_id, None)
+        backend = self._backend()
+        if backend is not None:
+            try:
+                await backend.offline(user_id)
+            except Exception as e:
+                self._backend_failed(e)
+
+    async def refresh(self):
+        """Re-publishes this worker's users (called by the WebSocket heartbeat)."""
+        backend = self._backend()
+        if backend is not None:
+            try:
+                await backend.refresh(list(self._local))
+            except Exception as e:
+                self._backend_failed(e)
+
+    async def snapshot(self, limit: int = 100) -> PresenceSnapshot:
+        """Returns the online count and up to `limit` online user ids.
+
+        Args:
+            limit: The **maximum number of user ids** to list (the count is always exact).
+
+        Returns:
+            PresenceSnapshot: Cluster-wide with Redis, otherwise for this worker.
+        """
+        backend = self._backend()
+        if backend is not None:
+            try:
+                return await backend.snapshot(limit)
+            except Exception as e:
+                self._backend_failed(e)
+        return PresenceSnapshot(len(self._local), list(itertools.islice(self._local, limit)), "worker")
+
+    async def is_online(self, user_id: int) -> bool:
+        """Tells whether a user has a connection on any worker (this worker without Redis)."""
+        backend = self._backend()
+        if backend is not None:
+            try:
+                return await backend.is_online(user_id)
+            except Exception as e:
+                self._backend_failed(e)
+        return user_id in self._local
+
+    async def close(self):
+        """Closes the Redis connection, if one was opened (on shutdown, after the sockets drained)."""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+presence: Final[PresenceService] = PresenceService()
+"""The process-wide presence service."""
+
+if hasattr(os, "register_at_fork"):
+    # A forked child starts with its own identity and without the parent's Redis connection
+    os.register_at_fork(after_in_child=presence._reset)
@@ -0,0 +1,314 @@
+"""
+Opt-in request profiling.
+
+`ProfilingMiddleware` captures a profile for a configurable fraction of
+requests, or for requests slower than a latency threshold, and keeps the
+most recent ones in a ring buffer. Two capture modes are available:
+
+* `cprofile`: deterministic `cProfile` tracing, downloadable as a pstats
+  file (`python -m pstats`, snakeviz, ...).
+* `sampling`: a background thread samples the event-loop thread's stack
+  every few milliseconds, producing flamegraph-compatible folded stacks.
+
+Both modes observe the whole event-loop thread while a request is being
+profiled, so concurrent requests contribute to the same profile; only one
+request is profiled at a time. Profiling is disabled by default and adds a
+single attribute check per request in that state.
+"""
+import cProfile
+import collections
+import io
+import itertools
+import marshal
+import pstats
+import random
+import sys
+import threading
+import time
+from typing import Any, Deque, Dict, Final, List, Optional, Tuple
+
+from app.settings import settings
+
+PROFILE_MODES: Final[Tuple[str, ...]] = ("cprofile", "sampling")
+"""The supported capture modes."""
+
+# --- Configuration ---
+
+class ProfilerConfig:
+    """Runtime-adjustable profiling settings, initialized from `Settings`."""
+
+    def __init__(self):
+        self.enabled: bool = settings.PROFILING_ENABLED
+        self.mode: str = settings.PROFILING_MODE
+        self.sample_rate: float = settings.PROFILING_SAMPLE_RATE
+        self.slow_threshold_ms: float = settings.PROFILING_SLOW_THRESHOLD_MS
+        self.sampling_interval_ms: float = settings.PROFILING_SAMPLING_INTERVAL_MS
+        self.buffer_size: int = settings.PROFILING_BUFFER_SIZE
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(vars(self))
+
+# --- Captured Profiles ---
+
+class ProfileRecord:
+    """A captured profile and the request it was taken for."""
+
+    def __init__(
+        self,
+        profile_id: int,
+        mode: str,
+        method: str,
+        path: str,
+        status: int,
+        duration_ms: float,
+        data: Any
+    ):
+        """
+        Args:
+            profile_id: The **unique id** of the record within this process.
+            mode: The capture mode (`cprofile` or `sampling`).
+            method: The HTTP method of the profiled request.
+            path: The request path.
+            status: The response status code.
+            duration_ms: The request latency in milliseconds.
+            data: The raw pstats dictionary (cprofile) or a Counter of
+                folded stacks (sampling).
+        """
+        self.id = profile_id
+        self.mode = mode
+        self.method = method
+        self.path = path
+        self.status = status
+        self.duration_ms = duration_ms
+        self.captured_at = time.time()
+        self._data = data
+
+    def summary(self) -> Dict[str, Any]:
+        """Returns the JSON-serializable metadata of the record."""
+        return {
+            "id": self.id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "duration_ms": round(self.duration_ms, 3),
+            "captured_at": self.captured_at,
+        }
+
+    def to_pstats(self) -> bytes:
+        """Serializes a cprofile record in the on-disk pstats format.
+
+        Raises:
+            ValueError: If the record was captured in sampling mode.
+        """
+        if self.mode != "cprofile":
+            raise ValueError("pstats output is only available for cprofile records")
+        return marshal.dumps(self._data)
+
+    def to_text(self, limit: int = 50) -> str:
+        """Renders a human-readable report (top functions, or top stacks)."""
+        if self.mode == "sampling":
+            lines = [f"{count:>8}  {stack}" for stack, count in self._data.most_common(limit)]
+            return "\n".join(["  samples  stack"] + lines) + "\n"
+        stream = io.StringIO()
+        stats = pstats.Stats(_StatsSource(self._data), stream=stream)
+        stats.sort_stats("cumulative").print_stats(limit)
+        return stream.getvalue()
+
+    def to_folded(self) -> str:
+        """Renders folded stacks (`frame;frame;frame count`) for flamegraph tools.
+
+        Sampling records are exact. cProfile only records caller/callee
+        edges, so for cprofile records every function's own time (in
+        microseconds) is attributed to the chain of its heaviest callers,
+        which is an approximation.
+        """
+        if self.mode == "sampling":
+            return "".join(f"{stack} {count}\n" for stack, count in sorted(self._data.items()))
+        return _fold_pstats(self._data)
+
+
+class _StatsSource:
+    """Adapter letting `pstats.Stats` load an in-memory stats dictionary."""
+
+    def __init__(self, stats: Dict[Any, Any]):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def _format_func(func: Tuple[str, int, str]) -> str:
+    filename, _, name = func
+    return f"{filename.rsplit('/', 1)[-1]}:{name}" if filename != "~" else name
+
+
+def _fold_pstats(stats: Dict[Any, Any]) -> str:
+    """Approximates folded stacks from a pstats dictionary (see `to_folded`)."""
+    folded: Dict[str, int] = collections.Counter()
+    for func, (_, _, tottime, _, callers) in stats.items():
+        weight = int(tottime * 1_000_000)
+        if weight <= 0:
+            continue
+        chain = [func]
+        seen = {func}
+        current_callers = callers
+        while current_callers:
+            parent = max(current_callers, key=lambda caller: current_callers[caller][3])
+            if parent in seen:
+                break
+            chain.append(parent)
+            seen.add(parent)
+            current_callers = stats.get(parent, (0, 0, 0, 0, {}))[4]
+        folded[";".join(_format_func(f) for f in reversed(chain))] += weight
+    return "".join(f"{stack} {count}\n" for stack, count in sorted(folded.items()))
+
+# --- Capture Backends ---
+
+class _StackSampler:
+    """Samples one thread's Python stack on a timer from a daemon thread."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self._thread_id = thread_id
+        self._interval = interval
+        self._stop = threading.Event()
+        self.stacks: collections.Counter = collections.Counter()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self) -> collections.Counter:
+        self._stop.set()
+        self._thread.join()
+        return self.stacks
+
+    def _run(self):
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+# --- Profiler ---
+
+class RequestProfiler:
+    """Decides which requests to profile and keeps the most recent profiles."""
+
+    def __init__(self):
+        self.config = ProfilerConfig()
+        self._records: Deque[ProfileRecord] = collections.deque(maxlen=self.config.buffer_size)
+        self._ids = itertools.count(1)
+        self._busy = False
+
+    def configure(self, **changes: Any):
+        """Applies configuration changes, resizing the ring buffer if needed.
+
+        Raises:
+            ValueError: If an unknown mode is requested.
+        """
+        mode = changes.get("mode")
+        if mode is not None and mode not in PROFILE_MODES:
+            raise ValueError(f"Unknown profiling mode {mode!r}, expected one of {PROFILE_MODES}")
+        for key, value in changes.items():
+            if value is not None:
+                setattr(self.config, key, value)
+        if self._records.maxlen != self.config.buffer_size:
+            self._records = collections.deque(self._records, maxlen=self.config.buffer_size)
+
+    def records(self) -> List[ProfileRecord]:
+        """Returns the buffered profiles, newest first."""
+        return list(reversed(self._records))
+
+    def get(self, profile_id: int) -> Optional[ProfileRecord]:
+        return next((r for r in self._records if r.id == profile_id), None)
+
+    def clear(self):
+        self._records.clear()
+
+    def _should_profile(self) -> Tuple[bool, bool]:
+        """Returns (profile this request, keep it regardless of latency)."""
+        if self._busy:
+            return False, False
+        if self.config.sample_rate > 0 and random.random() < self.config.sample_rate:
+            return True, True
+        return self.config.slow_threshold_ms > 0, False
+
+    def start(self) -> Optional[Tuple[Any, bool]]:
+        """Begins capturing if this request is selected; returns a capture handle."""
+        selected, keep = self._should_profile()
+        if not selected:
+            return None
+        self._busy = True
+        if self.config.mode == "sampling":
+            capture: Any = _StackSampler(threading.get_ident(), self.config.sampling_interval_ms / 1000.0)
+            capture.start()
+        else:
+            capture = cProfile.Profile()
+            capture.enable()
+        return capture, keep
+
+    def finish(self, handle: Tuple[Any, bool], method: str, path: str, status: int, duration: float):
+        """Stops a capture and stores it if it qualifies."""
+        capture, keep = handle
+        try:
+            if isinstance(capture, _StackSampler):
+                mode, data = "sampling", capture.stop()
+            else:
+                capture.disable()
+                capture.create_stats()
+                mode, data = "cprofile", capture.stats
+        finally:
+            self._busy = False
+        duration_ms = duration * 1000.0
+        if keep or duration_ms >= self.config.slow_threshold_ms:
+            self._records.append(ProfileRecord(
+                next(self._ids), mode, method, path, status, duration_ms, data
+            ))
+
+
+profiler: Final[RequestProfiler] = RequestProfiler()
+"""The process-wide profiler used by the middleware and the admin endpoints."""
+
+# --- ASGI Middleware ---
+
+class ProfilingMiddleware:
+    """ASGI middleware that hands selected HTTP requests to `profiler`."""
+
+    def __init__(self, app: Any, excluded_prefixes: Tuple[str, ...] = ("/admin/profiling",)):
+        self.app = app
+        self.excluded_prefixes = excluded_prefixes
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any):
+        if (
+            not profiler.config.enabled
+            or scope["type"] != "http"
+            or scope["path"].startswith(self.excluded_prefixes)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        handle = profiler.start()
+        if handle is None:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Dict[str, Any]):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.finish(
+                handle, scope["method"], scope["path"], status_code, time.perf_counter() - start
+            )
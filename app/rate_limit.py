@@ -0,0 +1,238 @@
+"""
+Token-bucket rate limiting per client IP, per user and per route.
+
+Each limit (`RateLimit`) is a bucket of `capacity` tokens refilled evenly
+over `period` seconds; a request takes one token from every bucket that
+applies to it (e.g. the caller's IP bucket *and* user bucket for a route)
+and is rejected, without consuming anything, if any of them is empty.
+
+With `RATE_LIMIT_BACKEND=redis` all buckets of a request are checked and
+updated atomically by one Lua script call, so limits hold across workers.
+Otherwise, or while Redis is unreachable, buckets live in process memory.
+
+Use `rate_limited(...)` as a route dependency (raises 429 with
+`Retry-After`), or `limiter.hit(...)` directly, e.g. in WebSocket loops.
+"""
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, Final, List, NamedTuple, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from app import metrics, sessions
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# --- Limits ---
+
+class RateLimit(NamedTuple):
+    """A token bucket definition: `capacity` requests per `period` seconds, with bursts up to `capacity`."""
+    name: str
+    capacity: int
+    period: float
+
+    @property
+    def rate(self) -> float:
+        """Tokens refilled per second."""
+        return self.capacity / self.period
+
+    @classmethod
+    def parse(cls, name: str, spec: str) -> "RateLimit":
+        """Builds a limit from a `"<requests>/<seconds>"` specification.
+
+        Raises:
+            ValueError: If the specification is malformed or not positive.
+        """
+        requests, sep, seconds = spec.partition("/")
+        if not sep or int(requests) <= 0 or float(seconds) <= 0:
+            raise ValueError(f"Invalid rate limit for {name!r}: {spec!r} (expected '<requests>/<seconds>')")
+        return cls(name, int(requests), float(seconds))
+
+
+LOGIN: Final[RateLimit] = RateLimit.parse("login", settings.RATE_LIMIT_LOGIN)
+"""Login attempts per client IP (each one costs a bcrypt verification)."""
+
+GAME: Final[RateLimit] = RateLimit.parse("game", settings.RATE_LIMIT_GAME)
+"""Game plays per client IP and per logged-in user."""
+
+CHAT: Final[RateLimit] = RateLimit.parse("chat", settings.RATE_LIMIT_CHAT)
+"""Chat frames per WebSocket user."""
+
+# --- Backends ---
+
+class LocalBuckets:
+    """In-process token buckets, keyed like the Redis ones."""
+
+    MAX_BUCKETS: Final[int] = 100_000
+
+    def __init__(self):
+        self._buckets: Dict[str, List[float]] = {}
+
+    def hit(self, buckets: Sequence[Tuple[RateLimit, str]]) -> float:
+        now = time.monotonic()
+        states = []
+        retry_after = 0.0
+        for limit, key in buckets:
+            tokens, updated_at = self._buckets.get(key, (limit.capacity, now))
+            tokens = min(limit.capacity, tokens + (now - updated_at) * limit.rate)
+            states.append((key, tokens))
+            if tokens < 1:
+                retry_after = max(retry_after, (1 - tokens) / limit.rate)
+        # All or nothing: a rejected request consumes no tokens
+        cost = 0 if retry_after else 1
+        for key, tokens in states:
+            self._buckets[key] = [tokens - cost, now]
+        if len(self._buckets) > self.MAX_BUCKETS:
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now: float):
+        # Buckets untouched for an hour are full again for any sensible limit
+        self._buckets = {k: v for k, v in self._buckets.items() if now - v[1] < 3600}
+
+    def reset(self):
+        self._buckets.clear()
+
+
+TOKEN_BUCKET_SCRIPT: Final[str] = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + tonumber(t[2]) / 1000
+local n = #KEYS
+local tokens = {}
+local retry = 0
+for i = 1, n do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local state = redis.call('HMGET', KEYS[i], 'tokens', 'ts')
+    local level = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    level = math.min(capacity, level + (now - ts) * rate)
+    tokens[i] = level
+    if level < 1 then
+        retry = math.max(retry, (1 - level) / rate)
+    end
+end
+local cost = 1
+if retry > 0 then cost = 0 end
+for i = 1, n do
+    local capacity = tonumber(ARGV[i * 2 - 1])
+    local rate = tonumber(ARGV[i * 2])
+    local level = tokens[i] - cost
+    redis.call('HSET', KEYS[i], 'tokens', level, 'ts', now)
+    redis.call('PEXPIRE', KEYS[i], math.ceil((capacity - level) / rate) + 1000)
+end
+return tostring(retry)
+"""
+"""Checks and updates every bucket of a request atomically; returns the retry delay in ms (0 = allowed)."""
+
+
+class RedisBuckets:
+    """Token buckets stored in Redis hashes, updated by `TOKEN_BUCKET_SCRIPT`."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.Redis.from_url(url)
+        self._script = self._redis.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def hit(self, buckets: Sequence[Tuple[RateLimit, str]]) -> float:
+        keys = [f"ratelimit:{key}" for _, key in buckets]
+        args: List[Any] = []
+        for limit, _ in buckets:
+            args += [limit.capacity, limit.rate / 1000.0]
+        retry_ms = float(await self._script(keys=keys, args=args))
+        return retry_ms / 1000.0
+
+    async def close(self):
+        await self._redis.aclose()
+
+# --- Limiter ---
+
+class RateLimiter:
+    """Evaluates token buckets on the configured backend, falling back to memory."""
+
+    def __init__(self):
+        self.local = LocalBuckets()
+        self._redis: Optional[RedisBuckets] = None
+        self._redis_down_until = 0.0
+
+    async def hit(self, buckets: Sequence[Tuple[RateLimit, str]]) -> float:
+        """Takes one token from each bucket if all have one.
+
+        Args:
+            buckets: The **(limit, identity)** pairs that apply to the request,
+                e.g. `[(GAME, "ip:1.2.3.4"), (GAME, "user:42")]`.
+
+        Returns:
+            float: 0.0 if the request is allowed, otherwise the seconds until it would be.
+        """
+        if not settings.RATE_LIMIT_ENABLED or not buckets:
+            return 0.0
+        keyed = [(limit, f"{limit.name}:{identity}") for limit, identity in buckets]
+        retry_after = await self._hit_backend(keyed)
+        if retry_after:
+            for limit, _ in buckets:
+                metrics.RATE_LIMITED.labels(limit.name).inc()
+        return retry_after
+
+    async def _hit_backend(self, keyed: Sequence[Tuple[RateLimit, str]]) -> float:
+        if settings.RATE_LIMIT_BACKEND == "redis" and time.monotonic() >= self._redis_down_until:
+            try:
+                if self._redis is None:
+                    self._redis = RedisBuckets(settings.REDIS_URL)
+                return await self._redis.hit(keyed)
+            except Exception as e:
+                # Retry Redis after a pause instead of paying a failed round trip per request
+                self._redis_down_until = time.monotonic() + 5.0
+                logger.warning("Rate limit store unavailable, using in-process buckets: %s", e)
+        return self.local.hit(keyed)
+
+    def reset(self):
+        """Empties the in-process buckets (tests, benchmarks)."""
+        self.local.reset()
+
+    async def close(self):
+        """Closes the Redis connection, if one was opened."""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+
+limiter: Final[RateLimiter] = RateLimiter()
+"""The process-wide rate limiter."""
+
+# --- FastAPI Dependency ---
+
+def client_ip(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def rate_limited(limit: RateLimit, per_ip: bool = True, per_user: bool = False) -> Callable:
+    """Builds a route dependency enforcing `limit`.
+
+    Args:
+        limit: The bucket definition; its name scopes the buckets to the route(s) using it.
+        per_ip: Apply a bucket per client IP.
+        per_user: Apply a bucket per logged-in user (skipped for anonymous requests).
+
+    Returns:
+        Callable: A dependency raising 429 with `Retry-After` when the limit is exceeded.
+    """
+    async def dependency(request: Request):
+        buckets = []
+        if per_ip:
+            buckets.append((limit, f"ip:{client_ip(request)}"))
+        if per_user:
+            session = await sessions.verify_session_token(request.cookies.get(sessions.SESSION_COOKIE_NAME))
+            if session is not None:
+                buckets.append((limit, f"user:{session.id}"))
+        retry_after = await limiter.hit(buckets)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    return dependency
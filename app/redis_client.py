@@ -3,11 +3,19 @@ Asynchronous Redis Pub/Sub Client.
 
 This module provides the RedisClient class for managing an asynchronous
 connection to Redis, specifically designed for real-time message
+
+`redis.asyncio` is imported by `connect()`, so processes that never use
+Pub/Sub do not pay for importing it.
 """
-import redis.asyncio as redis
 import json
 import asyncio
-from typing import Callable, Any, Awaitable, Final
+import logging
+from typing import TYPE_CHECKING, Callable, Any, Awaitable, Final
+
+if TYPE_CHECKING:
+    import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
 
 # --- Module-Level Constants ---
 
@@ -38,9 +46,9 @@ class RedisClient:
         """
         self._host = host
         self._port = port
-        self._redis: redis.Redis | None = None
-        self._pubsub: redis.client.PubSub | None = None
-        print(f"RedisClient initialized for {host}:{port}")
+        self._redis: "redis.Redis | None" = None
+        self._pubsub: "redis.client.PubSub | None" = None
+        logger.debug("RedisClient initialized for %s:%s", host, port)
 
     async def connect(self):
         """
@@ -49,6 +57,7 @@ class RedisClient:
         Pings the server to verify the connection and initializes
         the dedicated PubSub client.
         """
+        import redis.asyncio as redis
         try:
             # decode_responses=True ensures Redis returns strings, not bytes
             self._redis = redis.Redis(
@@ -58,11 +67,11 @@ class RedisClient:
             )
             await self._redis.ping()
             self._pubsub = self._redis.pubsub()
-            print("Successfully connected to Redis.")
+            logger.info("Successfully connected to Redis.")
         except redis.ConnectionError as e:
-            print(
-                f"CRITICAL: Failed to connect to Redis at {self._host}:{self._port}. "
-                f"Real-time features will not work. Error: {e}"
+            logger.critical(
+                "Failed to connect to Redis at %s:%s. Real-time features will not work. Error: %s",
+                self._host, self._port, e
             )
             self._redis = None
             self._pubsub = None
@@ -77,7 +86,7 @@ class RedisClient:
         if self._redis:
             await self._redis.close()
             self._redis = None
-        print("Redis client disconnected.")
+        logger.info("Redis client disconnected.")
 
     async def publish(self, data: dict[str, Any]):
         """
@@ -89,16 +98,17 @@ class RedisClient:
             data: The **message payload** (a dictionary) to serialize and send.
         """
         if not self._redis:
-            print("Warning: Cannot publish, Redis connection is not established.")
+            logger.warning("Cannot publish, Redis connection is not established.")
             return
+        import redis.asyncio as redis
 
         try:
             message = json.dumps(data)
             await self._redis.publish(REALTIME_CHANNEL, message)
         except redis.ConnectionError as e:
-            print(f"Error publishing message (connection lost): {e}")
+            logger.error("Error publishing message (connection lost): %s", e)
         except TypeError as e:
-            print(f"Error serializing message data to JSON: {e}")
+            logger.error("Error serializing message data to JSON: %s", e)
 
     async def subscribe_and_listen(
         self,
@@ -116,11 +126,12 @@ class RedisClient:
                      deserialized message dictionary) and is awaited.
         """
         if not self._pubsub:
-            print("Warning: Cannot subscribe, PubSub client is not established.")
+            logger.warning("Cannot subscribe, PubSub client is not established.")
             return
+        import redis.asyncio as redis
 
         await self._pubsub.subscribe(REALTIME_CHANNEL)
-        print(f"Subscribed to Redis channel: {REALTIME_CHANNEL}")
+        logger.info("Subscribed to Redis channel: %s", REALTIME_CHANNEL)
 
         while True:
             try:
@@ -137,19 +148,19 @@ class RedisClient:
                         # Asynchronously process the message
                         await handler(data)
                     except json.JSONDecodeError:
-                        print(f"Error decoding JSON message: {message['data']}")
+                        logger.error("Error decoding JSON message: %s", message['data'])
 
                 # Short sleep to yield control, preventing a busy-loop
                 await asyncio.sleep(0.01)
 
             except redis.ConnectionError as e:
-                print(f"Redis PubSub connection dropped: {e}. Stopping listener.")
+                logger.error("Redis PubSub connection dropped: %s. Stopping listener.", e)
                 break
             except asyncio.CancelledError:
-                print("Redis listener task cancelled.")
+                logger.info("Redis listener task cancelled.")
                 break
             except Exception as e:
-                print(f"An unexpected error occurred in Redis listener: {e}")
+                logger.exception("An unexpected error occurred in Redis listener: %s", e)
                 break  # Stop listener on unexpected errors
 
 # --- Singleton Instance ---
@@ -1,5 +1,6 @@
 from fastapi import (
     APIRouter, 
+    BackgroundTasks,
     Depends, 
     Request, 
     # Response,  <-- We no longer need this injected in the login function
@@ -7,20 +8,21 @@ from fastapi import (
     Form
 )
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Final, Optional
+import logging
 
-from .. import crud, security
+from .. import crud, rate_limit, security, sessions
 from ..database import get_db
+from ..settings import settings
+from ..templating import templates
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     tags=["Authentication"]
 )
 
-# We need access to the templates
-templates: Final[Jinja2Templates] = Jinja2Templates(directory="app/templates")
-
 @router.get("/login", response_class=HTMLResponse)
 async def get_login_page(request: Request, error: Optional[str] = None):
     """
@@ -31,9 +33,10 @@ async def get_login_page(request: Request, error: Optional[str] = None):
         {"request": request, "error": error}
     )
 
-@router.post("/login")
+@router.post("/login", dependencies=[Depends(rate_limit.rate_limited(rate_limit.LOGIN))])
 async def login_for_user(
     request: Request, 
+    background_tasks: BackgroundTasks,
     # response: Response, <-- REMOVED from parameters
     db: AsyncSession = Depends(get_db),
     username: str = Form(...), # This is the email
@@ -45,41 +48,60 @@ async def login_for_user(
     user = await crud.get_user_by_email(db, email=username)
     
     # Check if user exists and password is correct
-    if not user or not security.verify_password(password, user.hashed_password):
+    if not user or not await security.verify_password_async(password, user.hashed_password):
         # Failed login. Redirect back to login page with an error.
         return templates.TemplateResponse(
             "login.html", 
             {"request": request, "error": "Invalid email or password."},
-            status_code=status.HTTP_400_UNAUTHORIZED
+            status_code=status.HTTP_401_UNAUTHORIZED
         )
 
     # --- Login Successful ---
+
+    # Upgrade outdated hashes while we know the password; runs after the redirect is sent
+    if security.needs_rehash(user.hashed_password):
+        background_tasks.add_task(_upgrade_password_hash, db, user.id, password)
     
     # 1. Create the redirect response FIRST
     redirect_response = RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
 
-    # 2. Set the cookie on THAT response object
+    # 2. Set the signed session token as the cookie on THAT response object
     redirect_response.set_cookie(
-        key="user_id",
-        value=str(user.id),
+        key=sessions.SESSION_COOKIE_NAME,
+        value=sessions.create_session_token(user.id, user.nickname, user.user_type),
         httponly=True,  # Makes it inaccessible to JavaScript
         samesite="strict", # Protects against CSRF
-        max_age=60*60*24 # Cookie lasts for 1 day
+        max_age=settings.SESSION_MAX_AGE_SECONDS # Cookie lasts as long as the token
     )
     
     # 3. Return the response that has the cookie
     return redirect_response
 
+async def _upgrade_password_hash(db: AsyncSession, user_id: int, password: str):
+    """
+    Re-hashes a password with the current scheme and cost. A failure only
+    delays the upgrade to the next login.
+    """
+    try:
+        await crud.update_password_hash(db, user_id, await security.get_password_hash_async(password))
+        logger.info("Upgraded the password hash of user %s.", user_id)
+    except Exception as e:
+        logger.warning("Could not upgrade the password hash of user %s: %s", user_id, e)
+        await db.rollback()
+
 @router.get("/logout")
-async def logout(): # <-- REMOVED response from parameters
+async def logout(session: Optional[sessions.Session] = Depends(sessions.get_session)):
     """
-    Logs the user out by deleting the cookie.
+    Logs the user out by revoking the session token and deleting the cookie.
     """
+    if session is not None:
+        await sessions.denylist.revoke(session)
+
     # 1. Create the redirect response
     redirect_response = RedirectResponse(url="/login", status_code=status.HTTP_303_SEE_OTHER)
     
     # 2. Delete the cookie on THAT response
-    redirect_response.delete_cookie(key="user_id")
+    redirect_response.delete_cookie(key=sessions.SESSION_COOKIE_NAME)
     
     # 3. Return the response
     return redirect_response
\ No newline at end of file
@@ -1,16 +1,23 @@
 from fastapi import APIRouter, Depends
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+import logging
 import random
 from sqlalchemy.ext.asyncio import AsyncSession  
+from typing import Annotated, List, Optional
 
 from ..database import get_db 
-from .. import crud, schemas   
+from ..settings import settings
+from .. import crud, rate_limit, schemas   
 
 BONUS_AMOUNT: float = 100.0
+EMOJIS_COUNT: int = 6
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/api/games",
-    tags=["Games"]
+    tags=["Games"],
+    dependencies=[Depends(rate_limit.rate_limited(rate_limit.GAME, per_user=True))]
 )
 
 # Define Pydantic models for this game
@@ -22,14 +29,24 @@ class GameResult(BaseModel):
     result: str  # "win" or "lose"
     bonusIndex: int  
 
+class GameBatchPlay(BaseModel):
+    choices: List[Annotated[int, Field(ge=0, lt=EMOJIS_COUNT)]] = Field(
+        ..., min_length=1, max_length=settings.GAME_BATCH_MAX_ROUNDS
+    )
+    user_id: int
+
+class GameBatchResult(BaseModel):
+    bonusIndexes: List[int]  # One per round, in the order of the choices
+    wins: int
+    winnings: float
+    balance: Optional[float]  # None if the user does not exist
+
 @router.post("/feel-lucky", response_model=GameResult)
 async def play_feel_lucky_game(play: GamePlay, db: AsyncSession = Depends(get_db)):
     """
     Handles the "Feel Lucky" game logic securely on the server.
     """
-    emojis_count = 6  # 6 emojis
-    
-    server_bonus_index = random.randint(0, emojis_count - 1)
+    server_bonus_index = random.randint(0, EMOJIS_COUNT - 1)
     
     if play.choice == server_bonus_index:
         result = "win"
@@ -40,12 +57,21 @@ async def play_feel_lucky_game(play: GamePlay, db: AsyncSession = Depends(get_db
                 new_balance = user.balance + BONUS_AMOUNT
                 update_data = schemas.UserUpdate(balance=new_balance)
                 await crud.update_user(db, user_id=play.user_id, user_update=update_data)
-                print(f"User {user.nickname} won! New balance: {new_balance}")
+                logger.info(
+                    "User %s won! New balance: %s", user.nickname, new_balance,
+                    extra={"user_id": play.user_id, "balance": new_balance}
+                )
             else:
                 # This case should ideally not happen if the frontend sends a valid ID
-                print(f"Error: User {play.user_id} not found, cannot update balance.")
+                logger.error(
+                    "User %s not found, cannot update balance.", play.user_id,
+                    extra={"user_id": play.user_id}
+                )
         except Exception as e:
-            print(f"Error updating balance for user {play.user_id}: {e}")
+            logger.exception(
+                "Error updating balance for user %s: %s", play.user_id, e,
+                extra={"user_id": play.user_id}
+            )
             # Don't let a DB error stop the game result from being sent
         # --- End of added logic ---
 
@@ -53,4 +79,46 @@ async def play_feel_lucky_game(play: GamePlay, db: AsyncSession = Depends(get_db
         result = "lose"
 
     # Return the result and the correct answer
-    return GameResult(result=result, bonusIndex=server_bonus_index)
\ No newline at end of file
+    return GameResult(result=result, bonusIndex=server_bonus_index)
+
+
+@router.post("/feel-lucky/batch", response_model=GameBatchResult)
+async def play_feel_lucky_batch(play: GameBatchPlay, db: AsyncSession = Depends(get_db)):
+    """
+    Plays several "Feel Lucky" rounds in one request.
+    Each round is drawn exactly like a single play; all bonus indexes are
+    drawn in one pass and the total winnings are applied in one update; a
+    batch without wins only reads the balance.
+    """
+    bonus_indexes = random.choices(range(EMOJIS_COUNT), k=len(play.choices))
+    wins = sum(choice == bonus for choice, bonus in zip(play.choices, bonus_indexes))
+    winnings = wins * BONUS_AMOUNT
+
+    balance = None
+    try:
+        if winnings:
+            balance = await crud.add_to_balance(db, user_id=play.user_id, amount=winnings)
+        else:
+            # Nothing to add: skip the write, its commit and the version/stats bookkeeping
+            user = await crud.get_user(db, user_id=play.user_id)
+            balance = user.balance if user is not None else None
+        if balance is None:
+            logger.error(
+                "User %s not found, cannot update balance.", play.user_id,
+                extra={"user_id": play.user_id}
+            )
+        elif wins:
+            logger.info(
+                "User %s won %d of %d rounds! New balance: %s",
+                play.user_id, wins, len(play.choices), balance,
+                extra={"user_id": play.user_id, "balance": balance}
+            )
+    except Exception as e:
+        logger.exception(
+            "Error updating balance for user %s: %s", play.user_id, e,
+            extra={"user_id": play.user_id}
+        )
+
+    return GameBatchResult(
+        bonusIndexes=bonus_indexes, wins=wins, winnings=winnings, balance=balance
+    )
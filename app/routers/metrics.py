@@ -0,0 +1,16 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from .. import metrics
+
+router = APIRouter(
+    tags=["Monitoring"]
+)
+
+@router.get("/metrics", response_class=Response)
+async def read_metrics():
+    """
+    Exposes the collected metrics in the Prometheus text format.
+    """
+    metrics.update_process_metrics()
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
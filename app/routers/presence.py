@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Query
+from pydantic import BaseModel
+from typing import List
+
+from ..presence import presence
+
+router = APIRouter(
+    prefix="/api/presence",
+    tags=["Presence"]
+)
+
+class PresenceResponse(BaseModel):
+    online: int
+    users: List[int]  # At most `limit` user ids
+    scope: str  # "cluster" (all workers) or "worker" (this worker only, no Redis)
+
+class UserPresence(BaseModel):
+    user_id: int
+    online: bool
+
+@router.get("", response_model=PresenceResponse)
+async def read_presence(limit: int = Query(100, ge=0, le=1000)):
+    """
+    Returns how many users are online and lists up to `limit` of them.
+
+    Answered from the presence index, without touching connection lists or the database.
+    """
+    snapshot = await presence.snapshot(limit)
+    return PresenceResponse(online=snapshot.online, users=snapshot.users, scope=snapshot.scope)
+
+@router.get("/{user_id}", response_model=UserPresence)
+async def read_user_presence(user_id: int):
+    """
+    Tells whether one user currently has a realtime connection.
+    """
+    return UserPresence(user_id=user_id, online=await presence.is_online(user_id))
@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse, Response
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+
+from .. import models, sessions
+from ..profiling import profiler
+
+
+async def require_admin(
+    session: Optional[sessions.Session] = Depends(sessions.get_session)
+) -> sessions.Session:
+    """
+    Dependency that only lets logged-in admin users through.
+    """
+    if session is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    if session.user_type != models.UserType.ADMIN:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return session
+
+
+router = APIRouter(
+    prefix="/admin/profiling",
+    tags=["Admin"],
+    dependencies=[Depends(require_admin)],
+)
+
+class ProfilingConfigUpdate(BaseModel):
+    enabled: Optional[bool] = None
+    mode: Optional[Literal["cprofile", "sampling"]] = None
+    sample_rate: Optional[float] = Field(None, ge=0.0, le=1.0)
+    slow_threshold_ms: Optional[float] = Field(None, ge=0.0)
+    sampling_interval_ms: Optional[float] = Field(None, gt=0.0)
+    buffer_size: Optional[int] = Field(None, ge=1, le=1000)
+
+
+@router.get("")
+async def read_profiling_status() -> Dict[str, Any]:
+    """
+    Returns the current profiling configuration and the buffered profiles.
+    """
+    return {
+        "config": profiler.config.as_dict(),
+        "profiles": [record.summary() for record in profiler.records()],
+    }
+
+
+@router.put("")
+async def update_profiling_config(update: ProfilingConfigUpdate) -> Dict[str, Any]:
+    """
+    Changes the profiling configuration at runtime (e.g. to switch it on).
+    Only the provided fields are changed.
+    """
+    profiler.configure(**update.model_dump(exclude_unset=True))
+    return {"config": profiler.config.as_dict()}
+
+
+@router.delete("/profiles", status_code=status.HTTP_204_NO_CONTENT)
+async def clear_profiles():
+    """
+    Empties the profile ring buffer.
+    """
+    profiler.clear()
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(
+    profile_id: int,
+    format: Literal["pstats", "folded", "text"] = Query("text")
+):
+    """
+    Downloads a buffered profile.
+
+    `pstats` is the binary format read by `pstats.Stats` (cprofile mode only),
+    `folded` is flamegraph-compatible folded stacks, `text` a readable summary.
+    """
+    record = profiler.get(profile_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    if format == "pstats":
+        try:
+            content = record.to_pstats()
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return Response(
+            content=content,
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="profile-{record.id}.pstats"'},
+        )
+    if format == "folded":
+        return PlainTextResponse(
+            record.to_folded(),
+            headers={"Content-Disposition": f'attachment; filename="profile-{record.id}.folded"'},
+        )
+    return PlainTextResponse(record.to_text())
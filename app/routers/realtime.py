@@ -1,21 +1,76 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect, status
+from app import metrics, rate_limit, sessions, ws_protocol
+from app.chat_history import DEFAULT_ROOM, history
+from app.presence import presence
 from app.websockets import manager
 import json 
+import logging
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     tags=["Realtime"]
 )
 
+async def _replay_history(websocket: WebSocket):
+    """Sends a reconnecting client the messages after its `last_seq` query parameter (see `app.chat_history`)."""
+    try:
+        last_seq = int(websocket.query_params["last_seq"])
+    except (KeyError, ValueError):
+        return
+    if last_seq < 0:
+        # Sequence numbers start at 1; there is no position to replay from
+        return
+    missed, complete = await history.since(DEFAULT_ROOM, last_seq)
+    await manager.send(websocket, {"type": "history", "count": len(missed), "complete": complete})
+    for message in missed:
+        await manager.send(websocket, message)
+
 @router.websocket("/ws/realtime/{user_id}")
 async def websocket_endpoint(websocket: WebSocket, user_id: int):
+    # The path only names the user; the signed session cookie proves it. Without
+    # this check anyone could use up a user's connection cap and chat budget or
+    # mark them online.
+    session = await sessions.verify_session_token(websocket.cookies.get(sessions.SESSION_COOKIE_NAME))
+    if session is None or session.id != user_id:
+        logger.info("Unauthenticated WebSocket for user %s refused.", user_id, extra={"user_id": user_id})
+        metrics.WS_REJECTED_CONNECTIONS.labels("unauthenticated").inc()
+        # Accepted first, so browsers see the close code
+        await websocket.accept()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Not authenticated")
+        return
+
     # Register the connection
-    await manager.connect(websocket)
-    print(f"User {user_id} connected.")
+    codec = await manager.connect(websocket, user_id)
+    if codec is None:
+        logger.info("User %s refused by admission control.", user_id, extra={"user_id": user_id})
+        return
+    logger.info("User %s connected.", user_id, extra={"user_id": user_id})
+    await presence.connected(user_id)
 
     try:
+        await _replay_history(websocket)
+
         while True:
             # Listen for incoming messages ()
-            data = await websocket.receive_text()
+            data = await ws_protocol.receive(websocket, codec)
+            manager.touch(websocket)
+            if ws_protocol.is_pong(data):
+                continue
+            if not isinstance(data, str):
+                # MessagePack can carry maps, arrays or bytes; chat is text for every client
+                await manager.send(websocket, {"type": "error", "message": "Chat messages must be text."})
+                continue
+
+            retry_after = await rate_limit.limiter.hit([(rate_limit.CHAT, f"user:{user_id}")])
+            if retry_after:
+                # Drop the message but keep the connection; tell the sender when to retry
+                await manager.send(websocket, {
+                    "type": "error",
+                    "message": "You are sending messages too fast.",
+                    "retry_after": round(retry_after, 2)
+                })
+                continue
             
             message_payload = {
                 "type": "chat_message",
@@ -23,9 +78,18 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
                 "message": data
             }
             
-            await manager.broadcast(message_payload)
+            await manager.broadcast(await history.append(DEFAULT_ROOM, message_payload))
 
     except WebSocketDisconnect:
+        logger.info("User %s disconnected.", user_id, extra={"user_id": user_id})
+    finally:
+        # Also runs when the handler fails, so neither the manager (and its
+        # per-user cap) nor presence keeps a ghost connection
         manager.disconnect(websocket)
-        print(f"User {user_id} disconnected.")
-        await manager.broadcast({"type": "status", "message": f"User {user_id} left."})
\ No newline at end of file
+        await presence.disconnected(user_id)
+
+    # During a drain every user leaves; announcing each one would cost a broadcast per socket
+    if not manager.draining:
+        await manager.broadcast(await history.append(
+            DEFAULT_ROOM, {"type": "status", "message": f"User {user_id} left."}
+        ))
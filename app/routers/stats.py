@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from .. import crud
+from ..database import get_db
+from ..models import UserType
+
+router = APIRouter(
+    prefix="/api/stats",
+    tags=["Stats"]
+)
+
+class UserTypeStats(BaseModel):
+    user_type: UserType
+    users: int
+    total_balance: float
+    average_balance: float  # 0.0 when there are no users of this type
+
+class StatsResponse(BaseModel):
+    users: int
+    total_balance: float
+    average_balance: float
+    by_type: List[UserTypeStats]
+
+def _average(total: float, count: int) -> float:
+    return total / count if count else 0.0
+
+@router.get("", response_model=StatsResponse)
+async def read_stats(db: AsyncSession = Depends(get_db)):
+    """
+    Returns user counts and total and average balances, overall and per user type.
+
+    Read from the incrementally maintained per-type totals (one row per type),
+    never from a scan of the users table.
+    """
+    rows = sorted(await crud.get_user_type_stats(db), key=lambda row: list(UserType).index(row.user_type))
+    by_type = [
+        UserTypeStats(
+            user_type=row.user_type,
+            users=row.user_count,
+            total_balance=row.total_balance,
+            average_balance=_average(row.total_balance, row.user_count),
+        )
+        for row in rows
+    ]
+    users = sum(stats.users for stats in by_type)
+    total_balance = sum(stats.total_balance for stats in by_type)
+    return StatsResponse(
+        users=users,
+        total_balance=total_balance,
+        average_balance=_average(total_balance, users),
+        by_type=by_type,
+    )
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from pydantic import TypeAdapter
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from .. import crud, schemas, models
+from typing import Final, List, Optional
+from .. import crud, schemas, models, sessions, versions
 from ..database import get_db
 
 router = APIRouter(
@@ -10,6 +11,23 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+
+USERS_ADAPTER: Final[TypeAdapter] = TypeAdapter(List[schemas.User])
+"""Serializes user pages exactly as `response_model` would."""
+
+
+def _conditional_json(body: bytes, if_none_match: Optional[str]) -> Response:
+    """Answers a conditional GET: 304 if the client's ETag matches the body, else the body.
+
+    The ETag is a hash of the body itself, so it is right whichever worker
+    handled the last write; a 304 saves the transfer, not the database read.
+    """
+    etag = versions.content_etag(body)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if versions.etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @router.post("/", response_model=schemas.User, status_code=status.HTTP_201_CREATED)
 async def create_new_user(
     user: schemas.UserCreate, 
@@ -34,27 +52,32 @@ async def create_new_user(
 async def read_users(
     skip: int = 0, 
     limit: int = 100, 
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve a list of users.
+    Supports conditional requests: a matching `If-None-Match` gets an empty 304.
     """
     users = await crud.get_users(db, skip=skip, limit=limit)
-    return users
+    body = USERS_ADAPTER.dump_json(USERS_ADAPTER.validate_python(users, from_attributes=True))
+    return _conditional_json(body, if_none_match)
 
 
 @router.get("/{user_id}", response_model=schemas.User)
 async def read_user(
     user_id: int, 
+    if_none_match: Optional[str] = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
     """
     Retrieve a single user by ID.
+    Supports conditional requests like `GET /users/`.
     """
     db_user = await crud.get_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return db_user
+    return _conditional_json(schemas.User.model_validate(db_user).model_dump_json().encode(), if_none_match)
 
 
 @router.patch("/{user_id}", response_model=schemas.User)
@@ -82,6 +105,10 @@ async def update_existing_user(
         if db_user_nickname and db_user_nickname.id != user_id:
             raise HTTPException(status_code=400, detail="Nickname already taken")
 
+    # Session tokens carry the role; make the user log in again to pick it up
+    if user_update.user_type is not None or user_update.is_active is False:
+        await sessions.denylist.revoke_user(user_id)
+
     # Re-fetch the user to apply updates (crud.update_user)
     updated_user = await crud.get_user(db, user_id=user_id)
     return updated_user
@@ -98,4 +125,5 @@ async def delete_existing_user(
     db_user = await crud.delete_user(db, user_id=user_id)
     if db_user is None:
         raise HTTPException(status_code=404, detail="User not found")
+    await sessions.denylist.revoke_user(user_id)
     return db_user
@@ -1,13 +1,87 @@
 """
 Utility functions for password hashing and verification.
 
-This module utilizes the `passlib` library.
+This module utilizes the `passlib` library. It is imported, and the hashing
+context built, on the first hash or verification rather than at startup.
+
+Unless `PASSWORD_HASH_ROUNDS` is set, the bcrypt cost is calibrated on this
+host. It is the highest cost whose verification stays within
+`PASSWORD_HASH_TARGET_MS`, and never below `MIN_BCRYPT_ROUNDS`. Hashes made
+with a lower cost, or with a scheme other than `PASSWORD_HASH_SCHEME`, are
+reported by `needs_rehash()` and replaced on the user's next login.
+Hashing and verification take tens of milliseconds of CPU, so the async
+variants run them in the threadpool, off the event loop.
 """
-from passlib.context import CryptContext
-from typing import Final # Import for robust constant definition (optional but good practice)
+import functools
+import logging
+import math
+import time
+from typing import TYPE_CHECKING, Final
+
+from starlette.concurrency import run_in_threadpool
+
+from app.settings import settings
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+logger = logging.getLogger(__name__)
+
+MIN_BCRYPT_ROUNDS: Final[int] = 10
+"""Lowest bcrypt cost calibration may choose, however slow the host."""
 
-# Configuration for password hashing schemes.
-pwd_context: Final[CryptContext] = CryptContext(schemes=["bcrypt"], deprecated="auto")
+MAX_BCRYPT_ROUNDS: Final[int] = 31
+"""Highest cost bcrypt supports."""
+
+
+def calibrate_bcrypt_rounds(target_ms: float) -> int:
+    """Finds the bcrypt cost whose verification takes at most `target_ms` on this host.
+
+    Each extra round doubles the work, so one measurement at a cheap cost
+    is enough to extrapolate.
+
+    Args:
+        target_ms: The **verification time budget** in milliseconds.
+
+    Returns:
+        int: The cost, between `MIN_BCRYPT_ROUNDS` and `MAX_BCRYPT_ROUNDS`.
+    """
+    from passlib.hash import bcrypt
+    probe_rounds = 8
+    handler = bcrypt.using(rounds=probe_rounds)
+    sample = handler.hash("calibration")
+    elapsed = math.inf
+    for _ in range(3):
+        started = time.perf_counter()
+        handler.verify("calibration", sample)
+        elapsed = min(elapsed, time.perf_counter() - started)
+    rounds = probe_rounds + math.floor(math.log2(target_ms / 1000.0 / elapsed))
+    rounds = max(MIN_BCRYPT_ROUNDS, min(rounds, MAX_BCRYPT_ROUNDS))
+    logger.info(
+        "Calibrated bcrypt cost %d: about %.0f ms per verification (target %.0f ms).",
+        rounds, elapsed * 2 ** (rounds - probe_rounds) * 1000.0, target_ms
+    )
+    return rounds
+
+
+@functools.lru_cache(maxsize=None)
+def pwd_context() -> "CryptContext":
+    """Returns the password hashing context, created (and calibrated) on first use."""
+    from passlib.context import CryptContext
+    from passlib.hash import argon2
+
+    scheme = settings.PASSWORD_HASH_SCHEME
+    if scheme == "argon2" and not argon2.has_backend():
+        logger.warning("PASSWORD_HASH_SCHEME is argon2 but argon2-cffi is not installed; using bcrypt.")
+        scheme = "bcrypt"
+    rounds = settings.PASSWORD_HASH_ROUNDS or calibrate_bcrypt_rounds(settings.PASSWORD_HASH_TARGET_MS)
+    # bcrypt stays verifiable when it is not the default; "auto" then marks its hashes for migration
+    return CryptContext(
+        schemes=[scheme] if scheme == "bcrypt" else [scheme, "bcrypt"],
+        deprecated="auto",
+        bcrypt__rounds=rounds,
+        bcrypt__min_rounds=rounds,
+    )
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -22,7 +96,7 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     Returns:
         bool: **True** if the passwords match, **False** otherwise.
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    return pwd_context().verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
@@ -37,4 +111,19 @@ def get_password_hash(password: str) -> str:
     Returns:
         str: The **generated hashed password** (including algorithm, cost, and salt).
     """
-    return pwd_context.hash(password)
\ No newline at end of file
+    return pwd_context().hash(password)
+
+
+def needs_rehash(hashed_password: str) -> bool:
+    """Tells whether a stored hash uses an outdated scheme or a cost below the current one."""
+    return pwd_context().needs_update(hashed_password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """`verify_password`, run in the threadpool so the event loop keeps serving other requests."""
+    return await run_in_threadpool(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    """`get_password_hash`, run in the threadpool."""
+    return await run_in_threadpool(get_password_hash, password)
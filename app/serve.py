@@ -0,0 +1,201 @@
+"""
+Production server launcher: a pre-forking uvicorn.
+
+    python -m app.serve [--workers N] [--host H] [--port P] [--skip-setup]
+
+Unlike `uvicorn --workers`, which starts every worker from scratch, the
+parent process imports the application once, runs the one-time database
+setup, binds the listening socket, and then forks the workers. Imported
+modules, compiled templates and other state are therefore shared
+copy-on-write between workers. `gc.freeze()` keeps the collector from
+touching (and thereby copying) those shared pages later. A random session
+key (no `SECRET_KEY`) is shared by all workers too. State that must differ
+per worker, such as the presence worker id, is re-created in each child
+by `os.register_at_fork` hooks. Only one worker at a time runs the stats
+reconciler; when it dies, its replacement takes over.
+
+The parent only supervises: it forwards SIGTERM/SIGINT to the workers,
+which drain gracefully, and replaces workers that die unexpectedly.
+Server tuning (workers, event loop, HTTP parser, backlog, keep-alive,
+WebSocket limits) comes from `Settings`; see the `SERVER_*` entries.
+On platforms without `fork()`, or with one worker, the server runs in
+the launching process.
+"""
+import argparse
+import asyncio
+import gc
+import logging
+import math
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+
+from app import security
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def worker_count() -> int:
+    """Returns `SERVER_WORKERS`, or one worker per CPU when it is 0."""
+    return settings.SERVER_WORKERS or os.cpu_count() or 1
+
+
+def build_config(app: Any, host: Optional[str] = None, port: Optional[int] = None) -> uvicorn.Config:
+    """Builds the uvicorn configuration from `Settings`.
+
+    Args:
+        app: The **ASGI application** (already imported, not an import string).
+        host: Overrides `SERVER_HOST`.
+        port: Overrides `SERVER_PORT`.
+
+    Returns:
+        uvicorn.Config: The configuration shared by every worker.
+    """
+    return uvicorn.Config(
+        app,
+        host=host or settings.SERVER_HOST,
+        port=port or settings.SERVER_PORT,
+        loop=settings.SERVER_LOOP,
+        http=settings.SERVER_HTTP,
+        ws="app.ws_compression:CompressedWebSocketProtocol",
+        ws_max_size=settings.WS_MAX_MESSAGE_SIZE,
+        ws_max_queue=settings.SERVER_WS_MAX_QUEUE,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_SECONDS,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY or None,
+        # Room for the WebSocket drain and the lifespan shutdown (see app.main)
+        timeout_graceful_shutdown=math.ceil(settings.WS_DRAIN_SPREAD_SECONDS + settings.SHUTDOWN_TIMEOUT_SECONDS),
+        proxy_headers=True,
+    )
+
+
+async def _setup():
+    from app import init_db
+    from app.database import AsyncSessionLocal, engine
+    await init_db.run_app_setup(AsyncSessionLocal)
+    # Pooled connections must not be inherited by the forked workers
+    await engine.dispose()
+
+
+class Supervisor:
+    """Forks the workers and keeps `workers` of them running until told to stop."""
+
+    RESPAWN_DELAY: float = 1.0
+
+    def __init__(self, config: uvicorn.Config, sock: socket.socket, workers: int):
+        self.config = config
+        self.sock = sock
+        self.workers = workers
+        self.children: Dict[int, float] = {}  # pid -> start time
+        self.reconciler: Optional[int] = None  # pid of the worker running the stats reconciler
+        self.stopping = False
+
+    def spawn(self):
+        reconciles = self.reconciler is None
+        pid = os.fork()
+        if pid == 0:
+            # Workers reconciling concurrently would race to overwrite the same stats rows
+            settings.RUN_STATS_RECONCILER = reconciles
+            self._run_worker()
+        if reconciles:
+            self.reconciler = pid
+        self.children[pid] = time.monotonic()
+        logger.info("Started worker %d.", pid)
+
+    def _run_worker(self):
+        code = 0
+        try:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            gc.enable()
+            uvicorn.Server(self.config).run(sockets=[self.sock])
+        except BaseException:
+            logger.exception("Worker %d crashed.", os.getpid())
+            code = 1
+        finally:
+            # Never return into the parent's code (or run its atexit handlers)
+            os._exit(code)
+
+    def _on_signal(self, signum: int, frame: Any):
+        if not self.stopping:
+            logger.info("Received %s, stopping %d worker(s).", signal.Signals(signum).name, len(self.children))
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        for _ in range(self.workers):
+            self.spawn()
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self.children.pop(pid, None)
+            if pid == self.reconciler:
+                self.reconciler = None
+            if started is None or self.stopping:
+                continue
+            logger.error("Worker %d exited unexpectedly (status %d); replacing it.", pid, status)
+            # Avoid a fork loop when workers die right after starting
+            if time.monotonic() - started < self.RESPAWN_DELAY:
+                time.sleep(self.RESPAWN_DELAY)
+                # A SIGTERM during the delay must not fork a worker into the shutdown
+                if self.stopping:
+                    continue
+            self.spawn()
+        self.sock.close()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Run the application with pre-forked uvicorn workers.")
+    parser.add_argument("--host", help="bind address (default: SERVER_HOST)")
+    parser.add_argument("--port", type=int, help="bind port (default: SERVER_PORT)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: SERVER_WORKERS, 0 = one per CPU)")
+    parser.add_argument("--skip-setup", action="store_true", help="do not create and seed the database")
+    args = parser.parse_args(argv)
+
+    # Objects allocated from here on are shared with the workers; collecting them would copy pages
+    gc.disable()
+    logging.basicConfig(level=settings.LOG_LEVEL, format="%(levelname)s:     %(name)s: %(message)s")
+
+    from app.main import app
+
+    if settings.RUN_SETUP_ON_STARTUP and not args.skip_setup:
+        asyncio.run(_setup())
+    # Setup ran (at most) once, here; the workers' lifespans must not repeat it
+    settings.RUN_SETUP_ON_STARTUP = False
+    # Calibrate the password hash cost once, here, rather than in every worker
+    security.pwd_context()
+
+    config = build_config(app, host=args.host, port=args.port)
+    workers = args.workers if args.workers is not None else worker_count()
+    if workers <= 1 or not hasattr(os, "fork"):
+        gc.enable()
+        uvicorn.Server(config).run()
+        return
+
+    if settings.SESSION_DENYLIST_BACKEND != "redis":
+        logger.warning(
+            "SESSION_DENYLIST_BACKEND is %r: logouts and role changes are only enforced by the worker "
+            "that handles them. Use the redis backend with several workers.", settings.SESSION_DENYLIST_BACKEND
+        )
+    sock = config.bind_socket()
+    gc.freeze()
+    logger.info("Forking %d workers (pid %d, loop=%s, http=%s).", workers, os.getpid(), config.loop, config.http)
+    Supervisor(config, sock, workers).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
-from app import crud, models 
+from typing import List, Optional
+from markupsafe import Markup
+import time
+from app import crud, models, versions
+from app.settings import settings
+from app.templating import templates
 
 async def get_sorted_leaderboard_users(db: AsyncSession, limit: int = 10) -> List[models.User]:
     """Fetches users and sorts them by balance for the leaderboard.
@@ -20,3 +24,57 @@ async def get_sorted_leaderboard_users(db: AsyncSession, limit: int = 10) -> Lis
     sorted_users = sorted(users, key=lambda user: user.balance, reverse=True)
     
     return sorted_users
+
+
+class LeaderboardFragmentCache:
+    """Holds the rendered leaderboard HTML and the user version it was built from.
+
+    Attributes:
+        version (Optional[int]): The `versions.users.collection` value the
+            fragment was rendered at, or None before the first render.
+        rendered_at (float): `time.monotonic()` of the render.
+        html (Markup): The rendered `_leaderboard.html` fragment.
+    """
+
+    def __init__(self):
+        self.version: Optional[int] = None
+        self.rendered_at: float = 0.0
+        self.html: Markup = Markup("")
+
+
+leaderboard_fragment = LeaderboardFragmentCache()
+
+
+async def render_leaderboard_fragment(db: AsyncSession) -> Markup:
+    """Returns the leaderboard HTML, re-rendering it after a user write or when it expires.
+
+    The leaderboard is the same for every viewer, so it is rendered once
+    per user-collection version and reused until a user is created,
+    updated or deleted. A cache hit skips both the query and the render.
+    The version only counts this worker's writes, so the fragment is also
+    re-rendered after `LEADERBOARD_CACHE_TTL_SECONDS`. That bounds how long
+    other workers' writes go unseen.
+
+    Args:
+        db (AsyncSession): The database session, used on a cache miss.
+
+    Returns:
+        Markup: The rendered fragment, safe to splice into a page.
+    """
+    version = versions.users.collection
+    now = time.monotonic()
+    if (
+        leaderboard_fragment.version == version
+        and now - leaderboard_fragment.rendered_at < settings.LEADERBOARD_CACHE_TTL_SECONDS
+    ):
+        return leaderboard_fragment.html
+
+    users = await get_sorted_leaderboard_users(db)
+    html = Markup(templates.get_template("_leaderboard.html").render(users=users))
+
+    # Stored under the version read *before* the query: a write racing with
+    # the render leaves the entry stale, and the next request re-renders.
+    leaderboard_fragment.version = version
+    leaderboard_fragment.rendered_at = now
+    leaderboard_fragment.html = html
+    return html
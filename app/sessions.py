@@ -0,0 +1,273 @@
+"""
+Signed, stateless session tokens.
+
+A session token carries the user's id, nickname, type and expiry, signed
+with HMAC-SHA256. Verifying it is a few microseconds of hashing and needs
+no database access. Revoked tokens (logout) and revoked users (deletion,
+role changes) are tracked in a denylist whose entries expire together with
+the tokens they block.
+
+With `SESSION_DENYLIST_BACKEND=redis` the denylist is shared, so a
+revocation takes effect on every worker. The default in-memory list only
+covers the worker that made the revocation; deployments running several
+workers (`app.serve`) should use Redis. While Redis is unreachable, each
+worker falls back to the revocations it made itself.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import secrets
+import time
+from typing import Dict, Final, Optional
+
+from fastapi import Cookie
+
+from .models import UserType
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+SESSION_COOKIE_NAME: Final[str] = "user_id"
+"""Name of the session cookie (kept from the original raw user-id cookie)."""
+
+TOKEN_VERSION: Final[str] = "v1"
+"""Prefix identifying the token format, allowing future format changes."""
+
+
+def _load_secret_key() -> bytes:
+    """Returns the signing key, generating a per-process one if none is configured."""
+    if settings.SECRET_KEY:
+        return settings.SECRET_KEY.encode()
+    logger.warning(
+        "SECRET_KEY is not set; using a random signing key. Sessions will not "
+        "survive a restart or be shared between independently started processes."
+    )
+    return secrets.token_bytes(32)
+
+
+_SECRET_KEY: Final[bytes] = _load_secret_key()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(message: bytes) -> bytes:
+    return hmac.new(_SECRET_KEY, message, hashlib.sha256).digest()
+
+# --- Session ---
+
+class Session:
+    """
+    The verified contents of a session token.
+
+    Exposes `id` and `nickname` like `models.User`, so templates written
+    against a user object can render a session directly.
+    """
+
+    __slots__ = ("id", "nickname", "user_type", "issued_at", "expires_at", "token_id")
+
+    def __init__(
+        self,
+        user_id: int,
+        nickname: str,
+        user_type: UserType,
+        issued_at: float,
+        expires_at: int,
+        token_id: str
+    ):
+        self.id = user_id
+        self.nickname = nickname
+        self.user_type = user_type
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+        self.token_id = token_id
+
+# --- Denylist ---
+
+class RedisDenylist:
+    """The shared denylist: one expiring key per revoked token and per revoked user."""
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.Redis.from_url(url)
+
+    async def revoke(self, token_id: str, expires_at: int):
+        ttl = expires_at - int(time.time())
+        if ttl > 0:
+            await self._redis.set(f"session:revoked:token:{token_id}", 1, ex=ttl)
+
+    async def revoke_user(self, user_id: int, revoked_at: float):
+        # Tokens issued before `revoked_at` are all expired once SESSION_MAX_AGE_SECONDS have passed
+        await self._redis.set(f"session:revoked:user:{user_id}", revoked_at, ex=settings.SESSION_MAX_AGE_SECONDS)
+
+    async def is_revoked(self, session: Session) -> bool:
+        token, revoked_at = await self._redis.mget(
+            f"session:revoked:token:{session.token_id}", f"session:revoked:user:{session.id}"
+        )
+        return token is not None or (revoked_at is not None and session.issued_at <= float(revoked_at))
+
+    async def close(self):
+        await self._redis.aclose()
+
+
+class SessionDenylist:
+    """
+    Revocation list for session tokens and users.
+
+    Token entries are kept until the token would have expired anyway; user
+    entries reject every token issued before the revocation time. Entries
+    are always recorded in this process (pruned lazily on write) and, with
+    `SESSION_DENYLIST_BACKEND=redis`, in Redis for the other workers.
+    """
+
+    def __init__(self):
+        self._tokens: Dict[str, int] = {}
+        self._users: Dict[int, float] = {}
+        self._redis: Optional[RedisDenylist] = None
+        self._redis_down_until = 0.0
+
+    def _backend(self) -> Optional[RedisDenylist]:
+        if settings.SESSION_DENYLIST_BACKEND != "redis" or time.monotonic() < self._redis_down_until:
+            return None
+        if self._redis is None:
+            self._redis = RedisDenylist(settings.REDIS_URL)
+        return self._redis
+
+    def _backend_failed(self, e: Exception):
+        self._redis_down_until = time.monotonic() + 5.0
+        logger.warning("Session denylist store unavailable, using this worker's revocations only: %s", e)
+
+    async def revoke(self, session: Session):
+        """Rejects this specific token from now on (e.g. after logout)."""
+        self._prune()
+        self._tokens[session.token_id] = session.expires_at
+        backend = self._backend()
+        if backend is not None:
+            try:
+                await backend.revoke(session.token_id, session.expires_at)
+            except Exception as e:
+                self._backend_failed(e)
+
+    async def revoke_user(self, user_id: int):
+        """Rejects every token issued to `user_id` up to now."""
+        self._prune()
+        revoked_at = self._users[user_id] = time.time()
+        backend = self._backend()
+        if backend is not None:
+            try:
+                await backend.revoke_user(user_id, revoked_at)
+            except Exception as e:
+                self._backend_failed(e)
+
+    async def is_revoked(self, session: Session) -> bool:
+        """Tells whether the token or its user was revoked, by any worker when Redis is used."""
+        if session.token_id in self._tokens:
+            return True
+        revoked_at = self._users.get(session.id)
+        if revoked_at is not None and session.issued_at <= revoked_at:
+            return True
+        backend = self._backend()
+        if backend is not None:
+            try:
+                return await backend.is_revoked(session)
+            except Exception as e:
+                self._backend_failed(e)
+        return False
+
+    async def close(self):
+        """Closes the Redis connection, if one was opened."""
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    def _prune(self):
+        now = time.time()
+        self._tokens = {jti: exp for jti, exp in self._tokens.items() if exp > now}
+        horizon = now - settings.SESSION_MAX_AGE_SECONDS
+        self._users = {uid: ts for uid, ts in self._users.items() if ts > horizon}
+
+
+denylist: Final[SessionDenylist] = SessionDenylist()
+"""The process-wide session denylist."""
+
+# --- Tokens ---
+
+def create_session_token(user_id: int, nickname: str, user_type: UserType) -> str:
+    """Issues a signed session token for a user.
+
+    Args:
+        user_id: The **id** of the authenticated user.
+        nickname: The user's nickname, shown on the pages without a lookup.
+        user_type: The user's role, used for authorization checks.
+
+    Returns:
+        str: The token, `v1.<payload>.<signature>`, safe to use as a cookie value.
+    """
+    now = time.time()
+    payload = {
+        "sub": user_id,
+        "nck": nickname,
+        "typ": user_type.value,
+        # Milliseconds, so a user revocation only catches tokens issued up to that moment
+        "iat": int(now * 1000),
+        "exp": int(now) + settings.SESSION_MAX_AGE_SECONDS,
+        "jti": secrets.token_urlsafe(12),
+    }
+    body = f"{TOKEN_VERSION}.{_b64encode(json.dumps(payload, separators=(',', ':')).encode())}"
+    return f"{body}.{_b64encode(_sign(body.encode()))}"
+
+
+async def verify_session_token(token: Optional[str]) -> Optional[Session]:
+    """Verifies a session token without touching the database.
+
+    The signature and expiry are checked locally; with the Redis denylist,
+    a valid token costs one Redis round trip for the revocation check.
+
+    Args:
+        token: The raw cookie value (may be missing or malformed).
+
+    Returns:
+        Optional[Session]: The session, or None if the token is malformed,
+        forged, expired or revoked.
+    """
+    if not token:
+        return None
+    try:
+        version, payload_b64, signature_b64 = token.split(".")
+        if version != TOKEN_VERSION:
+            return None
+        expected = _sign(f"{version}.{payload_b64}".encode())
+        if not hmac.compare_digest(expected, _b64decode(signature_b64)):
+            return None
+        payload = json.loads(_b64decode(payload_b64))
+        session = Session(
+            user_id=int(payload["sub"]),
+            nickname=payload["nck"],
+            user_type=UserType(payload["typ"]),
+            issued_at=int(payload["iat"]) / 1000.0,
+            expires_at=int(payload["exp"]),
+            token_id=payload["jti"],
+        )
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    if session.expires_at <= time.time() or await denylist.is_revoked(session):
+        return None
+    return session
+
+
+async def get_session(user_id: Optional[str] = Cookie(None)) -> Optional[Session]:
+    """
+    Dependency returning the verified session of the request, if any.
+
+    The parameter name matches `SESSION_COOKIE_NAME`, which is how FastAPI
+    finds the cookie.
+    """
+    return await verify_session_token(user_id)
@@ -9,12 +9,170 @@ class Settings(BaseSettings):
         APP_VERSION (str) = The current version of the application.
         DATABASE_URL (str): The connection string for the primary database.
         REDIS_URL (str): The connection string for the Redis instance.
+        LOG_LEVEL (str): The root log level (e.g. "INFO", "DEBUG").
+        LOG_LEVELS (str): Per-module level overrides, as comma-separated
+            "logger=LEVEL" pairs (e.g. "app.routers.realtime=WARNING").
+        LOG_JSON (bool): Emit structured JSON log lines instead of plain text.
+        PROFILING_ENABLED (bool): Turns the request profiling middleware on.
+        PROFILING_MODE (str): "cprofile" (pstats output) or "sampling"
+            (stack sampling, folded-stack output).
+        PROFILING_SAMPLE_RATE (float): Fraction of requests to profile (0.0-1.0).
+        PROFILING_SLOW_THRESHOLD_MS (float): When > 0, also keep profiles of
+            requests slower than this many milliseconds.
+        PROFILING_SAMPLING_INTERVAL_MS (float): Stack sampling period in sampling mode.
+        PROFILING_BUFFER_SIZE (int): How many recent profiles are kept.
+        SECRET_KEY (str): Key used to sign session tokens. Must be set (and shared
+            by all workers) in production; a random key is used when empty.
+        SESSION_MAX_AGE_SECONDS (int): Lifetime of a session token and its cookie.
+        PASSWORD_HASH_SCHEME (str): `bcrypt`, or `argon2` (memory-hard, needs
+            argon2-cffi). Existing hashes of the other scheme are migrated on login.
+        PASSWORD_HASH_ROUNDS (int): bcrypt cost; 0 calibrates it on startup to
+            PASSWORD_HASH_TARGET_MS.
+        PASSWORD_HASH_TARGET_MS (float): Verification time the calibrated bcrypt
+            cost aims for on this host.
+        JINJA_BYTECODE_CACHE_DIR (str): Directory for compiled template bytecode,
+            shared by worker processes (empty disables the on-disk cache).
+        LEADERBOARD_CACHE_TTL_SECONDS (float): Longest time the rendered leaderboard is
+            reused; bounds how stale it gets after writes handled by other workers.
+        GAME_BATCH_MAX_ROUNDS (int): Maximum number of rounds accepted by one
+            batch play request.
+        IDEMPOTENCY_ENABLED (bool): Honour `Idempotency-Key` headers on mutating requests.
+        IDEMPOTENCY_BACKEND (str): Where responses are stored: `memory` (per process)
+            or `redis` (shared, uses REDIS_URL).
+        IDEMPOTENCY_TTL_SECONDS (int): How long a stored response can be replayed.
+        IDEMPOTENCY_MAX_ENTRIES (int): Capacity of the in-memory LRU store.
+        IDEMPOTENCY_WAIT_TIMEOUT_SECONDS (float): How long a duplicate waits for the
+            in-flight original before getting a 409.
+        RATE_LIMIT_ENABLED (bool): Enforce the request rate limits below.
+        RATE_LIMIT_BACKEND (str): Where token buckets live: `memory` (per process)
+            or `redis` (shared, uses REDIS_URL).
+        RATE_LIMIT_LOGIN (str): Login attempts per client IP, as `<requests>/<seconds>`.
+        RATE_LIMIT_GAME (str): Game plays per client IP and per user.
+        RATE_LIMIT_CHAT (str): Chat messages per WebSocket user.
+        WS_COMPRESSION_ENABLED (bool): Negotiate permessage-deflate (requires the
+            `app.ws_compression` uvicorn protocol).
+        WS_COMPRESSION_MIN_SIZE (int): Messages shorter than this many bytes are sent
+            uncompressed.
+        WS_COMPRESSION_SERVER_MAX_WINDOW_BITS (int): LZ77 window (9-15) for outgoing
+            messages; smaller windows use less memory per connection.
+        WS_COMPRESSION_CLIENT_MAX_WINDOW_BITS (int): LZ77 window (8-15) requested from clients.
+        WS_COMPRESSION_MEM_LEVEL (int): zlib memLevel (1-9) of the per-connection compressor.
+        WS_MAX_MESSAGE_SIZE (int): Largest inbound WebSocket message in bytes; larger
+            ones close the connection with code 1009.
+        WS_HEARTBEAT_INTERVAL_SECONDS (float): How often the server pings every
+            WebSocket connection (0 disables heartbeats and reaping).
+        WS_HEARTBEAT_MAX_MISSED (int): Connections silent for this many heartbeat
+            intervals are considered dead and closed.
+        WS_HEARTBEAT_SEND_TIMEOUT_SECONDS (float): Longest a heartbeat ping may wait on
+            one connection's send; connections that time out are closed.
+        WS_ADMISSION_ENABLED (bool): Enforce the WebSocket connection caps and accept rate below.
+        WS_MAX_CONNECTIONS (int): WebSocket connections per worker; keep well below
+            the process file-descriptor limit (`ulimit -n`).
+        WS_MAX_CONNECTIONS_PER_USER (int): Simultaneous WebSocket connections per user (per worker).
+        WS_ACCEPT_RATE (str): New WebSocket connections accepted per worker, as
+            `<connections>/<seconds>`.
+        WS_RETRY_AFTER_SECONDS (float): Base retry delay suggested to refused clients
+            (jittered up to twice as long).
+        PRESENCE_BACKEND (str): Where online users are tracked: `memory` (this worker
+            only) or `redis` (all workers, uses REDIS_URL; needs heartbeats).
+        WS_DRAIN_SPREAD_SECONDS (float): On shutdown, open WebSockets are closed
+            (1012, with a jittered retry-after) evenly over this many seconds.
+        SHUTDOWN_TIMEOUT_SECONDS (float): Deadline for draining sockets and finishing
+            background tasks on shutdown.
+        LOOP_MONITOR_ENABLED (bool): Measure event-loop lag and report blocking code
+            (see `app.loop_monitor`).
+        LOOP_MONITOR_INTERVAL_SECONDS (float): Period of the lag-measuring timer.
+        LOOP_MONITOR_SLOW_THRESHOLD_SECONDS (float): Log the loop's stack when it is
+            blocked longer than this (0 disables the watchdog thread).
+        RUN_SETUP_ON_STARTUP (bool): Create and seed the database in the application
+            lifespan. `app.serve` runs the setup once in its parent process instead.
+        SERVER_HOST (str): Bind address used by `app.serve`.
+        SERVER_PORT (int): Bind port used by `app.serve`.
+        SERVER_WORKERS (int): Worker processes forked by `app.serve` (0 = one per CPU).
+        SERVER_LOOP (str): Event loop: "auto" (uvloop when installed), "uvloop" or "asyncio".
+        SERVER_HTTP (str): HTTP parser: "auto" (httptools when installed), "httptools" or "h11".
+        SERVER_BACKLOG (int): Listen backlog of the shared socket.
+        SERVER_KEEP_ALIVE_SECONDS (int): How long idle HTTP keep-alive connections are kept.
+        SERVER_LIMIT_CONCURRENCY (int): Connections per worker beyond which requests get
+            503 (0 = unlimited).
+        SERVER_WS_MAX_QUEUE (int): Inbound WebSocket messages buffered per connection.
+        CHAT_HISTORY_SIZE (int): Recent chat messages kept per room for replay on reconnect.
+        CHAT_HISTORY_BACKEND (str): Where sequence numbers and history live: `memory`
+            (per worker) or `redis` (shared capped stream, uses REDIS_URL).
+        SESSION_DENYLIST_BACKEND (str): Where session revocations live: `memory` (they
+            only reach the worker that made them) or `redis` (every worker, uses REDIS_URL).
+        STATS_RECONCILE_INTERVAL_SECONDS (float): How often the per-type user totals
+            behind `GET /api/stats` are checked against a full recompute (0 disables).
+        RUN_STATS_RECONCILER (bool): Run that check in this process. `app.serve` leaves
+            it on in exactly one of its workers.
     """
     APP_TITLE: str = "live-loss API"
     APP_DESCRIPTION: str = "live-Loss project"
     APP_VERSION: str = "0.1.0"
     DATABASE_URL: str = ""
     REDIS_URL: str = ""
+    LOG_LEVEL: str = "INFO"
+    LOG_LEVELS: str = ""
+    LOG_JSON: bool = True
+    PROFILING_ENABLED: bool = False
+    PROFILING_MODE: str = "cprofile"
+    PROFILING_SAMPLE_RATE: float = 0.0
+    PROFILING_SLOW_THRESHOLD_MS: float = 0.0
+    PROFILING_SAMPLING_INTERVAL_MS: float = 5.0
+    PROFILING_BUFFER_SIZE: int = 20
+    SECRET_KEY: str = ""
+    SESSION_MAX_AGE_SECONDS: int = 60 * 60 * 24
+    PASSWORD_HASH_SCHEME: str = "bcrypt"
+    PASSWORD_HASH_ROUNDS: int = 0
+    PASSWORD_HASH_TARGET_MS: float = 50.0
+    JINJA_BYTECODE_CACHE_DIR: str = ".jinja_cache"
+    LEADERBOARD_CACHE_TTL_SECONDS: float = 2.0
+    GAME_BATCH_MAX_ROUNDS: int = 1000
+    IDEMPOTENCY_ENABLED: bool = True
+    IDEMPOTENCY_BACKEND: str = "memory"
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+    IDEMPOTENCY_MAX_ENTRIES: int = 10_000
+    IDEMPOTENCY_WAIT_TIMEOUT_SECONDS: float = 10.0
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_LOGIN: str = "10/60"
+    RATE_LIMIT_GAME: str = "120/60"
+    RATE_LIMIT_CHAT: str = "20/10"
+    WS_COMPRESSION_ENABLED: bool = True
+    WS_COMPRESSION_MIN_SIZE: int = 256
+    WS_COMPRESSION_SERVER_MAX_WINDOW_BITS: int = 12
+    WS_COMPRESSION_CLIENT_MAX_WINDOW_BITS: int = 12
+    WS_COMPRESSION_MEM_LEVEL: int = 5
+    WS_MAX_MESSAGE_SIZE: int = 64 * 1024
+    WS_HEARTBEAT_INTERVAL_SECONDS: float = 25.0
+    WS_HEARTBEAT_MAX_MISSED: int = 2
+    WS_HEARTBEAT_SEND_TIMEOUT_SECONDS: float = 5.0
+    WS_ADMISSION_ENABLED: bool = True
+    WS_MAX_CONNECTIONS: int = 5000
+    WS_MAX_CONNECTIONS_PER_USER: int = 5
+    WS_ACCEPT_RATE: str = "100/1"
+    WS_RETRY_AFTER_SECONDS: float = 5.0
+    PRESENCE_BACKEND: str = "memory"
+    WS_DRAIN_SPREAD_SECONDS: float = 5.0
+    SHUTDOWN_TIMEOUT_SECONDS: float = 15.0
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.1
+    LOOP_MONITOR_SLOW_THRESHOLD_SECONDS: float = 0.1
+    RUN_SETUP_ON_STARTUP: bool = True
+    SERVER_HOST: str = "127.0.0.1"
+    SERVER_PORT: int = 8000
+    SERVER_WORKERS: int = 0
+    SERVER_LOOP: str = "auto"
+    SERVER_HTTP: str = "auto"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_SECONDS: int = 5
+    SERVER_LIMIT_CONCURRENCY: int = 0
+    SERVER_WS_MAX_QUEUE: int = 32
+    CHAT_HISTORY_SIZE: int = 200
+    CHAT_HISTORY_BACKEND: str = "memory"
+    SESSION_DENYLIST_BACKEND: str = "memory"
+    STATS_RECONCILE_INTERVAL_SECONDS: float = 3600.0
+    RUN_STATS_RECONCILER: bool = True
 
     class Config:
         pass
@@ -0,0 +1,313 @@
+"""
+Offline Monte Carlo simulation of the "Feel Lucky" game economics.
+
+Replays the game's rules (`BONUS_AMOUNT`, `EMOJIS_COUNT` and the uniform
+server draw from `app.routers.feel_lucky_game`) for populations of
+simulated players, one per `UserType`, and reports the expected payout,
+its variance, the distribution of player results and bankroll drawdowns,
+and the house P&L. Draws are NumPy-vectorized over blocks of players and
+the blocks are spread over a process pool.
+
+    python -m app.simulation --rounds 100000000 [--stake 20] [--json out.json]
+
+From Python:
+
+    from app import simulation
+    report = simulation.simulate(10_000_000, stake=20.0)
+    print(report.to_dict())
+
+The game currently charges nothing per round, so with the default
+`stake=0` players can only gain and drawdowns are zero; pass a stake to
+evaluate pricing.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Final, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.models import UserType
+
+BLOCK_ROUNDS: Final[int] = 4_000_000
+"""Approximate number of rounds drawn per vectorized block (bounds worker memory)."""
+
+PERCENTILES: Final[Tuple[float, ...]] = (50.0, 90.0, 99.0)
+"""Percentiles reported for player results and drawdowns."""
+
+# --- Model ---
+
+class GameRules(NamedTuple):
+    """The parameters of one game round."""
+    bonus_amount: float
+    emojis_count: int
+    stake: float = 0.0
+    """Amount charged per round (the live game charges nothing)."""
+
+    @property
+    def win_probability(self) -> float:
+        return 1.0 / self.emojis_count
+
+    @property
+    def expected_payout(self) -> float:
+        """Theoretical expected net payout to the player per round."""
+        return self.bonus_amount * self.win_probability - self.stake
+
+    @property
+    def payout_variance(self) -> float:
+        """Theoretical variance of the per-round payout."""
+        p = self.win_probability
+        return self.bonus_amount ** 2 * p * (1 - p)
+
+
+def current_rules(stake: float = 0.0) -> GameRules:
+    """Returns the rules the live game is configured with."""
+    # Imported lazily so worker processes never load the web stack
+    from app.routers import feel_lucky_game
+    return GameRules(feel_lucky_game.BONUS_AMOUNT, feel_lucky_game.EMOJIS_COUNT, stake)
+
+
+class Population(NamedTuple):
+    """A group of simulated players sharing a `UserType` and a play pattern."""
+    user_type: UserType
+    share: float
+    """Fraction of all simulated rounds played by this population."""
+    rounds_per_player: int
+    starting_balance: float = 0.0
+
+
+DEFAULT_POPULATIONS: Final[Tuple[Population, ...]] = (
+    Population(UserType.NORMAL, share=0.6, rounds_per_player=50),
+    Population(UserType.PREMIUM, share=0.3, rounds_per_player=200, starting_balance=1000.0),
+    Population(UserType.PROFESSIONAL_GAMBLER, share=0.1, rounds_per_player=2000, starting_balance=5000.0),
+)
+"""Assumed play patterns; adjust them to match observed traffic."""
+
+# --- Workers ---
+
+def _simulate_block(
+    rules: GameRules,
+    players: int,
+    rounds_per_player: int,
+    seed: np.random.SeedSequence
+) -> Tuple[int, np.ndarray, np.ndarray, np.ndarray]:
+    """Plays `players` full sessions in one vectorized pass.
+
+    Returns:
+        Tuple: The number of wins, and per player the final net result, the
+        maximum drawdown and the lowest point of the running result.
+    """
+    rng = np.random.default_rng(seed)
+    # The bonus index is uniform, so any fixed player choice wins with probability 1/N;
+    # draw in the narrowest dtype that holds every index (uint8 up to 256 emojis)
+    dtype = np.min_scalar_type(rules.emojis_count - 1)
+    wins = rng.integers(0, rules.emojis_count, size=(players, rounds_per_player), dtype=dtype) == 0
+    cumulative_wins = np.cumsum(wins, axis=1, dtype=np.int32)
+    net = cumulative_wins * rules.bonus_amount - np.arange(1, rounds_per_player + 1) * rules.stake
+    # Include the starting point (net 0) so a losing first round counts as drawdown
+    peak = np.maximum(np.maximum.accumulate(net, axis=1), 0.0)
+    drawdown = (peak - net).max(axis=1)
+    low = np.minimum(net.min(axis=1), 0.0)
+    return int(cumulative_wins[:, -1].sum()), net[:, -1], drawdown, low
+
+
+class _Job(NamedTuple):
+    population: int
+    players: int
+    seed: np.random.SeedSequence
+
+
+def _run_job(rules: GameRules, rounds_per_player: int, job: _Job):
+    return job.population, _simulate_block(rules, job.players, rounds_per_player, job.seed)
+
+
+def _plan_jobs(
+    populations: Sequence[Population],
+    total_rounds: int,
+    seed: Optional[int]
+) -> Tuple[List[int], List[_Job]]:
+    """Splits every population into blocks of about BLOCK_ROUNDS rounds."""
+    root = np.random.SeedSequence(seed)
+    players_per_population, jobs = [], []
+    for index, population in enumerate(populations):
+        players = max(1, int(total_rounds * population.share) // population.rounds_per_player)
+        players_per_population.append(players)
+        block = max(1, BLOCK_ROUNDS // population.rounds_per_player)
+        for start in range(0, players, block):
+            jobs.append(_Job(index, min(block, players - start), root.spawn(1)[0]))
+    return players_per_population, jobs
+
+# --- Report ---
+
+class PopulationResult:
+    """Aggregated outcome of one population."""
+
+    def __init__(self, population: Population, rules: GameRules, players: int):
+        self.population = population
+        self.rules = rules
+        self.players = players
+        self.rounds = players * population.rounds_per_player
+        self.wins = 0
+        self._finals: List[np.ndarray] = []
+        self._drawdowns: List[np.ndarray] = []
+        self._lows: List[np.ndarray] = []
+
+    def add(self, wins: int, finals: np.ndarray, drawdowns: np.ndarray, lows: np.ndarray):
+        self.wins += wins
+        self._finals.append(finals)
+        self._drawdowns.append(drawdowns)
+        self._lows.append(lows)
+
+    def to_dict(self) -> Dict[str, Any]:
+        finals = np.concatenate(self._finals)
+        drawdowns = np.concatenate(self._drawdowns)
+        lows = np.concatenate(self._lows)
+        win_rate = self.wins / self.rounds
+        player_net = float(finals.sum())
+        return {
+            "user_type": self.population.user_type.value,
+            "players": self.players,
+            "rounds": self.rounds,
+            "rounds_per_player": self.population.rounds_per_player,
+            "win_rate": win_rate,
+            "expected_payout": self.rules.bonus_amount * win_rate - self.rules.stake,
+            "payout_variance": self.rules.bonus_amount ** 2 * win_rate * (1 - win_rate),
+            "player_result": {
+                "mean": float(finals.mean()),
+                "std": float(finals.std()),
+                **{f"p{p:g}": float(v) for p, v in zip(PERCENTILES, np.percentile(finals, PERCENTILES))},
+            },
+            "drawdown": {
+                **{f"p{p:g}": float(v) for p, v in zip(PERCENTILES, np.percentile(drawdowns, PERCENTILES))},
+                "max": float(drawdowns.max()),
+            },
+            # Players whose balance would have gone negative at some point
+            "ruin_probability": float(np.mean(self.population.starting_balance + lows < 0)),
+            "house_pnl": -player_net,
+        }
+
+
+class SimulationReport:
+    """The results of a simulation run."""
+
+    def __init__(self, rules: GameRules, results: List[PopulationResult], elapsed: float, workers: int):
+        self.rules = rules
+        self.results = results
+        self.elapsed = elapsed
+        self.workers = workers
+
+    def to_dict(self) -> Dict[str, Any]:
+        populations = [result.to_dict() for result in self.results]
+        rounds = sum(p["rounds"] for p in populations)
+        return {
+            "rules": {
+                **self.rules._asdict(),
+                "expected_payout": self.rules.expected_payout,
+                "payout_variance": self.rules.payout_variance,
+            },
+            "rounds": rounds,
+            "elapsed_s": round(self.elapsed, 3),
+            "rounds_per_s": round(rounds / self.elapsed) if self.elapsed else 0,
+            "workers": self.workers,
+            "house_pnl": sum(p["house_pnl"] for p in populations),
+            "populations": populations,
+        }
+
+# --- Entry Points ---
+
+def simulate(
+    total_rounds: int,
+    populations: Sequence[Population] = DEFAULT_POPULATIONS,
+    rules: Optional[GameRules] = None,
+    stake: float = 0.0,
+    workers: Optional[int] = None,
+    seed: Optional[int] = None
+) -> SimulationReport:
+    """Runs the Monte Carlo simulation.
+
+    Args:
+        total_rounds: The **number of rounds** to simulate across all populations.
+        populations: The player populations and their share of the rounds.
+        rules: The game rules; defaults to the live game's rules with `stake`.
+        stake: The per-round charge used when `rules` is not given.
+        workers: Worker processes (default: CPU count; 1 runs in-process).
+        seed: Seed for reproducible runs.
+
+    Returns:
+        SimulationReport: Per-population and overall results.
+    """
+    rules = rules or current_rules(stake)
+    workers = workers or os.cpu_count() or 1
+    players, jobs = _plan_jobs(populations, total_rounds, seed)
+    results = [PopulationResult(p, rules, n) for p, n in zip(populations, players)]
+
+    start = time.perf_counter()
+    if workers == 1:
+        outcomes = (_run_job(rules, populations[job.population].rounds_per_player, job) for job in jobs)
+        for index, block in outcomes:
+            results[index].add(*block)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(_run_job, rules, populations[job.population].rounds_per_player, job)
+                for job in jobs
+            ]
+            for future in futures:
+                index, block = future.result()
+                results[index].add(*block)
+    return SimulationReport(rules, results, time.perf_counter() - start, workers)
+
+
+def _print_report(report: Dict[str, Any]):
+    rules = report["rules"]
+    print(
+        f"{report['rounds']:,} rounds in {report['elapsed_s']}s "
+        f"({report['rounds_per_s']:,} rounds/s, {report['workers']} workers)"
+    )
+    print(
+        f"bonus={rules['bonus_amount']} emojis={rules['emojis_count']} stake={rules['stake']} "
+        f"E[payout]={rules['expected_payout']:.4f} Var={rules['payout_variance']:.2f}"
+    )
+    header = f"{'user type':<22}{'players':>10}{'E[payout]':>11}{'p50 result':>12}{'p99 drawdown':>14}{'ruin':>8}{'house P&L':>16}"
+    print(header)
+    print("-" * len(header))
+    for p in report["populations"]:
+        print(
+            f"{p['user_type']:<22}{p['players']:>10,}{p['expected_payout']:>11.4f}"
+            f"{p['player_result']['p50']:>12.2f}{p['drawdown']['p99']:>14.2f}"
+            f"{p['ruin_probability']:>8.2%}{p['house_pnl']:>16,.2f}"
+        )
+    print(f"{'total':<22}{'':>10}{'':>11}{'':>12}{'':>14}{'':>8}{report['house_pnl']:>16,.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.simulation", description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=100_000_000, help="total rounds to simulate")
+    parser.add_argument("--bonus", type=float, default=None, help="override BONUS_AMOUNT")
+    parser.add_argument("--emojis", type=int, default=None, help="override EMOJIS_COUNT")
+    parser.add_argument("--stake", type=float, default=0.0, help="amount charged per round")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--json", dest="json_path", default=None, help="also write the report to this file")
+    args = parser.parse_args(argv)
+    if args.emojis is not None and args.emojis < 1:
+        parser.error("--emojis must be at least 1")
+
+    live = current_rules(args.stake)
+    rules = live._replace(
+        bonus_amount=live.bonus_amount if args.bonus is None else args.bonus,
+        emojis_count=live.emojis_count if args.emojis is None else args.emojis,
+    )
+    report = simulate(args.rounds, rules=rules, workers=args.workers, seed=args.seed).to_dict()
+    _print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -91,6 +91,10 @@ document.addEventListener('DOMContentLoaded', () => {
                     displayChatMessage(`[Status] ${data.message}`, 'system');
                 }
                 break;
+            case 'ping':
+                // Server heartbeat: answer so the connection is not reaped as dead
+                ws.send(JSON.stringify({ type: 'pong' }));
+                break;
             default:
                 console.warn('Unknown real-time message type:', data.type);
         }
@@ -0,0 +1,88 @@
+"""
+Reconciliation of the maintained per-type user totals.
+
+`app.crud` keeps the `user_type_stats` rows in step with every user write,
+so `GET /api/stats` never scans the users table. Floating-point
+accumulation, writes that bypass `app.crud`, concurrent read-modify-write
+updates of one balance, or a table added to an existing database can
+still make the totals drift. Every `STATS_RECONCILE_INTERVAL_SECONDS`
+(and once at startup), `reconcile()` recomputes them with a full scan,
+reports any drift and overwrites the stored rows.
+
+A write that lands between the recompute and the overwrite can itself
+leave a small drift; the next run corrects it. Only one process should
+reconcile: `app.serve` enables the reconciler in a single worker (see
+`RUN_STATS_RECONCILER`), since workers reconciling concurrently would race
+to overwrite the same rows.
+"""
+import asyncio
+import logging
+import math
+from typing import Final, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app import crud, metrics
+from app.models import UserType
+from app.settings import settings
+from app.tasks import tasks
+
+logger = logging.getLogger(__name__)
+
+
+async def reconcile(db: AsyncSession) -> List[UserType]:
+    """Checks the maintained totals against a full recompute and repairs them.
+
+    Args:
+        db: The **database session** to recompute and write with.
+
+    Returns:
+        List[UserType]: The types whose totals had drifted (and were corrected).
+    """
+    actual = await crud.compute_user_type_stats(db)
+    stored = {row.user_type: (row.user_count, row.total_balance) for row in await crud.get_user_type_stats(db)}
+
+    drifted = []
+    for user_type in UserType:
+        count, total = actual.get(user_type, (0, 0.0))
+        stored_count, stored_total = stored.get(user_type, (None, None))
+        if stored_count == count and math.isclose(stored_total, total, rel_tol=1e-9, abs_tol=1e-6):
+            continue
+        drifted.append(user_type)
+        logger.warning(
+            "User stats for %s drifted: stored %s users / %s balance, actual %d / %.2f; correcting.",
+            user_type.value, stored_count, stored_total, count, total
+        )
+        metrics.USER_STATS_CORRECTIONS.inc()
+
+    if drifted:
+        await crud.set_user_type_stats(db, {user_type: actual.get(user_type, (0, 0.0)) for user_type in drifted})
+    else:
+        await db.rollback()
+    return drifted
+
+
+class StatsReconciler:
+    """Runs `reconcile()` periodically as a background service."""
+
+    def __init__(self):
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, session_maker: async_sessionmaker[AsyncSession]):
+        """Starts the periodic reconciliation (no-op when disabled, left to another worker or already running)."""
+        if settings.STATS_RECONCILE_INTERVAL_SECONDS <= 0 or not settings.RUN_STATS_RECONCILER or self._task is not None:
+            return
+        self._task = tasks.spawn(self._run(session_maker), name="stats-reconcile", service=True)
+
+    async def _run(self, session_maker: async_sessionmaker[AsyncSession]):
+        while True:
+            try:
+                async with session_maker() as db:
+                    await reconcile(db)
+            except Exception as e:
+                logger.error("User stats reconciliation failed: %s", e)
+            await asyncio.sleep(settings.STATS_RECONCILE_INTERVAL_SECONDS)
+
+
+reconciler: Final[StatsReconciler] = StatsReconciler()
+"""The process-wide stats reconciler, started by the application lifespan."""
@@ -0,0 +1,66 @@
+"""
+Registry of the application's background tasks.
+
+Tasks started with `tasks.spawn(...)` are kept referenced (asyncio only
+holds weak references, so unreferenced tasks can vanish mid-flight), have
+their exceptions logged, and are stopped in an orderly way on shutdown:
+long-running services (loops such as the WebSocket heartbeat) are
+cancelled right away, one-off jobs get until the shutdown deadline to
+finish their writes before they are cancelled too.
+"""
+import asyncio
+import logging
+from typing import Coroutine, Dict, Final
+
+logger = logging.getLogger(__name__)
+
+
+class TaskRegistry:
+    """Tracks background tasks so shutdown can wait for or cancel them."""
+
+    def __init__(self):
+        # Task -> whether it is a long-running service, cancelled first on shutdown
+        self._tasks: Dict[asyncio.Task, bool] = {}
+
+    def spawn(self, coro: Coroutine, name: str, service: bool = False) -> asyncio.Task:
+        """Starts a tracked background task.
+
+        Args:
+            coro: The **coroutine** to run.
+            name: The task name, shown in logs and debuggers.
+            service: True for loops that never finish on their own; they are
+                cancelled at the start of shutdown instead of awaited.
+
+        Returns:
+            asyncio.Task: The running task.
+        """
+        task = asyncio.create_task(coro, name=name)
+        self._tasks[task] = service
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task: asyncio.Task):
+        self._tasks.pop(task, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Background task %s failed.", task.get_name(), exc_info=task.exception())
+
+    async def shutdown(self, timeout: float):
+        """Cancels services, then waits up to `timeout` seconds for the other tasks before cancelling them."""
+        services = [task for task, service in self._tasks.items() if service]
+        for task in services:
+            task.cancel()
+        await asyncio.gather(*services, return_exceptions=True)
+
+        pending = list(self._tasks)
+        if not pending:
+            return
+        done, not_done = await asyncio.wait(pending, timeout=timeout)
+        if not_done:
+            logger.warning("Cancelling %d background task(s) still running at the shutdown deadline.", len(not_done))
+            for task in not_done:
+                task.cancel()
+            await asyncio.gather(*not_done, return_exceptions=True)
+
+
+tasks: Final[TaskRegistry] = TaskRegistry()
+"""The process-wide background task registry."""
@@ -0,0 +1,44 @@
+"""
+Shared Jinja2 template engine.
+
+All routers render through this single environment, so compiled templates
+are cached once per process. When `JINJA_BYTECODE_CACHE_DIR` is set, the
+compiled bytecode is also stored on disk and reused by later processes,
+letting fresh workers skip template compilation.
+"""
+import logging
+import os
+from typing import Final, Optional
+
+from fastapi.templating import Jinja2Templates
+from jinja2 import BytecodeCache, FileSystemBytecodeCache
+
+from app.assets import static_url
+from app.settings import settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_DIRECTORY: Final[str] = "app/templates"
+"""Directory the templates are loaded from, relative to the project root."""
+
+
+def _bytecode_cache(directory: str) -> Optional[BytecodeCache]:
+    """Returns an on-disk bytecode cache, or None if disabled or unusable."""
+    if not directory:
+        return None
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        logger.warning("Jinja bytecode cache disabled, cannot create %s: %s", directory, e)
+        return None
+    return FileSystemBytecodeCache(directory)
+
+
+templates: Final[Jinja2Templates] = Jinja2Templates(
+    directory=TEMPLATES_DIRECTORY,
+    bytecode_cache=_bytecode_cache(settings.JINJA_BYTECODE_CACHE_DIR),
+)
+"""Jinja2 template engine instance configured to load templates from 'app/templates'."""
+
+templates.env.globals["static_url"] = static_url
+"""Resolves asset URLs through the build manifest (see app.assets)."""
@@ -0,0 +1,55 @@
+"""
+In-process version counter for cached user data, and ETag helpers.
+
+Every write to the users table bumps the counter here (see `app.crud`).
+Caches derived from user data store the version they were built from and
+are reused for as long as it is current, without querying the database.
+
+The counter is per process: in a multi-worker deployment a write handled
+by one worker does not invalidate the caches of the others, so such caches
+must also expire (see `app.services`). ETags therefore do not use it: they are hashes of the representation actually sent, identical
+on every worker for the same content and different after any change.
+"""
+import hashlib
+from typing import Final, Optional
+
+
+class UserVersions:
+    """Version counter for the users collection."""
+
+    def __init__(self):
+        self.collection: int = 0
+        """Bumped whenever any user is created, updated or deleted."""
+
+    def bump_collection(self):
+        self.collection += 1
+
+
+users: Final[UserVersions] = UserVersions()
+"""The process-wide user version counter."""
+
+# --- ETags ---
+
+def content_etag(body: bytes) -> str:
+    """Returns the strong ETag of a response body (a hash of its bytes)."""
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Evaluates an `If-None-Match` header against an ETag (weak comparison, RFC 9110).
+
+    Args:
+        if_none_match: The raw header value, possibly missing, `*` or a list.
+        etag: The **current ETag** of the resource.
+
+    Returns:
+        bool: True if the client's copy is current and a 304 can be sent.
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
@@ -1,32 +1,148 @@
 import asyncio
-from fastapi import WebSocket
-from typing import List
+import logging
+import math
+import random
+import time
+from fastapi import WebSocket, status
+from typing import Any, Dict, Final, List, Optional, Tuple, Union
+
+from app import metrics, ws_protocol
+from app.presence import presence
+from app.rate_limit import LocalBuckets, RateLimit
+from app.settings import settings
+from app.tasks import tasks
+from app.ws_protocol import Codec
+
+logger = logging.getLogger(__name__)
+
+WS_ACCEPT: Final[RateLimit] = RateLimit.parse("ws_accept", settings.WS_ACCEPT_RATE)
+"""New WebSocket connections accepted per worker (smooths reconnect storms)."""
+
+class Connection:
+    """Per-connection state: the negotiated codec, the user and when the client was last heard from."""
+
+    __slots__ = ("codec", "user_id", "last_seen")
+
+    def __init__(self, codec: Codec, user_id: Optional[int] = None):
+        self.codec = codec
+        self.user_id = user_id
+        self.last_seen = time.monotonic()
 
 class ConnectionManager:
     """Manages active WebSocket connections and handles broadcasting.
 
-    This class maintains a list of active WebSocket connections and provides
-    methods to connect, disconnect, and broadcast messages to all clients.
+    This class maintains the active WebSocket connections, together with the
+    wire format (codec) each one negotiated, and provides methods to connect,
+    disconnect, and broadcast messages to all clients.
+
+    A connection is only removed when its handler sees a disconnect, which
+    never happens for half-open sockets (a phone that lost its network).
+    The heartbeat task therefore pings every connection periodically and
+    closes those that stayed silent for `WS_HEARTBEAT_MAX_MISSED` intervals,
+    or whose ping could not be sent within `WS_HEARTBEAT_SEND_TIMEOUT_SECONDS`
+    (a peer that stopped reading fills its send buffer and blocks sends).
+
+    New connections pass admission control first: per-worker and per-user
+    caps and a bounded accept rate. Refused sockets are closed with 1013
+    (Try Again Later) and a jittered `retry-after=<seconds>` reason, so a
+    worker near capacity sheds new load instead of degrading existing
+    connections, and a reconnect storm is spread out over time.
+
+    On shutdown, `drain()` stops admitting sockets and closes the open ones
+    with 1012 (Service Restart) spread over `WS_DRAIN_SPREAD_SECONDS`, each
+    with a jittered retry-after, so a rolling deploy does not make every
+    client reconnect in the same instant.
     """
 
     def __init__(self):
         """Initializes the ConnectionManager.
         
         Attributes:
-            active_connections (List[WebSocket]): A list to store and manage
-                active WebSocket connections.
+            active_connections (Dict[WebSocket, Connection]): The active WebSocket
+                connections and their state (codec, last activity).
         """
-        self.active_connections: List[WebSocket] = []
+        self.active_connections: Dict[WebSocket, Connection] = {}
+        self._user_connections: Dict[int, int] = {}
+        # Handshakes admitted but not yet registered still count against the caps
+        self._pending = 0
+        self._accept_buckets = LocalBuckets()
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.draining = False
+        self._drain_task: Optional[asyncio.Task] = None
 
-    async def connect(self, websocket: WebSocket):
-        """Accepts and registers a new WebSocket connection.
+    async def connect(self, websocket: WebSocket, user_id: Optional[int] = None) -> Optional[Codec]:
+        """Admits, negotiates the wire format, then accepts and registers a new WebSocket connection.
 
         Args:
             websocket (WebSocket): The incoming WebSocket connection to accept
-                and add to the active list.
+                and add to the active connections.
+            user_id (Optional[int]): The connecting user, for the per-user cap.
+
+        Returns:
+            Optional[Codec]: The codec the connection negotiated (see
+            `app.ws_protocol`), or None if admission control refused it
+            (the socket is already closed).
         """
+        refusal = self._check_admission(user_id)
+        if refusal is not None:
+            await self._refuse(websocket, *refusal)
+            return None
+
+        codec, subprotocol = ws_protocol.negotiate(websocket)
+        self._pending += 1
+        self._add_user(user_id)
+        try:
+            await websocket.accept(subprotocol=subprotocol)
+        except BaseException:
+            self._remove_user(user_id)
+            raise
+        finally:
+            self._pending -= 1
+        if self.draining:
+            # Admitted just before the drain started, and missed by it
+            self._remove_user(user_id)
+            await self._close(websocket, status.WS_1012_SERVICE_RESTART, _retry_after_reason(settings.WS_RETRY_AFTER_SECONDS))
+            return None
+        self.active_connections[websocket] = Connection(codec, user_id)
+        metrics.WS_ACTIVE_CONNECTIONS.inc()
+        return codec
+
+    def _check_admission(self, user_id: Optional[int]) -> Optional[Tuple[str, float]]:
+        """Returns why and for how long (seconds) a new connection must be refused, or None to admit it."""
+        if self.draining:
+            return "draining", settings.WS_RETRY_AFTER_SECONDS
+        if not settings.WS_ADMISSION_ENABLED:
+            return None
+        if len(self.active_connections) + self._pending >= settings.WS_MAX_CONNECTIONS:
+            return "worker_limit", settings.WS_RETRY_AFTER_SECONDS
+        if user_id is not None and self._user_connections.get(user_id, 0) >= settings.WS_MAX_CONNECTIONS_PER_USER:
+            return "user_limit", settings.WS_RETRY_AFTER_SECONDS
+        # Checked last, so connections refused by a cap do not use up accept tokens
+        retry_after = self._accept_buckets.hit([(WS_ACCEPT, WS_ACCEPT.name)])
+        if retry_after:
+            return "accept_rate", retry_after
+        return None
+
+    @staticmethod
+    async def _refuse(websocket: WebSocket, reason: str, delay: float):
+        # Browsers only see close codes after the handshake, so accept and close right away
+        metrics.WS_REJECTED_CONNECTIONS.labels(reason).inc()
+        code = status.WS_1012_SERVICE_RESTART if reason == "draining" else status.WS_1013_TRY_AGAIN_LATER
         await websocket.accept()
-        self.active_connections.append(websocket)
+        await websocket.close(code=code, reason=_retry_after_reason(delay))
+
+    def _add_user(self, user_id: Optional[int]):
+        if user_id is not None:
+            self._user_connections[user_id] = self._user_connections.get(user_id, 0) + 1
+
+    def _remove_user(self, user_id: Optional[int]):
+        if user_id is None:
+            return
+        remaining = self._user_connections.get(user_id, 0) - 1
+        if remaining > 0:
+            self._user_connections[user_id] = remaining
+        else:
+            self._user_connections.pop(user_id, None)
 
     def disconnect(self, websocket: WebSocket):
         """Removes a WebSocket connection from the active list.
@@ -35,29 +151,191 @@ class ConnectionManager:
             websocket (WebSocket): The WebSocket connection to remove.
 
         Notes:
-            The removal operation is wrapped in a `try...except ValueError`
-            block to safely handle potential race conditions or redundant calls. 
-            If the connection has already been removed by a concurrent task, 
-            `list.remove()` raises a `ValueError`, which is caught and ignored
-            to prevent the application from crashing.
+            Removing a connection that is already gone (a concurrent task or
+            a redundant call got there first) is silently ignored.
         """
-        try:
-            self.active_connections.remove(websocket)
-        except ValueError:
-            pass
+        connection = self.active_connections.pop(websocket, None)
+        if connection is None:
+            return
+        self._remove_user(connection.user_id)
+        metrics.WS_ACTIVE_CONNECTIONS.dec()
+
+    async def send(self, websocket: WebSocket, data: Any):
+        """Sends a message to one connection in its negotiated format.
+
+        Args:
+            websocket (WebSocket): A registered connection.
+            data (Any): The message (serializable to JSON and MessagePack).
+        """
+        connection = self.active_connections.get(websocket)
+        codec = connection.codec if connection is not None else ws_protocol.DEFAULT_CODEC
+        await ws_protocol.send(websocket, codec, codec.encode(data))
+
+    def touch(self, websocket: WebSocket):
+        """Records that a frame (chat or pong) arrived on the connection, proving it alive."""
+        connection = self.active_connections.get(websocket)
+        if connection is not None:
+            connection.last_seen = time.monotonic()
 
     async def broadcast(self, data: dict):
-        """Broadcasts a JSON message to all active WebSocket connections concurrently.
+        """Broadcasts a message to all active WebSocket connections concurrently.
 
-        If a send operation fails, it will be ignored, 
+        The message is encoded once per codec in use, not once per
+        connection. If a send operation fails, it will be ignored, 
         and the broadcast will continue to other clients.
+        Fan-out time and failed sends are recorded in `app.metrics`.
 
         Args:
-            data (dict): The data (serializable to JSON) to send.
+            data (dict): The data (serializable to JSON and MessagePack) to send.
         """
-        tasks = [conn.send_json(data) for conn in self.active_connections]
+        start = time.perf_counter()
+        frames: Dict[str, Union[str, bytes]] = {}
+        tasks = []
+        for conn, connection in list(self.active_connections.items()):
+            codec = connection.codec
+            frame = frames.get(codec.name)
+            if frame is None:
+                frame = frames[codec.name] = codec.encode(data)
+            tasks.append(ws_protocol.send(conn, codec, frame))
         
-        await asyncio.gather(*tasks, return_exceptions=True)
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        failures = sum(1 for result in results if isinstance(result, BaseException))
+        metrics.WS_BROADCAST_DURATION.observe(time.perf_counter() - start)
+        metrics.WS_MESSAGES_SENT.inc(len(results) - failures)
+        if failures:
+            metrics.WS_SEND_FAILURES.inc(failures)
+
+
+    async def heartbeat(self):
+        """Runs one heartbeat round: closes silent connections, then pings the rest.
+
+        A connection is reaped once nothing (pong or chat) arrived for
+        `WS_HEARTBEAT_MAX_MISSED` intervals, or when its ping fails or times
+        out. It is unregistered first, so broadcasts stop paying for it even
+        if the close itself stalls. Every send is bounded, so one stuck socket
+        cannot hold up the round. The connection gauge, process memory and
+        presence are refreshed as well.
+        """
+        cutoff = time.monotonic() - settings.WS_HEARTBEAT_INTERVAL_SECONDS * settings.WS_HEARTBEAT_MAX_MISSED
+        stale: List[WebSocket] = [
+            conn for conn, connection in self.active_connections.items() if connection.last_seen < cutoff
+        ]
+        if stale:
+            logger.info("Reaping %d WebSocket connection(s) that missed heartbeats.", len(stale))
+            await self._evict(stale)
+
+        unreachable = await self._ping()
+        if unreachable:
+            logger.info("Reaping %d WebSocket connection(s) whose ping could not be sent.", len(unreachable))
+            await self._evict(unreachable)
+        metrics.WS_ACTIVE_CONNECTIONS.set(len(self.active_connections))
+        metrics.update_process_metrics()
+        await presence.refresh()
+
+    async def _ping(self) -> List[WebSocket]:
+        """Pings every connection, each send bounded by `WS_HEARTBEAT_SEND_TIMEOUT_SECONDS`.
+
+        Returns:
+            List[WebSocket]: The connections whose ping failed or timed out.
+        """
+        frames: Dict[str, Union[str, bytes]] = {}
+        connections = list(self.active_connections.items())
+        sends = []
+        for conn, connection in connections:
+            codec = connection.codec
+            frame = frames.get(codec.name)
+            if frame is None:
+                frame = frames[codec.name] = codec.encode(ws_protocol.PING)
+            sends.append(asyncio.wait_for(
+                ws_protocol.send(conn, codec, frame), timeout=settings.WS_HEARTBEAT_SEND_TIMEOUT_SECONDS
+            ))
+        results = await asyncio.gather(*sends, return_exceptions=True)
+
+        failed = [conn for (conn, _), result in zip(connections, results) if isinstance(result, BaseException)]
+        metrics.WS_MESSAGES_SENT.inc(len(results) - len(failed))
+        if failed:
+            metrics.WS_SEND_FAILURES.inc(len(failed))
+        return failed
+
+    async def _evict(self, connections: List[WebSocket]):
+        """Unregisters dead connections, then closes them with 1001."""
+        for conn in connections:
+            self.disconnect(conn)
+        metrics.WS_HEARTBEAT_EVICTIONS.inc(len(connections))
+        await asyncio.gather(*(
+            self._close(conn, status.WS_1001_GOING_AWAY, "Heartbeat timeout") for conn in connections
+        ))
+
+    @staticmethod
+    async def _close(websocket: WebSocket, code: int, reason: str):
+        # A dead peer never acknowledges the close; the server drops the socket after its close timeout
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), timeout=1.0)
+        except Exception:
+            pass
+
+    async def _run_heartbeats(self):
+        while True:
+            await asyncio.sleep(settings.WS_HEARTBEAT_INTERVAL_SECONDS)
+            try:
+                await self.heartbeat()
+            except Exception:
+                logger.exception("WebSocket heartbeat round failed.")
+
+    def start_heartbeats(self):
+        """Starts the periodic heartbeat task (no-op when disabled or already running).
+
+        The task is a service in `app.tasks`, cancelled when shutdown begins.
+        """
+        if settings.WS_HEARTBEAT_INTERVAL_SECONDS <= 0 or self._heartbeat_task is not None:
+            return
+        self._heartbeat_task = tasks.spawn(self._run_heartbeats(), name="ws-heartbeat", service=True)
+
+    def begin_drain(self):
+        """Starts draining in the background (for server hooks that cannot await)."""
+        self.draining = True
+        if self._drain_task is None:
+            self._drain_task = tasks.spawn(self._drain(), name="ws-drain")
+
+    async def drain(self, timeout: float):
+        """Stops admitting connections and closes the open ones gradually.
+
+        Args:
+            timeout (float): The **deadline in seconds**; connections still open
+                after it are left to the server.
+        """
+        self.begin_drain()
+        try:
+            await asyncio.wait_for(asyncio.shield(self._drain_task), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("WebSocket drain did not finish within %.1fs.", timeout)
+
+    async def _drain(self):
+        connections = list(self.active_connections)
+        if not connections:
+            return
+        # Random order and even spacing, so reconnects reach the other workers as a trickle
+        random.shuffle(connections)
+        spread = settings.WS_DRAIN_SPREAD_SECONDS
+        logger.info("Draining %d WebSocket connection(s) over %.1fs.", len(connections), spread)
+
+        async def close_later(websocket: WebSocket, delay: float):
+            await asyncio.sleep(delay)
+            self.disconnect(websocket)
+            await self._close(
+                websocket, status.WS_1012_SERVICE_RESTART, _retry_after_reason(settings.WS_RETRY_AFTER_SECONDS)
+            )
+
+        await asyncio.gather(*(
+            close_later(websocket, spread * index / len(connections))
+            for index, websocket in enumerate(connections)
+        ))
+
+
+def _retry_after_reason(delay: float) -> str:
+    """Close reason telling the client when to reconnect, jittered to 1-2x `delay`."""
+    return f"retry-after={math.ceil(delay * random.uniform(1.0, 2.0))}"
 
 # create an instance of the class, establishes a single shared point of control for all WebSocket connection
 manager = ConnectionManager()
\ No newline at end of file
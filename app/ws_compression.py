@@ -0,0 +1,107 @@
+"""
+Tuned permessage-deflate for the WebSocket server.
+
+Uvicorn's built-in WebSocket protocol either disables compression or
+compresses every message with fixed parameters. `CompressedWebSocketProtocol`
+is a drop-in replacement (the websockets sans-I/O implementation) that
+takes the window bits and zlib memory level from `Settings`, skips
+compression for messages below `WS_COMPRESSION_MIN_SIZE` (short chat
+frames gain nothing and cost CPU), and caps inbound messages at
+`WS_MAX_MESSAGE_SIZE` before they are buffered. On server shutdown it
+lets the application drain open sockets gradually (see
+`ConnectionManager.drain`) instead of closing them all at once. Select it with:
+
+    uvicorn app.main:app --ws app.ws_compression:CompressedWebSocketProtocol
+"""
+import logging
+from typing import Any, List, Sequence, Tuple
+
+from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+from websockets.extensions.base import ServerExtensionFactory
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CTRL_OPCODES, Frame, Opcode
+from websockets.server import ServerProtocol
+
+from app.settings import settings
+from app.websockets import manager
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """
+    permessage-deflate that sends messages smaller than `min_size` uncompressed.
+
+    RFC 7692 lets a sender choose per message (the RSV1 bit marks compressed
+    ones), and uncompressed messages never touch the shared LZ77 window, so
+    context takeover keeps working.
+    """
+
+    def __init__(self, *args: Any, min_size: int = 0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+        self._skip_message = False
+
+    def encode(self, frame: Frame) -> Frame:
+        if frame.opcode in CTRL_OPCODES:
+            return frame
+        # Continuation frames follow the decision taken for the first frame
+        if frame.opcode is not Opcode.CONT:
+            self._skip_message = frame.fin and len(frame.data) < self.min_size
+        if self._skip_message:
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdServerPerMessageDeflateFactory(ServerPerMessageDeflateFactory):
+    """Negotiates permessage-deflate like the stock factory, producing `ThresholdPerMessageDeflate`."""
+
+    def __init__(self, min_size: int = 0, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.min_size = min_size
+
+    def process_request_params(
+        self,
+        params: Sequence[Tuple[str, Any]],
+        accepted_extensions: Sequence[Any]
+    ) -> Tuple[List[Tuple[str, Any]], PerMessageDeflate]:
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+def build_extensions() -> List[ServerExtensionFactory]:
+    """Returns the server extensions configured in `Settings` (none if compression is off)."""
+    if not settings.WS_COMPRESSION_ENABLED:
+        return []
+    return [ThresholdServerPerMessageDeflateFactory(
+        min_size=settings.WS_COMPRESSION_MIN_SIZE,
+        server_max_window_bits=settings.WS_COMPRESSION_SERVER_MAX_WINDOW_BITS,
+        client_max_window_bits=settings.WS_COMPRESSION_CLIENT_MAX_WINDOW_BITS,
+        compress_settings={"memLevel": settings.WS_COMPRESSION_MEM_LEVEL},
+    )]
+
+
+class CompressedWebSocketProtocol(WebSocketsSansIOProtocol):
+    """Uvicorn's websockets protocol with the compression and size policy from `Settings`."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # Replaces the connection built by the parent before any data has arrived
+        self.conn = ServerProtocol(
+            extensions=build_extensions(),
+            max_size=min(settings.WS_MAX_MESSAGE_SIZE, self.config.ws_max_size),
+            logger=logging.getLogger("uvicorn.error"),
+        )
+
+    def shutdown(self):
+        # Uvicorn calls this for every connection at once, before the lifespan shutdown;
+        # hand open sockets to the application's staggered drain and let uvicorn wait for them
+        if self.handshake_complete and not self.close_sent and not self.transport.is_closing():
+            manager.begin_drain()
+            return
+        super().shutdown()
@@ -0,0 +1,138 @@
+"""
+Wire formats for the realtime WebSocket.
+
+A connection speaks JSON text frames by default. A client can switch to
+binary MessagePack frames by offering the `msgpack` subprotocol
+(`new WebSocket(url, ["msgpack"])`) or, where subprotocols are awkward,
+with the `?protocol=msgpack` query parameter. Both directions of the
+connection then use the negotiated codec.
+"""
+import json
+from typing import Any, Dict, Final, Optional, Tuple, Union
+
+import msgpack
+from fastapi import WebSocket, WebSocketDisconnect, status
+
+from app.settings import settings
+
+
+class JsonCodec:
+    """JSON text frames (the default, and what the bundled frontend speaks)."""
+
+    name: Final[str] = "json"
+    binary: Final[bool] = False
+
+    @staticmethod
+    def encode(data: Any) -> str:
+        # Same output as `WebSocket.send_json`
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+    @staticmethod
+    def decode(frame: Union[str, bytes]) -> Any:
+        # Inbound chat frames are plain text and are relayed verbatim
+        return frame if isinstance(frame, str) else frame.decode("utf-8")
+
+
+class MsgPackCodec:
+    """Binary MessagePack frames: smaller and cheaper to encode than JSON."""
+
+    name: Final[str] = "msgpack"
+    binary: Final[bool] = True
+
+    @staticmethod
+    def encode(data: Any) -> bytes:
+        return msgpack.packb(data, use_bin_type=True)
+
+    @staticmethod
+    def decode(frame: Union[str, bytes]) -> Any:
+        if isinstance(frame, str):
+            return frame
+        return msgpack.unpackb(frame, raw=False)
+
+
+Codec = Union[JsonCodec, MsgPackCodec]
+
+CODECS: Final[Dict[str, Codec]] = {codec.name: codec for codec in (JsonCodec(), MsgPackCodec())}
+"""Available codecs by subprotocol / query parameter name."""
+
+DEFAULT_CODEC: Final[Codec] = CODECS["json"]
+
+PING: Final[Dict[str, str]] = {"type": "ping"}
+"""Heartbeat sent by the server; clients answer with `{"type": "pong"}`."""
+
+
+def negotiate(websocket: WebSocket) -> Tuple[Codec, Optional[str]]:
+    """Picks the codec for a connection before it is accepted.
+
+    The first offered subprotocol naming a known codec wins; otherwise the
+    `protocol` query parameter is used; otherwise JSON.
+
+    Returns:
+        Tuple[Codec, Optional[str]]: The codec, and the subprotocol to
+        confirm in the handshake (None if none was offered).
+    """
+    for offered in websocket.scope.get("subprotocols", []):
+        codec = CODECS.get(offered)
+        if codec is not None:
+            return codec, offered
+    return CODECS.get(websocket.query_params.get("protocol", ""), DEFAULT_CODEC), None
+
+
+async def send(websocket: WebSocket, codec: Codec, frame: Union[str, bytes]):
+    """Sends an already encoded frame as text or binary, as the codec requires."""
+    if codec.binary:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def receive(websocket: WebSocket, codec: Codec) -> Any:
+    """Receives and decodes the next frame (text or binary).
+
+    Messages larger than `WS_MAX_MESSAGE_SIZE` close the connection with
+    1009 (Message Too Big). `app.ws_compression` enforces the same limit
+    while reading from the socket; this check covers other servers.
+
+    Frames the codec cannot decode (malformed MessagePack, binary JSON-mode
+    frames that are not UTF-8) close the connection with 1007 (Invalid
+    Frame Payload Data).
+
+    Raises:
+        WebSocketDisconnect: When the client disconnects or was closed for
+            sending an oversized or undecodable message.
+    """
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    frame = message.get("text")
+    if frame is None:
+        frame = message.get("bytes", b"")
+    size = len(frame)
+    # A character is at most 4 UTF-8 bytes, so short text never needs encoding to measure
+    if isinstance(frame, str) and size * 4 > settings.WS_MAX_MESSAGE_SIZE:
+        size = len(frame.encode())
+    if size > settings.WS_MAX_MESSAGE_SIZE:
+        await websocket.close(code=status.WS_1009_MESSAGE_TOO_BIG)
+        raise WebSocketDisconnect(status.WS_1009_MESSAGE_TOO_BIG, "Message too big")
+    try:
+        return codec.decode(frame)
+    except (ValueError, msgpack.UnpackException):
+        await websocket.close(code=status.WS_1007_INVALID_FRAME_PAYLOAD_DATA)
+        raise WebSocketDisconnect(status.WS_1007_INVALID_FRAME_PAYLOAD_DATA, "Invalid frame payload")
+
+
+def is_pong(message: Any) -> bool:
+    """Tells whether a decoded inbound message is a heartbeat reply rather than chat.
+
+    JSON frames are not parsed on the chat path, so the (short) text is only
+    decoded when it could be a pong.
+    """
+    if isinstance(message, dict):
+        return message.get("type") == "pong"
+    if isinstance(message, str) and len(message) < 64 and "pong" in message:
+        try:
+            parsed = json.loads(message)
+        except ValueError:
+            return False
+        return isinstance(parsed, dict) and parsed.get("type") == "pong"
+    return False
@@ -0,0 +1,12 @@
+"""
+Load-testing harness and benchmark suite for the live-loss application.
+
+Run it from the project root:
+
+    python -m benchmarks                      # drive the ASGI app in-process
+    python -m benchmarks --server             # spawn a local uvicorn and go over TCP
+    python -m benchmarks --url http://host:8000  # hit an already-running server
+
+Results are written as JSON and can be compared against a stored baseline
+(see `python -m benchmarks --help`).
+"""
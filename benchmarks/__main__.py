@@ -0,0 +1,109 @@
+"""
+Command-line entry point: `python -m benchmarks`.
+"""
+import argparse
+import asyncio
+import os
+import sys
+from typing import List, Optional
+
+from . import harness, scenarios
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "latest.json")
+DEFAULT_BASELINE = os.path.join("benchmarks", "baseline.json")
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Measure latency percentiles and throughput of the live-loss endpoints."
+    )
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--server", action="store_true",
+                        help="spawn a local uvicorn and benchmark over TCP")
+    target.add_argument("--url", help="benchmark an already-running server at this base URL")
+    parser.add_argument("--scenarios", nargs="+", default=list(scenarios.HTTP_SCENARIOS) + ["ws"],
+                        choices=list(scenarios.HTTP_SCENARIOS) + ["ws"],
+                        help="scenarios to run (default: all)")
+    parser.add_argument("--requests", type=int, default=500, help="measured requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=20, help="concurrent in-flight HTTP requests")
+    parser.add_argument("--warmup", type=int, default=20, help="unmeasured requests before each scenario")
+    parser.add_argument("--ws-clients", type=int, default=50, help="concurrent WebSocket clients")
+    parser.add_argument("--ws-messages", type=int, default=20, help="chat messages sent per WebSocket client")
+    parser.add_argument("--ws-protocols", nargs="+", default=["json"], choices=["json", "msgpack"],
+                        help="WebSocket wire formats to benchmark")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help=f"result file (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help=f"baseline to compare against, if it exists (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="allowed relative regression before failing (default: 0.15)")
+    return parser.parse_args(argv)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Runs the selected scenarios and returns the assembled report."""
+    if args.server or args.url:
+        target: scenarios.Target = scenarios.RemoteTarget(args.url)
+        mode = "remote" if args.url else "server"
+    else:
+        target = scenarios.InProcessTarget()
+        mode = "inprocess"
+
+    await target.start()
+    try:
+        user = await scenarios.create_bench_user(target)
+        http_names = [name for name in args.scenarios if name != "ws"]
+        results = await scenarios.bench_http(
+            target, user, http_names, args.requests, args.concurrency, args.warmup
+        )
+        if "ws" in args.scenarios:
+            for protocol in args.ws_protocols:
+                results.append(await scenarios.bench_ws_broadcast(
+                    target, user, args.ws_clients, args.ws_messages, protocol
+                ))
+        await user.client.aclose()
+    finally:
+        await target.stop()
+
+    return harness.build_report(results, params={
+        "mode": mode,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "warmup": args.warmup,
+        "ws_clients": args.ws_clients,
+        "ws_messages": args.ws_messages,
+        "ws_protocols": args.ws_protocols,
+    })
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(run(args))
+    harness.write_report(report, args.output)
+
+    baseline = None
+    if args.baseline and os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = harness.load_report(args.baseline)
+
+    harness.print_table(report, baseline)
+    print(f"\nResults written to {args.output}")
+
+    if args.save_baseline:
+        harness.write_report(report, args.baseline)
+        print(f"Baseline stored at {args.baseline}")
+        return 0
+
+    if baseline is not None:
+        regressions = harness.compare_reports(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%} of {args.baseline}:")
+            for line in regressions:
+                print(f"  - {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.tolerance:.0%} of {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
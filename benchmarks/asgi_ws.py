@@ -0,0 +1,99 @@
+"""
+Minimal in-process WebSocket client for ASGI applications.
+
+`httpx` cannot speak WebSocket over its ASGI transport, so the benchmark
+drives the app's websocket scope directly through a pair of queues. The
+interface mirrors the subset of the `websockets` client used by the
+scenarios (`send`, `recv`, `close`), so both targets share one code path.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class ASGIWebSocketClosed(Exception):
+    """Raised when receiving from a socket the application has closed."""
+
+    def __init__(self, code: int):
+        super().__init__(f"WebSocket closed by application (code={code})")
+        self.code = code
+
+
+class ASGIWebSocket:
+    """A single WebSocket session against an ASGI application."""
+
+    def __init__(
+        self,
+        app: Any,
+        path: str,
+        query_string: str = "",
+        subprotocols: Optional[List[str]] = None,
+        headers: Optional[List[Tuple[bytes, bytes]]] = None
+    ):
+        """
+        Args:
+            app: The **ASGI application** to connect to.
+            path: The request path, e.g. `/ws/realtime/1`.
+            query_string: The raw query string, without the leading `?`.
+            subprotocols: Subprotocols offered during the handshake.
+            headers: Extra raw request headers.
+        """
+        self._app = app
+        self._scope: Dict[str, Any] = {
+            "type": "websocket",
+            "asgi": {"version": "3.0"},
+            "scheme": "ws",
+            "http_version": "1.1",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query_string.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"bench")] + list(headers or []),
+            "client": ("127.0.0.1", 0),
+            "server": ("bench", 80),
+            "subprotocols": list(subprotocols or []),
+            "state": {},
+        }
+        self._to_app: asyncio.Queue = asyncio.Queue()
+        self._from_app: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+        self.subprotocol: Optional[str] = None
+        self.close_code: Optional[int] = None
+
+    async def connect(self) -> "ASGIWebSocket":
+        """Runs the handshake and waits for the application to accept."""
+        self._task = asyncio.create_task(
+            self._app(self._scope, self._to_app.get, self._from_app.put)
+        )
+        await self._to_app.put({"type": "websocket.connect"})
+        message = await self._from_app.get()
+        if message["type"] != "websocket.accept":
+            self.close_code = message.get("code", 1006)
+            raise ASGIWebSocketClosed(self.close_code)
+        self.subprotocol = message.get("subprotocol")
+        return self
+
+    async def send(self, data: Union[str, bytes]):
+        """Delivers a text or binary frame to the application."""
+        if isinstance(data, bytes):
+            await self._to_app.put({"type": "websocket.receive", "bytes": data})
+        else:
+            await self._to_app.put({"type": "websocket.receive", "text": data})
+
+    async def recv(self) -> Union[str, bytes]:
+        """Returns the next frame sent by the application."""
+        message = await self._from_app.get()
+        if message["type"] == "websocket.close":
+            self.close_code = message.get("code", 1000)
+            raise ASGIWebSocketClosed(self.close_code)
+        if message.get("text") is not None:
+            return message["text"]
+        return message["bytes"]
+
+    async def close(self, code: int = 1000):
+        """Disconnects and waits for the application handler to return."""
+        await self._to_app.put({"type": "websocket.disconnect", "code": code})
+        if self._task is not None:
+            try:
+                await asyncio.wait_for(self._task, timeout=5.0)
+            except Exception:
+                pass
@@ -0,0 +1,242 @@
+"""
+Load-generation primitives shared by the benchmark scenarios.
+
+Provides a closed-loop request driver, latency percentile reporting and
+the JSON result/baseline comparison used by the CLI.
+"""
+import asyncio
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Final
+
+RESULTS_VERSION: Final[int] = 1
+"""Schema version of the JSON result files, bumped on incompatible changes."""
+
+# --- Statistics ---
+
+def percentile(sorted_samples: List[float], pct: float) -> float:
+    """Returns the nearest-rank percentile of an already sorted sample list.
+
+    Args:
+        sorted_samples: The **ascending** list of samples.
+        pct: The percentile to compute, between 0 and 100.
+
+    Returns:
+        float: The sample at the requested rank, or 0.0 for an empty list.
+    """
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_samples)))
+    return sorted_samples[min(rank, len(sorted_samples)) - 1]
+
+
+class ScenarioResult:
+    """Latency samples and error counts collected for a single scenario."""
+
+    def __init__(
+        self,
+        name: str,
+        latencies: List[float],
+        errors: int,
+        elapsed: float,
+        extra: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Args:
+            name: The **scenario name** used as the key in the result file.
+            latencies: Per-operation latencies in **seconds**.
+            errors: The number of failed operations.
+            elapsed: Wall-clock duration of the measured phase in seconds.
+            extra: Optional scenario-specific figures merged into the report.
+        """
+        self.name = name
+        self.latencies = sorted(latencies)
+        self.errors = errors
+        self.elapsed = elapsed
+        self.extra = extra or {}
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Summarizes the samples as throughput and millisecond percentiles."""
+        count = len(self.latencies)
+        ms = lambda seconds: round(seconds * 1000.0, 3)
+        summary: Dict[str, Any] = {
+            "count": count,
+            "errors": self.errors,
+            "elapsed_s": round(self.elapsed, 4),
+            "rps": round(count / self.elapsed, 2) if self.elapsed > 0 else 0.0,
+            "mean_ms": ms(sum(self.latencies) / count) if count else 0.0,
+            "p50_ms": ms(percentile(self.latencies, 50)),
+            "p95_ms": ms(percentile(self.latencies, 95)),
+            "p99_ms": ms(percentile(self.latencies, 99)),
+            "max_ms": ms(self.latencies[-1]) if count else 0.0,
+        }
+        summary.update(self.extra)
+        return summary
+
+
+# --- Load Driver ---
+
+async def run_closed_loop(
+    name: str,
+    operation: Callable[[], Awaitable[bool]],
+    requests: int,
+    concurrency: int,
+    warmup: int = 0
+) -> ScenarioResult:
+    """Runs `operation` a fixed number of times from `concurrency` workers.
+
+    Every worker issues its next operation as soon as the previous one
+    completes (closed-loop load), so the measured throughput is the
+    sustainable rate for the given concurrency.
+
+    Args:
+        name: The **scenario name** for the result.
+        operation: An async callable returning True on success. Exceptions
+            and False results are both counted as errors.
+        requests: The number of **measured** operations.
+        concurrency: The number of concurrent workers.
+        warmup: Unmeasured operations executed before timing starts.
+
+    Returns:
+        ScenarioResult: The collected latencies and error count.
+    """
+    for _ in range(warmup):
+        try:
+            await operation()
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    errors = 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                ok = await operation()
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    return ScenarioResult(name, latencies, errors, time.perf_counter() - started)
+
+
+# --- Result Files ---
+
+def _git_revision() -> Optional[str]:
+    """Returns the short git revision of the working tree, if available."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_report(results: List[ScenarioResult], params: Dict[str, Any]) -> Dict[str, Any]:
+    """Assembles the JSON-serializable report for a benchmark run.
+
+    Args:
+        results: The scenario results, in execution order.
+        params: The run parameters (mode, concurrency, ...) to record.
+
+    Returns:
+        dict: The report with run metadata and per-scenario summaries.
+    """
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "params": params,
+        },
+        "scenarios": {result.name: result.to_dict() for result in results},
+    }
+
+
+def write_report(report: Dict[str, Any], path: str):
+    """Writes a report to `path` as indented JSON, creating parent directories."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, sort_keys=True)
+        fh.write("\n")
+
+
+def load_report(path: str) -> Dict[str, Any]:
+    """Loads a previously written report."""
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare_reports(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """Compares a report against a baseline and lists the regressions.
+
+    A scenario regresses when its p95 latency grows, or its throughput
+    drops, by more than `tolerance` (a fraction, e.g. 0.15 for 15%).
+    Scenarios missing from either side are skipped.
+
+    Args:
+        current: The report of the current run.
+        baseline: The stored baseline report.
+        tolerance: The allowed relative deviation.
+
+    Returns:
+        List[str]: Human-readable descriptions of every regression found.
+    """
+    regressions: List[str] = []
+    for name, now in current.get("scenarios", {}).items():
+        before = baseline.get("scenarios", {}).get(name)
+        if not before:
+            continue
+        if before["p95_ms"] > 0 and now["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {before['p95_ms']:.2f}ms -> {now['p95_ms']:.2f}ms"
+            )
+        if before["rps"] > 0 and now["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: rps {before['rps']:.1f} -> {now['rps']:.1f}"
+            )
+    return regressions
+
+
+def print_table(report: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None, stream=None):
+    """Prints a compact, aligned summary of a report (and its baseline deltas)."""
+    stream = stream or sys.stdout
+    header = f"{'scenario':<28}{'count':>8}{'err':>6}{'rps':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'Δ p95':>9}{'Δ rps':>9}"
+    print(header, file=stream)
+    print("-" * len(header), file=stream)
+    for name, s in report["scenarios"].items():
+        line = (
+            f"{name:<28}{s['count']:>8}{s['errors']:>6}{s['rps']:>11.1f}"
+            f"{s['p50_ms']:>10.2f}{s['p95_ms']:>10.2f}{s['p99_ms']:>10.2f}"
+        )
+        before = (baseline or {}).get("scenarios", {}).get(name)
+        if before:
+            delta = lambda now, then: f"{(now - then) / then * 100:+.0f}%" if then else "n/a"
+            line += f"{delta(s['p95_ms'], before['p95_ms']):>9}{delta(s['rps'], before['rps']):>9}"
+        print(line, file=stream)
@@ -0,0 +1,140 @@
+"""
+Cold-start import time of the application, measured with `-X importtime`.
+
+Imports `app.main` (or other modules) in fresh interpreters and records the
+cumulative import time Python reports for it, so regressions in worker
+start-up and test collection show up like any other benchmark. The
+heaviest packages of the median run are listed, and the run fails if a
+module that must stay lazy (seeding and optional-backend dependencies) is
+imported at start-up.
+
+    python -m benchmarks.import_time [--runs N] [--modules app.main ...] [--collect]
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+from . import harness
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "import_time.json")
+DEFAULT_BASELINE = os.path.join("benchmarks", "import_time_baseline.json")
+
+LAZY_MODULES = ("faker", "passlib", "bcrypt", "redis")
+"""Packages that importing the application must not pull in; they are imported on first use."""
+
+_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+def parse_importtime(stderr: str) -> Dict[str, Tuple[int, int]]:
+    """Parses `-X importtime` output.
+
+    Args:
+        stderr: The **stderr** of the interpreter run with `-X importtime`.
+
+    Returns:
+        Dict[str, Tuple[int, int]]: Self and cumulative microseconds per imported
+        module, for the first (real) import of each.
+    """
+    modules: Dict[str, Tuple[int, int]] = {}
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match and match.group(4) not in modules:
+            modules[match.group(4)] = (int(match.group(1)), int(match.group(2)))
+    return modules
+
+
+def measure_import(module: str) -> Tuple[float, Dict[str, Tuple[int, int]]]:
+    """Imports `module` in a fresh interpreter and returns its cumulative import time in seconds."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, check=True,
+    )
+    modules = parse_importtime(proc.stderr)
+    return modules[module][1] / 1e6, modules
+
+
+def _heaviest(modules: Dict[str, Tuple[int, int]], count: int) -> Dict[str, float]:
+    """Cumulative milliseconds of the `count` most expensive top-level packages."""
+    packages: Dict[str, int] = {}
+    for name, (_, cumulative) in modules.items():
+        top = name.split(".")[0]
+        if top != "app":
+            packages[top] = max(packages.get(top, 0), cumulative)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:count]
+    return {name: round(us / 1000.0, 1) for name, us in ranked}
+
+
+def bench_import(module: str, runs: int) -> harness.ScenarioResult:
+    measure_import(module)  # warm the bytecode and filesystem caches
+    samples: List[Tuple[float, Dict[str, Tuple[int, int]]]] = [measure_import(module) for _ in range(runs)]
+    samples.sort(key=lambda sample: sample[0])
+    latencies = [seconds for seconds, _ in samples]
+    median = samples[len(samples) // 2][1]
+    loaded = sorted({name.split(".")[0] for name in median} & set(LAZY_MODULES))
+    return harness.ScenarioResult(f"import_{module}", latencies, 0, sum(latencies), extra={
+        "heaviest_ms": _heaviest(median, 8),
+        "eager_lazy_modules": loaded,
+    })
+
+
+def bench_collect(runs: int) -> harness.ScenarioResult:
+    """Times `pytest --collect-only`, i.e. the import cost paid before the first test runs."""
+    latencies = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "pytest", "--collect-only", "-q", "-p", "no:cacheprovider"],
+                       capture_output=True, check=True)
+        latencies.append(time.perf_counter() - started)
+    return harness.ScenarioResult("pytest_collect", latencies, 0, sum(latencies))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_time")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters per module")
+    parser.add_argument("--modules", nargs="+", default=["app.main"], help="modules to import")
+    parser.add_argument("--collect", action="store_true", help="also time pytest test collection")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE,
+                        help=f"baseline to compare against, if it exists (default: {DEFAULT_BASELINE})")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed relative regression before failing (default: 0.25)")
+    args = parser.parse_args(argv)
+
+    results = [bench_import(module, args.runs) for module in args.modules]
+    if args.collect:
+        results.append(bench_collect(max(1, args.runs // 2)))
+    report = harness.build_report(results, params={"runs": args.runs, "modules": args.modules})
+    harness.write_report(report, args.output)
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        baseline = harness.load_report(args.baseline)
+    harness.print_table(report, baseline)
+    for result in results:
+        for name, ms in result.extra.get("heaviest_ms", {}).items():
+            print(f"  {result.name}: {name:<24}{ms:>8.1f} ms")
+    print(f"Results written to {args.output}")
+
+    failed = False
+    for result in results:
+        if result.extra.get("eager_lazy_modules"):
+            print(f"{result.name} imports {', '.join(result.extra['eager_lazy_modules'])} at start-up; "
+                  "import them where they are used.")
+            failed = True
+    if args.save_baseline:
+        harness.write_report(report, args.baseline)
+        print(f"Baseline stored at {args.baseline}")
+    elif baseline is not None:
+        for line in harness.compare_reports(report, baseline, args.tolerance):
+            print(f"Regression: {line}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+"""
+Event-loop cost of `print` versus the queued logging setup.
+
+Simulates the game/chat hot paths: many coroutines each emit one log line
+per iteration while yielding to the loop. Output goes to a pipe drained by
+a separate, rate-limited process, like stdout under a container log
+collector. The same workload is run with unbuffered `print` and with
+`app.logging_config`; once the pipe fills, `print` blocks the loop while
+the queued setup keeps going and the writer thread absorbs the stall.
+
+    python -m benchmarks.logging_throughput [--messages N] [--tasks K]
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+from . import harness
+from app import logging_config
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "logging.json")
+
+
+def _open_pipe_sink(bytes_per_s: int) -> subprocess.Popen:
+    """Starts a process draining its stdin at `bytes_per_s`, standing in for a log collector."""
+    code = (
+        "import os, sys, time\n"
+        f"rate = {bytes_per_s}\n"
+        "while True:\n"
+        "    chunk = os.read(0, 65536)\n"
+        "    if not chunk: break\n"
+        "    if rate: time.sleep(len(chunk) / rate)\n"
+    )
+    return subprocess.Popen([sys.executable, "-c", code], stdin=subprocess.PIPE)
+
+
+async def _run_workload(name: str, emit, messages: int, tasks: int) -> harness.ScenarioResult:
+    """Times every `emit` call made by `tasks` coroutines sharing `messages` lines."""
+    latencies: List[float] = []
+    per_task = messages // tasks
+
+    async def worker(task_id: int):
+        for i in range(per_task):
+            start = time.perf_counter()
+            emit(task_id, i)
+            latencies.append(time.perf_counter() - start)
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(t) for t in range(tasks)))
+    return harness.ScenarioResult(name, latencies, 0, time.perf_counter() - started)
+
+
+async def run(messages: int, tasks: int, sink_rate: int) -> List[harness.ScenarioResult]:
+    results = []
+
+    # 1. Synchronous print, flushed per line as with PYTHONUNBUFFERED=1
+    sink = _open_pipe_sink(sink_rate)
+    stream = open(sink.stdin.fileno(), "w", buffering=1, closefd=False)
+
+    def emit_print(task_id: int, i: int):
+        print(f"User user_{task_id} won! New balance: {i * 100.0}", file=stream, flush=True)
+
+    results.append(await _run_workload("log_print", emit_print, messages, tasks))
+    stream.close()
+    sink.stdin.close()
+    sink.wait()
+
+    # 2. Queue handler + background writer thread
+    sink = _open_pipe_sink(sink_rate)
+    stream = open(sink.stdin.fileno(), "w", buffering=1, closefd=False)
+    logging_config.setup_logging(level="INFO", module_levels="", json_output=True, stream=stream)
+    logger = logging.getLogger("app.routers.feel_lucky_game")
+
+    def emit_log(task_id: int, i: int):
+        logger.info("User %s won! New balance: %s", f"user_{task_id}", i * 100.0,
+                    extra={"user_id": task_id, "balance": i * 100.0})
+
+    result = await _run_workload("log_queue", emit_log, messages, tasks)
+    drain_started = time.perf_counter()
+    logging_config.shutdown_logging()
+    result.extra["drain_s"] = round(time.perf_counter() - drain_started, 4)
+    results.append(result)
+    stream.close()
+    sink.stdin.close()
+    sink.wait()
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.logging_throughput")
+    parser.add_argument("--messages", type=int, default=50_000, help="total log lines per variant")
+    parser.add_argument("--tasks", type=int, default=100, help="concurrent emitting coroutines")
+    parser.add_argument("--sink-rate", type=int, default=1_000_000,
+                        help="bytes/s the simulated log collector drains (0 = unthrottled)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(run(args.messages, args.tasks, args.sink_rate))
+    report = harness.build_report(results, params={
+        "messages": args.messages, "tasks": args.tasks, "sink_rate": args.sink_rate
+    })
+    harness.write_report(report, args.output)
+    harness.print_table(report)
+
+    by_name = report["scenarios"]
+    if by_name["log_print"]["rps"]:
+        gain = by_name["log_queue"]["rps"] / by_name["log_print"]["rps"]
+        print(f"\nQueued logging sustains {gain:.1f}x the event-loop throughput of print.")
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
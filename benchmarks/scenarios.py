@@ -0,0 +1,369 @@
+"""
+Benchmark targets and the HTTP/WebSocket scenarios run against them.
+
+A target knows how to reach the application (in-process through the ASGI
+interface, or over TCP) and provides an HTTP client and a WebSocket
+connector. Scenarios only talk to a target, so the same measurements run
+unchanged in both modes.
+"""
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from .harness import ScenarioResult, run_closed_loop
+
+BENCH_PASSWORD = "BenchPassw0rd"
+"""Password of the throwaway user created for each run (satisfies UserCreate rules)."""
+
+# --- Targets ---
+
+class Target:
+    """Base class describing how the benchmark reaches the application."""
+
+    base_url: str = "http://bench"
+    ws_base_url: str = "ws://bench"
+
+    async def start(self):
+        """Prepares the target (database, server process, ...)."""
+
+    async def stop(self):
+        """Releases every resource acquired by `start`."""
+
+    def http_client(self) -> httpx.AsyncClient:
+        """Returns a new HTTP client bound to the target."""
+        raise NotImplementedError
+
+    async def ws_connect(self, path: str, subprotocols: Optional[List[str]] = None, cookie: str = "") -> Any:
+        """Opens a WebSocket to `path`, offering `subprotocols` and sending the `cookie` header, and returns a connected client."""
+        raise NotImplementedError
+
+
+class InProcessTarget(Target):
+    """Drives the ASGI app directly, against a throwaway SQLite database."""
+
+    def __init__(self):
+        self._tmpdir = tempfile.mkdtemp(prefix="live-loss-bench-")
+        self._engine = None
+
+    async def start(self):
+        from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+        from app.database import Base, get_db
+        from app.main import app
+        from app.settings import settings
+
+        # The load generator is a single client; per-IP and per-user limits would throttle it
+        settings.RATE_LIMIT_ENABLED = False
+        settings.WS_ADMISSION_ENABLED = False
+        self.app = app
+        self._engine = create_async_engine(
+            f"sqlite+aiosqlite:///{os.path.join(self._tmpdir, 'bench.db')}",
+            connect_args={"check_same_thread": False}
+        )
+        session_maker = async_sessionmaker(
+            autocommit=False, autoflush=False, bind=self._engine, class_=AsyncSession
+        )
+        async with self._engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+
+        async def override_get_db():
+            async with session_maker() as session:
+                yield session
+
+        app.dependency_overrides[get_db] = override_get_db
+
+    async def stop(self):
+        from app.database import get_db
+        self.app.dependency_overrides.pop(get_db, None)
+        if self._engine is not None:
+            await self._engine.dispose()
+        shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def http_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=self.app), base_url=self.base_url
+        )
+
+    async def ws_connect(self, path: str, subprotocols: Optional[List[str]] = None, cookie: str = "") -> Any:
+        from .asgi_ws import ASGIWebSocket
+        headers = [(b"cookie", cookie.encode())] if cookie else []
+        return await ASGIWebSocket(self.app, path, subprotocols=subprotocols, headers=headers).connect()
+
+
+class RemoteTarget(Target):
+    """Talks to a server over TCP, optionally spawning a local uvicorn first."""
+
+    def __init__(self, url: Optional[str] = None):
+        self._spawn = url is None
+        self._process: Optional[subprocess.Popen] = None
+        self._tmpdir: Optional[str] = None
+        if url is None:
+            url = f"http://127.0.0.1:{_free_port()}"
+        self.base_url = url.rstrip("/")
+        self.ws_base_url = "ws" + self.base_url[len("http"):]
+
+    async def start(self):
+        if not self._spawn:
+            return
+        self._tmpdir = tempfile.mkdtemp(prefix="live-loss-bench-")
+        port = self.base_url.rsplit(":", 1)[1]
+        env = dict(os.environ)
+        env["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(self._tmpdir, 'bench.db')}"
+        env["RATE_LIMIT_ENABLED"] = "false"
+        env["WS_ADMISSION_ENABLED"] = "false"
+        self._process = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app",
+             "--host", "127.0.0.1", "--port", port, "--log-level", "warning",
+             "--ws", "app.ws_compression:CompressedWebSocketProtocol"],
+            env=env,
+            stdout=subprocess.DEVNULL,
+        )
+        await self._wait_until_ready(timeout=60.0)
+
+    async def _wait_until_ready(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        async with self.http_client() as client:
+            while time.monotonic() < deadline:
+                if self._process is not None and self._process.poll() is not None:
+                    raise RuntimeError("uvicorn exited before becoming ready")
+                try:
+                    if (await client.get("/login")).status_code == 200:
+                        return
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.2)
+        raise RuntimeError(f"Server at {self.base_url} did not become ready in {timeout}s")
+
+    async def stop(self):
+        if self._process is not None:
+            self._process.terminate()
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+        if self._tmpdir:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+
+    def http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+        return httpx.AsyncClient(base_url=self.base_url, limits=limits, timeout=30.0)
+
+    async def ws_connect(self, path: str, subprotocols: Optional[List[str]] = None, cookie: str = "") -> Any:
+        import websockets
+        return await websockets.connect(
+            self.ws_base_url + path, max_queue=None, subprotocols=subprotocols,
+            additional_headers={"Cookie": cookie} if cookie else None
+        )
+
+
+def _free_port() -> int:
+    """Asks the OS for a currently unused local TCP port."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# --- Fixtures ---
+
+class BenchUser:
+    """A freshly registered user and a logged-in client for it."""
+
+    def __init__(self, user_id: int, email: str, client: httpx.AsyncClient):
+        self.id = user_id
+        self.email = email
+        self.client = client
+
+
+async def create_bench_user(target: Target) -> BenchUser:
+    """Registers a unique user through the public API and logs it in.
+
+    Going through `POST /users/` and `POST /login` keeps the setup valid for
+    both targets and independent of how the session cookie is encoded.
+    """
+    client = target.http_client()
+    suffix = uuid.uuid4().hex[:10]
+    email = f"bench-{suffix}@example.com"
+    response = await client.post("/users/", json={
+        "email": email,
+        "nickname": f"bench_{suffix}",
+        "password": BENCH_PASSWORD,
+    })
+    response.raise_for_status()
+    user_id = response.json()["id"]
+
+    login = await client.post("/login", data={"username": email, "password": BENCH_PASSWORD})
+    if login.status_code != 303:
+        raise RuntimeError(f"Benchmark login failed with status {login.status_code}")
+    client.cookies = login.cookies
+    return BenchUser(user_id, email, client)
+
+
+# --- HTTP Scenarios ---
+
+async def bench_http(
+    target: Target,
+    user: BenchUser,
+    scenarios: List[str],
+    requests: int,
+    concurrency: int,
+    warmup: int
+) -> List[ScenarioResult]:
+    """Runs the selected HTTP scenarios sequentially against `target`.
+
+    Args:
+        target: The target to benchmark.
+        user: The logged-in benchmark user.
+        scenarios: Names from `HTTP_SCENARIOS` to run, in order.
+        requests: Measured requests per scenario.
+        concurrency: Concurrent in-flight requests.
+        warmup: Unmeasured requests issued before each scenario.
+
+    Returns:
+        List[ScenarioResult]: One result per scenario.
+    """
+    client = user.client
+    # A separate client for /login, so repeated logins never clobber the
+    # session cookie the other scenarios rely on.
+    login_client = target.http_client()
+
+    async def login() -> bool:
+        response = await login_client.post(
+            "/login", data={"username": user.email, "password": BENCH_PASSWORD}
+        )
+        return response.status_code == 303
+
+    async def index() -> bool:
+        return (await client.get("/")).status_code == 200
+
+    async def list_users() -> bool:
+        return (await client.get("/users/")).status_code == 200
+
+    async def feel_lucky() -> bool:
+        response = await client.post(
+            "/api/games/feel-lucky", json={"choice": random.randrange(6), "user_id": user.id}
+        )
+        return response.status_code == 200
+
+    operations = {
+        "http_login": login,
+        "http_index": index,
+        "http_users_list": list_users,
+        "http_feel_lucky": feel_lucky,
+    }
+    results = []
+    try:
+        for name in scenarios:
+            results.append(await run_closed_loop(
+                name, operations[name], requests, concurrency, warmup
+            ))
+    finally:
+        await login_client.aclose()
+    return results
+
+
+HTTP_SCENARIOS = ("http_login", "http_index", "http_users_list", "http_feel_lucky")
+"""Names of the HTTP scenarios, in their default execution order."""
+
+# --- WebSocket Scenario ---
+
+async def bench_ws_broadcast(
+    target: Target,
+    user: BenchUser,
+    clients: int,
+    messages: int,
+    protocol: str = "json"
+) -> ScenarioResult:
+    """Measures chat broadcast round-trips with `clients` concurrent sockets.
+
+    Every client sends `messages` chat frames one after another and waits
+    until the server's broadcast of each frame comes back to it, while also
+    draining the broadcasts of every other client. The latency of a message
+    is the time from send to receipt of its own echo.
+
+    Args:
+        protocol: The wire format to negotiate, `json` or `msgpack`.
+
+    Returns:
+        ScenarioResult: Per-message round-trip latencies, with the total
+        number of delivered frames in `frames_delivered` and their payload
+        size in `bytes_delivered`.
+    """
+    from app.ws_protocol import CODECS
+    codec = CODECS[protocol]
+    path = f"/ws/realtime/{user.id}"
+    subprotocols = [protocol] if protocol != "json" else None
+    # The endpoint only admits the user's own session
+    cookie = "; ".join(f"{name}={value}" for name, value in user.client.cookies.items())
+    sockets = [await target.ws_connect(path, subprotocols, cookie) for _ in range(clients)]
+    pending: List[Dict[str, asyncio.Future]] = [{} for _ in range(clients)]
+    delivered = 0
+    delivered_bytes = 0
+
+    async def reader(index: int):
+        nonlocal delivered, delivered_bytes
+        while True:
+            try:
+                frame = await sockets[index].recv()
+            except Exception:
+                return
+            delivered += 1
+            delivered_bytes += len(frame.encode() if isinstance(frame, str) else frame)
+            try:
+                token = codec.decode(frame)
+                token = (json.loads(token) if isinstance(token, str) else token).get("message")
+            except (ValueError, AttributeError):
+                continue
+            future = pending[index].pop(token, None)
+            if future is not None and not future.done():
+                future.set_result(time.perf_counter())
+
+    latencies: List[float] = []
+    errors = 0
+
+    async def sender(index: int):
+        nonlocal errors
+        loop = asyncio.get_running_loop()
+        for seq in range(messages):
+            token = f"bench:{index}:{seq}"
+            future = loop.create_future()
+            pending[index][token] = future
+            started = time.perf_counter()
+            await sockets[index].send(codec.encode(token) if codec.binary else token)
+            try:
+                latencies.append(await asyncio.wait_for(future, timeout=10.0) - started)
+            except asyncio.TimeoutError:
+                errors += 1
+
+    readers = [asyncio.create_task(reader(i)) for i in range(clients)]
+    started = time.perf_counter()
+    await asyncio.gather(*(sender(i) for i in range(clients)))
+    elapsed = time.perf_counter() - started
+
+    for sock in sockets:
+        await sock.close()
+    for task in readers:
+        task.cancel()
+    await asyncio.gather(*readers, return_exceptions=True)
+
+    return ScenarioResult(
+        f"ws_broadcast_{clients}c" + (f"_{protocol}" if protocol != "json" else ""),
+        latencies, errors, elapsed,
+        extra={
+            "clients": clients,
+            "protocol": protocol,
+            "frames_delivered": delivered,
+            "bytes_delivered": delivered_bytes,
+            "frames_per_s": round(delivered / elapsed, 1) if elapsed > 0 else 0.0,
+        }
+    )
@@ -0,0 +1,98 @@
+"""
+Encode cost and size of realtime WebSocket payloads, JSON versus MessagePack.
+
+Encodes representative chat messages and leaderboard snapshots with each
+codec of `app.ws_protocol`, and compares a broadcast that encodes once per
+connection (the former `send_json` fan-out) with one that encodes once per
+codec (the current `ConnectionManager.broadcast`).
+
+    python -m benchmarks.ws_codecs [--iterations N] [--connections C]
+"""
+import argparse
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from . import harness
+from app.ws_protocol import CODECS
+
+DEFAULT_OUTPUT = os.path.join("benchmarks", "results", "ws_codecs.json")
+
+
+def _payloads(leaderboard_size: int) -> Dict[str, Any]:
+    return {
+        "chat": {"type": "chat_message", "sender_id": 1234, "message": "good luck everyone, going all in!"},
+        "leaderboard": {
+            "type": "leaderboard",
+            "users": [
+                {"id": i, "nickname": f"player_{i}", "balance": 10_000.0 - i * 37.5, "user_type": "Normal"}
+                for i in range(leaderboard_size)
+            ],
+        },
+    }
+
+
+def _time_encodes(name: str, encode, data: Any, iterations: int, per_call: int) -> harness.ScenarioResult:
+    """Times `iterations` fan-outs, each calling `encode` `per_call` times."""
+    latencies: List[float] = []
+    frame = encode(data)
+    started = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        for _ in range(per_call):
+            encode(data)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    size = len(frame.encode() if isinstance(frame, str) else frame)
+    return harness.ScenarioResult(name, latencies, 0, elapsed, extra={"frame_bytes": size})
+
+
+def run(iterations: int, connections: int, leaderboard_size: int) -> List[harness.ScenarioResult]:
+    results = []
+    for payload_name, data in _payloads(leaderboard_size).items():
+        for codec in CODECS.values():
+            results.append(_time_encodes(
+                f"{payload_name}_{codec.name}", codec.encode, data, iterations, per_call=1
+            ))
+        # Broadcast fan-out: encoding per connection versus once per codec
+        json_codec = CODECS["json"]
+        results.append(_time_encodes(
+            f"{payload_name}_broadcast_per_conn", json_codec.encode, data, iterations, per_call=connections
+        ))
+        results.append(_time_encodes(
+            f"{payload_name}_broadcast_once", json_codec.encode, data, iterations, per_call=1
+        ))
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.ws_codecs")
+    parser.add_argument("--iterations", type=int, default=5_000)
+    parser.add_argument("--connections", type=int, default=100, help="connections per simulated broadcast")
+    parser.add_argument("--leaderboard-size", type=int, default=50)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    results = run(args.iterations, args.connections, args.leaderboard_size)
+    report = harness.build_report(results, params={
+        "iterations": args.iterations,
+        "connections": args.connections,
+        "leaderboard_size": args.leaderboard_size,
+    })
+    harness.write_report(report, args.output)
+    harness.print_table(report)
+
+    by_name = report["scenarios"]
+    for payload in ("chat", "leaderboard"):
+        as_json, as_msgpack = by_name[f"{payload}_json"], by_name[f"{payload}_msgpack"]
+        print(
+            f"{payload}: msgpack frames are {as_msgpack['frame_bytes']} B vs {as_json['frame_bytes']} B "
+            f"JSON, encoded in {as_msgpack['mean_ms'] * 1000:.1f} us vs {as_json['mean_ms'] * 1000:.1f} us"
+        )
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
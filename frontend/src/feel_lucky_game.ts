@@ -79,7 +79,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     // --- Real-Time Message Handler ---
     interface RealTimeData {
-        type: 'chat_message' | 'leaderboard_update' | 'status' | string;
+        type: 'chat_message' | 'leaderboard_update' | 'status' | 'ping' | string;
         sender_id?: number;
         message?: string;
 
@@ -102,6 +102,10 @@ document.addEventListener('DOMContentLoaded', () => {
                     displayChatMessage(`[Status] ${data.message}`, 'system');
                 }
                 break;
+            case 'ping':
+                // Server heartbeat: answer so the connection is not reaped as dead
+                ws.send(JSON.stringify({ type: 'pong' }));
+                break;
             default:
                 console.warn('Unknown real-time message type:', data.type);
         }
@@ -9,9 +9,11 @@
 # 3. Install all Python dependencies from requirements.txt
 # 4. Install Node.js dependencies for the frontend
 # 5. Compile the TypeScript code to JavaScript
-# 6. Run the FastAPI server with auto-reload
+# 6. Build fingerprinted, precompressed static assets
+# 7. Run the FastAPI server with auto-reload
+#    (or, with --prod, pre-forked workers tuned by the SERVER_* settings)
 #
-# Run this script from the project root directory: ./start.sh
+# Run this script from the project root directory: ./start.sh [--prod]
 #
 
 # Exit immediately if any command fails
@@ -40,6 +42,14 @@ echo "--- 5. Compiling TypeScript... ---"
   npx tsc
 )
 
-echo "--- 6. Starting FastAPI server at http://127.0.0.1:8000 ---"
+echo "--- 6. Building static assets... ---"
+python -m app.assets
+
+if [ "$1" = "--prod" ]; then
+  echo "--- 7. Starting production server (python -m app.serve) ---"
+  exec python -m app.serve
+fi
+
+echo "--- 7. Starting FastAPI server at http://127.0.0.1:8000 ---"
 # The server will now run using the activated venv
-uvicorn app.main:app --reload
\ No newline at end of file
+uvicorn app.main:app --reload --ws app.ws_compression:CompressedWebSocketProtocol --timeout-graceful-shutdown 30
\ No newline at end of file
@@ -0,0 +1,65 @@
+import pytest
+from httpx import AsyncClient
+from starlette.applications import Starlette
+from starlette.routing import Mount
+
+from app import assets
+
+
+def _build_static_app(tmp_path):
+    (tmp_path / "js").mkdir()
+    (tmp_path / "js" / "app.js").write_text("console.log('hello');\n" * 50)
+    manifest = assets.build(str(tmp_path))
+    app = Starlette(routes=[
+        Mount("/static", assets.PrecompressedStaticFiles(directory=str(tmp_path)))
+    ])
+    return app, manifest
+
+
+def test_build_is_reproducible(tmp_path):
+    _, first = _build_static_app(tmp_path)
+    built = tmp_path / first["js/app.js"]
+    gz_bytes = (tmp_path / (first["js/app.js"] + ".gz")).read_bytes()
+
+    second = assets.build(str(tmp_path))
+
+    assert first == second
+    assert built.name.startswith("app.") and built.suffix == ".js"
+    assert (tmp_path / (second["js/app.js"] + ".gz")).read_bytes() == gz_bytes
+
+
+@pytest.mark.asyncio
+async def test_serves_precompressed_variant(tmp_path):
+    app, manifest = _build_static_app(tmp_path)
+    url = f"/static/{manifest['js/app.js']}"
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get(url, headers={"Accept-Encoding": "gzip"})
+        refused = await ac.get(url, headers={"Accept-Encoding": "gzip;q=0"})
+        revalidated = await ac.get(
+            url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["etag"]}
+        )
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["content-type"].startswith("text/javascript")
+    assert response.headers["cache-control"] == assets.IMMUTABLE_CACHE_CONTROL
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == "console.log('hello');\n" * 50
+
+    assert "content-encoding" not in refused.headers
+    assert refused.text == "console.log('hello');\n" * 50
+
+    assert revalidated.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_unfingerprinted_files_keep_default_headers(tmp_path):
+    app, _ = _build_static_app(tmp_path)
+
+    async with AsyncClient(app=app, base_url="http://test") as ac:
+        response = await ac.get("/static/js/app.js", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert "cache-control" not in response.headers
+    assert "content-encoding" not in response.headers
@@ -0,0 +1,77 @@
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+from sqlalchemy import update
+
+from app import models
+
+fake = Faker()
+
+async def _create_user(async_client: AsyncClient) -> dict:
+    response = await async_client.post("/users/", json={
+        "email": fake.unique.email(),
+        "nickname": fake.unique.user_name(),
+        "password": "Password123",
+    })
+    assert response.status_code == 201
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_user_conditional_get(async_client: AsyncClient):
+    """
+    Test that GET /users/{id} answers 304 until the user is updated.
+    """
+    user = await _create_user(async_client)
+
+    first = await async_client.get(f"/users/{user['id']}")
+    etag = first.headers["etag"]
+    assert first.status_code == 200
+
+    cached = await async_client.get(f"/users/{user['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    await async_client.patch(f"/users/{user['id']}", json={"balance": 42.0})
+
+    fresh = await async_client.get(f"/users/{user['id']}", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()["balance"] == 42.0
+    assert fresh.headers["etag"] != etag
+
+@pytest.mark.asyncio
+async def test_users_list_conditional_get(async_client: AsyncClient):
+    """
+    Test that the list ETag depends on the page and changes on any user write.
+    """
+    await _create_user(async_client)
+    first = await async_client.get("/users/?limit=10")
+    etag = first.headers["etag"]
+
+    cached = await async_client.get("/users/?limit=10", headers={"If-None-Match": f'W/{etag}'})
+    assert cached.status_code == 304
+
+    other_page = await async_client.get("/users/?skip=1&limit=10", headers={"If-None-Match": etag})
+    assert other_page.status_code == 200
+
+    await _create_user(async_client)
+
+    fresh = await async_client.get("/users/?limit=10", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+
+@pytest.mark.asyncio
+async def test_etag_follows_writes_made_by_other_workers(async_client: AsyncClient, db_session):
+    """
+    Test that a write this process never saw (another worker's) still invalidates the ETag.
+    """
+    user = await _create_user(async_client)
+    etag = (await async_client.get(f"/users/{user['id']}")).headers["etag"]
+
+    # Bypasses app.crud, so no in-process counter is bumped
+    await db_session.execute(update(models.User).where(models.User.id == user["id"]).values(balance=7.0))
+    await db_session.commit()
+
+    fresh = await async_client.get(f"/users/{user['id']}", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()["balance"] == 7.0
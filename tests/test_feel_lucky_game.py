@@ -0,0 +1,97 @@
+import random
+
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+
+from app.routers import feel_lucky_game
+from app.routers.feel_lucky_game import BONUS_AMOUNT, EMOJIS_COUNT
+from app.settings import settings
+
+fake = Faker()
+
+async def _create_user(async_client: AsyncClient) -> dict:
+    response = await async_client.post("/users/", json={
+        "email": fake.unique.email(),
+        "nickname": fake.unique.user_name(),
+        "password": "Password123",
+    })
+    assert response.status_code == 201
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_batch_play_matches_single_round_distribution(async_client: AsyncClient, monkeypatch):
+    """
+    Test that batched rounds have the distribution of single plays:
+    uniform bonus indexes, a 1/EMOJIS_COUNT win rate and one bonus per win.
+    """
+    # A seeded generator of its own, so the global one other tests use is left alone
+    monkeypatch.setattr(feel_lucky_game.random, "choices", random.Random(1234).choices)
+    user = await _create_user(async_client)
+    batch_size = settings.GAME_BATCH_MAX_ROUNDS
+    choices = [i % EMOJIS_COUNT for i in range(batch_size)]
+
+    bonus_indexes, wins, balance = [], 0, 0.0
+    for _ in range(12):
+        response = await async_client.post("/api/games/feel-lucky/batch", json={
+            "choices": choices, "user_id": user["id"]
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert len(data["bonusIndexes"]) == batch_size
+        assert data["wins"] == sum(c == b for c, b in zip(choices, data["bonusIndexes"]))
+        assert data["winnings"] == data["wins"] * BONUS_AMOUNT
+        bonus_indexes += data["bonusIndexes"]
+        wins += data["wins"]
+        balance = data["balance"]
+
+    rounds = len(bonus_indexes)
+    assert balance == wins * BONUS_AMOUNT
+
+    # Chi-square goodness of fit against the uniform draw of a single play (p = 0.001)
+    expected = rounds / EMOJIS_COUNT
+    chi_square = sum((bonus_indexes.count(i) - expected) ** 2 / expected for i in range(EMOJIS_COUNT))
+    assert chi_square < 20.52
+
+    # Win rate within 4 standard deviations of 1 / EMOJIS_COUNT
+    p = 1 / EMOJIS_COUNT
+    assert abs(wins / rounds - p) < 4 * (p * (1 - p) / rounds) ** 0.5
+
+    fetched = await async_client.get(f"/users/{user['id']}")
+    assert fetched.json()["balance"] == balance
+
+@pytest.mark.asyncio
+async def test_batch_play_validates_choices(async_client: AsyncClient):
+    """
+    Test that out-of-range choices and oversized batches are rejected.
+    """
+    user = await _create_user(async_client)
+    url = "/api/games/feel-lucky/batch"
+
+    response = await async_client.post(url, json={"choices": [EMOJIS_COUNT], "user_id": user["id"]})
+    assert response.status_code == 422
+
+    too_many = [0] * (settings.GAME_BATCH_MAX_ROUNDS + 1)
+    response = await async_client.post(url, json={"choices": too_many, "user_id": user["id"]})
+    assert response.status_code == 422
+
+    response = await async_client.post(url, json={"choices": [], "user_id": user["id"]})
+    assert response.status_code == 422
+
+@pytest.mark.asyncio
+async def test_losing_batch_does_not_write(async_client: AsyncClient, monkeypatch):
+    """
+    Test that a batch without wins reports the balance without updating the user.
+    """
+    user = await _create_user(async_client)
+    monkeypatch.setattr(feel_lucky_game.random, "choices", lambda population, k: [1] * k)
+    etag = (await async_client.get(f"/users/{user['id']}")).headers["etag"]
+
+    response = await async_client.post("/api/games/feel-lucky/batch", json={
+        "choices": [0, 0, 0], "user_id": user["id"]
+    })
+    assert response.status_code == 200
+    assert (response.json()["wins"], response.json()["balance"]) == (0, user["balance"])
+
+    cached = await async_client.get(f"/users/{user['id']}", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+
+from app import crud, rate_limit
+
+fake = Faker()
+
+async def _create_user(async_client: AsyncClient) -> dict:
+    response = await async_client.post("/users/", json={
+        "email": fake.unique.email(),
+        "nickname": fake.unique.user_name(),
+        "password": "Password123",
+    })
+    assert response.status_code == 201
+    return response.json()
+
+@pytest.mark.asyncio
+async def test_retried_request_is_replayed(async_client: AsyncClient, monkeypatch):
+    """
+    Test that a retry with the same key returns the stored response without re-running the endpoint.
+    """
+    user = await _create_user(async_client)
+    calls = 0
+    original_update = crud.update_user
+
+    async def counting_update(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        return await original_update(*args, **kwargs)
+
+    monkeypatch.setattr(crud, "update_user", counting_update)
+    key = fake.uuid4()
+
+    first = await async_client.patch(
+        f"/users/{user['id']}", json={"balance": 10.0}, headers={"Idempotency-Key": key}
+    )
+    retry = await async_client.patch(
+        f"/users/{user['id']}", json={"balance": 10.0}, headers={"Idempotency-Key": key}
+    )
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotency-replayed"] == "true"
+    assert "idempotency-replayed" not in first.headers
+    assert calls == 1
+
+    reused = await async_client.patch(
+        f"/users/{user['id']}", json={"balance": 99.0}, headers={"Idempotency-Key": key}
+    )
+    assert reused.status_code == 422
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_wait_for_the_first(async_client: AsyncClient):
+    """
+    Test that duplicates racing the original get its response instead of playing again.
+    """
+    user = await _create_user(async_client)
+    headers = {"Idempotency-Key": fake.uuid4()}
+    payload = {"choices": [0] * 100, "user_id": user["id"]}
+
+    responses = await asyncio.gather(*(
+        async_client.post("/api/games/feel-lucky/batch", json=payload, headers=headers)
+        for _ in range(5)
+    ))
+
+    bodies = [r.json() for r in responses]
+    assert all(body == bodies[0] for body in bodies)
+    assert sum("idempotency-replayed" in r.headers for r in responses) == 4
+
+    fetched = await async_client.get(f"/users/{user['id']}")
+    assert fetched.json()["balance"] == bodies[0]["winnings"]
+
+@pytest.mark.asyncio
+async def test_rate_limited_responses_are_not_stored(async_client: AsyncClient):
+    """
+    Test that a 429 is not replayed: a retry with the same key runs again once the limit has passed.
+    """
+    form = {"username": "nobody@example.com", "password": "WrongPassw0rd"}
+    headers = {"Idempotency-Key": fake.uuid4()}
+    for _ in range(rate_limit.LOGIN.capacity):
+        await async_client.post("/login", data=form)
+    limited = await async_client.post("/login", data=form, headers=headers)
+    assert limited.status_code == 429
+
+    rate_limit.limiter.reset()
+    retry = await async_client.post("/login", data=form, headers=headers)
+    assert retry.status_code == 401
+    assert "idempotency-replayed" not in retry.headers
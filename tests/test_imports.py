@@ -0,0 +1,13 @@
+import subprocess
+import sys
+
+from benchmarks.import_time import LAZY_MODULES
+
+def test_app_import_leaves_optional_dependencies_unloaded():
+    """
+    Test that importing the application does not import seeding or optional-backend packages.
+    """
+    code = "import sys, app.main; print(' '.join(sorted(m for m in sys.modules if '.' not in m)))"
+    loaded = set(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.split())
+
+    assert loaded.isdisjoint(LAZY_MODULES)
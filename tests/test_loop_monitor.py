@@ -0,0 +1,43 @@
+import asyncio
+import logging
+import time
+
+import pytest
+
+from app import metrics
+from app.loop_monitor import LoopMonitor
+from app.settings import settings
+
+@pytest.mark.asyncio
+async def test_blocking_call_is_measured_and_reported_with_its_stack(monkeypatch, caplog):
+    """
+    Test that blocking the loop shows up as lag and logs the blocking frame once.
+    """
+    monkeypatch.setattr(settings, "LOOP_MONITOR_ENABLED", True)
+    monkeypatch.setattr(settings, "LOOP_MONITOR_INTERVAL_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "LOOP_MONITOR_SLOW_THRESHOLD_SECONDS", 0.05)
+    observed = metrics.EVENT_LOOP_LAG._default.count
+    stalls = metrics.EVENT_LOOP_STALLS._default.value
+
+    monitor = LoopMonitor()
+    monitor.start()
+    try:
+        await asyncio.sleep(0.05)
+        with caplog.at_level(logging.WARNING, logger="app.loop_monitor"):
+            time.sleep(0.3)  # Blocks the event loop
+            await asyncio.sleep(0.05)
+    finally:
+        await monitor.stop()
+
+    assert metrics.EVENT_LOOP_LAG._default.count > observed
+    assert metrics.EVENT_LOOP_STALLS._default.value == stalls + 1
+    [record] = [r for r in caplog.records if r.name == "app.loop_monitor"]
+    assert "test_blocking_call_is_measured_and_reported_with_its_stack" in record.getMessage()
+
+def test_disabled_monitor_starts_nothing():
+    """
+    Test that the monitor is inert by default.
+    """
+    monitor = LoopMonitor()
+    monitor.start()
+    assert monitor._task is None and monitor._thread is None
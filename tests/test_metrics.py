@@ -0,0 +1,36 @@
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+
+fake = Faker()
+
+@pytest.mark.asyncio
+async def test_metrics_records_route_latency_and_queries(async_client: AsyncClient):
+    """
+    Test that requests show up in /metrics under their route template,
+    together with the number of SQL statements they executed.
+    """
+    create_response = await async_client.post("/users/", json={
+        "email": fake.unique.email(),
+        "nickname": fake.unique.user_name(),
+        "password": "Password123"
+    })
+    assert create_response.status_code == 201
+    user_id = create_response.json()["id"]
+
+    read_response = await async_client.get(f"/users/{user_id}")
+    assert read_response.status_code == 200
+
+    response = await async_client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/users/{user_id}",status="200"}' in body
+    assert f"/users/{user_id}\"" not in body # Raw paths must not become labels
+
+    query_counts = [
+        line for line in body.splitlines()
+        if line.startswith('http_request_db_queries_sum{method="GET",route="/users/{user_id}"}')
+    ]
+    assert query_counts and float(query_counts[0].rsplit(" ", 1)[1]) >= 1
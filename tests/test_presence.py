@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from httpx import AsyncClient
+
+from app import sessions
+from app.main import app
+from app.models import UserType
+from app.presence import presence
+from benchmarks.asgi_ws import ASGIWebSocket
+
+def _client(user_id: int, **kwargs) -> ASGIWebSocket:
+    """A realtime client logged in as `user_id` (the endpoint checks the session cookie)."""
+    token = sessions.create_session_token(user_id, f"user{user_id}", UserType.NORMAL)
+    cookie = (b"cookie", f"{sessions.SESSION_COOKIE_NAME}={token}".encode())
+    return ASGIWebSocket(app, f"/ws/realtime/{user_id}", headers=[cookie], **kwargs)
+
+@pytest.mark.asyncio
+async def test_presence_tracks_users_not_connections(async_client: AsyncClient):
+    """
+    Test that a user with two connections counts once and stays online until both close.
+    """
+    first = await _client(21).connect()
+    second = await _client(21).connect()
+    other = await _client(22).connect()
+    try:
+        response = await async_client.get("/api/presence")
+        assert response.status_code == 200
+        assert response.json() == {"online": 2, "users": [21, 22], "scope": "worker"}
+
+        limited = await async_client.get("/api/presence", params={"limit": 1})
+        assert limited.json()["online"] == 2
+        assert len(limited.json()["users"]) == 1
+
+        await first.close()
+        assert (await async_client.get("/api/presence/21")).json() == {"user_id": 21, "online": True}
+
+        await second.close()
+        assert (await async_client.get("/api/presence/21")).json() == {"user_id": 21, "online": False}
+        assert (await async_client.get("/api/presence")).json()["users"] == [22]
+    finally:
+        await first.close()
+        await second.close()
+        await other.close()
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs fork()")
+def test_forked_workers_get_their_own_presence_id():
+    """
+    Test that a worker forked after import (as app.serve does) does not reuse the parent's worker id.
+    """
+    read_end, write_end = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.write(write_end, presence.worker_id.encode())
+        os._exit(0)
+    os.waitpid(pid, 0)
+    os.close(write_end)
+    child_id = os.read(read_end, 256).decode()
+    os.close(read_end)
+
+    assert child_id and child_id != presence.worker_id
+    assert f":{pid}:" in child_id
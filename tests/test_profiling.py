@@ -0,0 +1,71 @@
+import marshal
+
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+
+from app.profiling import profiler
+
+fake = Faker()
+
+async def _create_and_login(async_client: AsyncClient, user_type: str = "Normal") -> int:
+    """Creates a user of the given type and logs it in (the client keeps the cookie)."""
+    email = fake.unique.email()
+    create_response = await async_client.post("/users/", json={
+        "email": email,
+        "nickname": fake.unique.user_name(),
+        "password": "Password123"
+    })
+    user_id = create_response.json()["id"]
+    if user_type != "Normal":
+        await async_client.patch(f"/users/{user_id}", json={"user_type": user_type})
+    login_response = await async_client.post("/login", data={"username": email, "password": "Password123"})
+    assert login_response.status_code == 303
+    return user_id
+
+@pytest.mark.asyncio
+async def test_profiling_admin_only(async_client: AsyncClient):
+    """
+    Test that the profiling endpoints reject anonymous and non-admin users.
+    """
+    response = await async_client.get("/admin/profiling")
+    assert response.status_code == 401
+
+    await _create_and_login(async_client)
+    response = await async_client.get("/admin/profiling")
+    assert response.status_code == 403
+
+@pytest.mark.asyncio
+async def test_profiling_captures_and_downloads(async_client: AsyncClient):
+    """
+    Test enabling profiling at runtime, capturing a request and downloading it.
+    """
+    await _create_and_login(async_client, user_type="Admin")
+    profiler.clear()
+    try:
+        response = await async_client.put("/admin/profiling", json={
+            "enabled": True, "mode": "cprofile", "sample_rate": 1.0
+        })
+        assert response.status_code == 200
+        assert response.json()["config"]["enabled"] is True
+
+        assert (await async_client.get("/users/")).status_code == 200
+
+        profiles = (await async_client.get("/admin/profiling")).json()["profiles"]
+        assert profiles and profiles[0]["path"] == "/users/"
+        profile_id = profiles[0]["id"]
+
+        pstats_response = await async_client.get(
+            f"/admin/profiling/profiles/{profile_id}", params={"format": "pstats"}
+        )
+        assert pstats_response.status_code == 200
+        assert isinstance(marshal.loads(pstats_response.content), dict)
+
+        folded_response = await async_client.get(
+            f"/admin/profiling/profiles/{profile_id}", params={"format": "folded"}
+        )
+        assert folded_response.status_code == 200
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded_response.text.splitlines())
+    finally:
+        profiler.configure(enabled=False, sample_rate=0.0)
+        profiler.clear()
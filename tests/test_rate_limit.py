@@ -0,0 +1,41 @@
+import pytest
+from httpx import AsyncClient
+
+from app import rate_limit
+
+@pytest.mark.asyncio
+async def test_login_is_rate_limited_per_ip(async_client: AsyncClient):
+    """
+    Test that login attempts beyond the per-IP budget get 429 with Retry-After.
+    """
+    form = {"username": "nobody@example.com", "password": "WrongPassw0rd"}
+    for _ in range(rate_limit.LOGIN.capacity):
+        response = await async_client.post("/login", data=form)
+        assert response.status_code == 401
+
+    response = await async_client.post("/login", data=form)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+
+@pytest.mark.asyncio
+async def test_rejected_requests_consume_no_tokens():
+    """
+    Test that a request blocked by one bucket does not drain the others.
+    """
+    tight = rate_limit.RateLimit("tight", capacity=1, period=60)
+    loose = rate_limit.RateLimit("loose", capacity=2, period=60)
+
+    assert await rate_limit.limiter.hit([(tight, "ip:a"), (loose, "user:1")]) == 0
+    assert await rate_limit.limiter.hit([(tight, "ip:a"), (loose, "user:1")]) > 0
+    # The user bucket still has its second token for a request from another IP
+    assert await rate_limit.limiter.hit([(tight, "ip:b"), (loose, "user:1")]) == 0
+    assert await rate_limit.limiter.hit([(tight, "ip:c"), (loose, "user:1")]) > 0
+
+
+def test_parse_rejects_malformed_limits():
+    assert rate_limit.RateLimit.parse("x", "5/2").rate == 2.5
+    with pytest.raises(ValueError):
+        rate_limit.RateLimit.parse("x", "5")
+    with pytest.raises(ValueError):
+        rate_limit.RateLimit.parse("x", "0/10")
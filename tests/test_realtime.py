@@ -0,0 +1,319 @@
+import asyncio
+import json
+
+import msgpack
+import pytest
+
+from websockets.frames import Frame, Opcode
+
+from app import sessions, websockets
+from app.chat_history import history
+from app.main import app
+from app.models import UserType
+from app.presence import presence
+from app.rate_limit import RateLimit
+from app.settings import settings
+from app.websockets import manager
+from app.ws_compression import ThresholdPerMessageDeflate
+from benchmarks.asgi_ws import ASGIWebSocket, ASGIWebSocketClosed
+
+def _client(user_id: int, **kwargs) -> ASGIWebSocket:
+    """A realtime client logged in as `user_id` (the endpoint checks the session cookie)."""
+    token = sessions.create_session_token(user_id, f"user{user_id}", UserType.NORMAL)
+    cookie = (b"cookie", f"{sessions.SESSION_COOKIE_NAME}={token}".encode())
+    return ASGIWebSocket(app, f"/ws/realtime/{user_id}", headers=[cookie], **kwargs)
+
+@pytest.mark.asyncio
+async def test_json_and_msgpack_clients_share_broadcasts():
+    """
+    Test that a MessagePack client and a default JSON client receive the same broadcast.
+    """
+    json_ws = await _client(1).connect()
+    msgpack_ws = await _client(2, subprotocols=["msgpack"]).connect()
+    try:
+        assert json_ws.subprotocol is None
+        assert msgpack_ws.subprotocol == "msgpack"
+
+        await msgpack_ws.send(msgpack.packb("hello"))
+
+        from_json = json.loads(await json_ws.recv())
+        from_msgpack = msgpack.unpackb(await msgpack_ws.recv())
+        assert from_json == from_msgpack
+        assert from_json.pop("seq") > 0
+        assert from_json == {"type": "chat_message", "sender_id": 2, "message": "hello"}
+    finally:
+        await msgpack_ws.close()
+        await json_ws.close()
+
+@pytest.mark.asyncio
+async def test_protocol_query_parameter_selects_msgpack():
+    """
+    Test the query-parameter fallback for clients that cannot set subprotocols.
+    """
+    ws = await _client(3, query_string="protocol=msgpack").connect()
+    try:
+        await ws.send("plain text still works")
+        assert msgpack.unpackb(await ws.recv())["message"] == "plain text still works"
+    finally:
+        await ws.close()
+
+@pytest.mark.asyncio
+async def test_oversized_message_closes_connection_before_broadcast():
+    """
+    Test that a message above WS_MAX_MESSAGE_SIZE is rejected with 1009 and never broadcast.
+    """
+    listener = await _client(4).connect()
+    flooder = await _client(5).connect()
+    try:
+        await flooder.send("x" * (settings.WS_MAX_MESSAGE_SIZE + 1))
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await flooder.recv()
+        assert closed.value.code == 1009
+
+        # The listener only hears that the flooder left
+        assert json.loads(await listener.recv())["type"] == "status"
+    finally:
+        await flooder.close()
+        await listener.close()
+
+@pytest.mark.asyncio
+async def test_bad_payloads_are_rejected_without_leaking_the_connection():
+    """
+    Test that non-text chat is refused and undecodable frames close with 1007 and unregister the socket.
+    """
+    ws = await _client(30, subprotocols=["msgpack"]).connect()
+    try:
+        for payload in (b"raw bytes", {"nested": "map"}, [1, 2]):
+            await ws.send(msgpack.packb(payload, use_bin_type=True))
+            assert msgpack.unpackb(await ws.recv())["type"] == "error"
+
+        await ws.send(b"\xc1")
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await ws.recv()
+        assert closed.value.code == 1007
+    finally:
+        await ws.close()
+    assert all(w.path_params["user_id"] != "30" for w in manager.active_connections)
+    assert manager._user_connections.get(30, 0) == 0
+
+@pytest.mark.asyncio
+async def test_heartbeat_pings_and_reaps_silent_connections():
+    """
+    Test that a heartbeat pings live clients, swallows their pongs and closes silent connections.
+    """
+    alive = await _client(6).connect()
+    silent = await _client(7).connect()
+    try:
+        # Pretend the silent client has not been heard from for several intervals
+        for websocket, connection in manager.active_connections.items():
+            if websocket.path_params["user_id"] == "7":
+                connection.last_seen -= settings.WS_HEARTBEAT_INTERVAL_SECONDS * (settings.WS_HEARTBEAT_MAX_MISSED + 1)
+
+        await manager.heartbeat()
+
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await silent.recv()
+        assert closed.value.code == 1001
+        assert [ws.path_params["user_id"] for ws in manager.active_connections] == ["6"]
+
+        assert json.loads(await alive.recv()) == {"type": "ping"}
+        await alive.send(json.dumps({"type": "pong"}))
+        await alive.send("still here")
+        # The pong is not relayed as chat; the next frame is the chat message
+        assert json.loads(await alive.recv())["message"] == "still here"
+    finally:
+        await silent.close()
+        await alive.close()
+
+@pytest.mark.asyncio
+async def test_heartbeat_evicts_connections_whose_ping_blocks(monkeypatch):
+    """
+    Test that a socket whose send never completes is evicted instead of stalling the heartbeat round.
+    """
+    alive = await _client(8).connect()
+    stuck = await _client(9).connect()
+    send = websockets.ws_protocol.send
+
+    async def blocking_send(websocket, codec, frame):
+        if websocket.path_params["user_id"] == "9":
+            await asyncio.Event().wait()  # a peer that stopped reading, with a full send buffer
+        await send(websocket, codec, frame)
+
+    monkeypatch.setattr(websockets.ws_protocol, "send", blocking_send)
+    monkeypatch.setattr(settings, "WS_HEARTBEAT_SEND_TIMEOUT_SECONDS", 0.05)
+    try:
+        await asyncio.wait_for(manager.heartbeat(), timeout=2.0)
+
+        assert [ws.path_params["user_id"] for ws in manager.active_connections] == ["8"]
+        assert json.loads(await alive.recv()) == {"type": "ping"}
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await stuck.recv()
+        assert closed.value.code == 1001
+    finally:
+        await stuck.close()
+        await alive.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("cookie", [None, "forged", "other_user"])
+async def test_sockets_without_the_users_session_are_refused(monkeypatch, cookie):
+    """
+    Test that only the user's own session can open their socket, so nobody else
+    can use up their connection cap or mark them online.
+    """
+    monkeypatch.setattr(settings, "WS_MAX_CONNECTIONS_PER_USER", 1)
+    tokens = {"forged": "v1.e30.AAAA", "other_user": sessions.create_session_token(41, "other", UserType.NORMAL)}
+    headers = [(b"cookie", f"{sessions.SESSION_COOKIE_NAME}={tokens[cookie]}".encode())] if cookie else []
+    intruder = await ASGIWebSocket(app, "/ws/realtime/40", headers=headers).connect()
+    try:
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await intruder.recv()
+        assert closed.value.code == 1008
+        assert not manager.active_connections
+        assert not await presence.is_online(40)
+
+        owner = await _client(40).connect()
+        try:
+            assert len(manager.active_connections) == 1
+        finally:
+            await owner.close()
+    finally:
+        await intruder.close()
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("setting, value", [("WS_MAX_CONNECTIONS_PER_USER", 1), ("WS_MAX_CONNECTIONS", 1)])
+async def test_connections_over_a_cap_are_refused(monkeypatch, setting, value):
+    """
+    Test that a connection over the per-user or per-worker cap is closed with 1013.
+    """
+    monkeypatch.setattr(settings, setting, value)
+    first = await _client(8).connect()
+    refused = await _client(8).connect()
+    try:
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await refused.recv()
+        assert closed.value.code == 1013
+        assert len(manager.active_connections) == 1
+    finally:
+        await refused.close()
+        await first.close()
+
+    # The slot is released once the first connection is gone
+    again = await _client(8).connect()
+    try:
+        assert len(manager.active_connections) == 1
+    finally:
+        await again.close()
+
+@pytest.mark.asyncio
+async def test_accept_rate_is_bounded(monkeypatch):
+    """
+    Test that connections beyond the accept-rate burst are refused with 1013.
+    """
+    monkeypatch.setattr(websockets, "WS_ACCEPT", RateLimit("ws_accept_test", 2, 60))
+    accepted = [await _client(i).connect() for i in (9, 10)]
+    refused = await _client(11).connect()
+    try:
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await refused.recv()
+        assert closed.value.code == 1013
+    finally:
+        await refused.close()
+        for ws in accepted:
+            await ws.close()
+
+@pytest.mark.asyncio
+async def test_reconnect_replays_only_missed_messages():
+    """
+    Test that a client reconnecting with `last_seq` receives exactly the messages it missed.
+    """
+    sender = await _client(12).connect()
+    try:
+        await sender.send("first")
+        last_seen = json.loads(await sender.recv())["seq"]
+        for text in ("second", "third"):
+            await sender.send(text)
+            await sender.recv()
+
+        client = await _client(13, query_string=f"last_seq={last_seen}").connect()
+        try:
+            assert json.loads(await client.recv()) == {"type": "history", "count": 2, "complete": True}
+            replayed = [json.loads(await client.recv()) for _ in range(2)]
+            assert [m["message"] for m in replayed] == ["second", "third"]
+            assert [m["seq"] for m in replayed] == [last_seen + 1, last_seen + 2]
+        finally:
+            await client.close()
+    finally:
+        await sender.close()
+
+@pytest.mark.asyncio
+async def test_replay_reports_gaps_beyond_the_buffer(monkeypatch):
+    """
+    Test that a gap older than the ring buffer is flagged as incomplete.
+    """
+    monkeypatch.setattr(history, "_size", 2)
+    history.reset()
+    for text in ("a", "b", "c"):
+        await history.append("test-room", {"type": "chat_message", "message": text})
+
+    missed, complete = await history.since("test-room", 0)
+    assert [m["message"] for m in missed] == ["b", "c"]
+    assert not complete
+
+    assert await history.since("test-room", 3) == ([], True)
+    # A watermark from before a reset replays what is left and flags it
+    assert not (await history.since("test-room", 99))[1]
+    assert await history.since("test-room", -5) == (missed, False)
+
+@pytest.mark.asyncio
+async def test_negative_last_seq_is_ignored():
+    """
+    Test that a negative `last_seq` gets no replay instead of a history lookup.
+    """
+    client = await _client(14, query_string="last_seq=-5").connect()
+    try:
+        await client.send("hello")
+        assert json.loads(await client.recv())["type"] == "chat_message"
+    finally:
+        await client.close()
+
+@pytest.mark.asyncio
+async def test_drain_closes_sockets_for_restart_and_refuses_new_ones(monkeypatch):
+    """
+    Test that draining closes every socket with 1012 and a retry-after, and refuses newcomers.
+    """
+    monkeypatch.setattr(settings, "WS_DRAIN_SPREAD_SECONDS", 0.05)
+    monkeypatch.setattr(manager, "draining", False)
+    monkeypatch.setattr(manager, "_drain_task", None)
+    clients = [await _client(i).connect() for i in (14, 15, 16)]
+    try:
+        await manager.drain(timeout=2.0)
+        assert not manager.active_connections
+        for client in clients:
+            # No "User left" broadcasts during a drain: the close is the next frame
+            with pytest.raises(ASGIWebSocketClosed) as closed:
+                await client.recv()
+            assert closed.value.code == 1012
+
+        late = await _client(17).connect()
+        with pytest.raises(ASGIWebSocketClosed) as closed:
+            await late.recv()
+        assert closed.value.code == 1012
+        await late.close()
+    finally:
+        for client in clients:
+            await client.close()
+
+
+def test_small_messages_skip_compression():
+    """
+    Test that the threshold extension leaves short frames uncompressed and compresses long ones.
+    """
+    extension = ThresholdPerMessageDeflate(False, False, 12, 12, {"memLevel": 5}, min_size=256)
+
+    short = extension.encode(Frame(Opcode.TEXT, b"hi there"))
+    assert not short.rsv1 and short.data == b"hi there"
+
+    payload = b'{"type":"chat_message","message":"spam"}' * 50
+    long = extension.encode(Frame(Opcode.TEXT, payload))
+    assert long.rsv1 and len(long.data) < len(payload)
+    assert extension.decode(long).data == payload
@@ -0,0 +1,43 @@
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+from passlib.context import CryptContext
+
+from app import crud, security
+
+fake = Faker()
+
+def test_calibration_respects_the_floor_and_bcrypt_limits():
+    """
+    Test that calibration never goes below the minimum cost or above bcrypt's maximum.
+    """
+    assert security.calibrate_bcrypt_rounds(0.001) == security.MIN_BCRYPT_ROUNDS
+    assert security.calibrate_bcrypt_rounds(1e15) == security.MAX_BCRYPT_ROUNDS
+
+@pytest.mark.asyncio
+async def test_login_upgrades_outdated_hash(async_client: AsyncClient, db_session, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that a successful login re-hashes a password stored with a lower cost.
+    """
+    email = fake.unique.email()
+    response = await async_client.post("/users/", json={
+        "email": email,
+        "nickname": fake.unique.user_name(),
+        "password": "Password123"
+    })
+    user_id = response.json()["id"]
+    assert (await crud.get_user(db_session, user_id)).hashed_password.startswith("$2b$04$")
+
+    stronger = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5, bcrypt__min_rounds=5)
+    monkeypatch.setattr(security, "pwd_context", lambda: stronger)
+
+    login_response = await async_client.post("/login", data={"username": email, "password": "Password123"})
+    assert login_response.status_code == 303
+
+    user = await crud.get_user(db_session, user_id)
+    await db_session.refresh(user)
+    assert user.hashed_password.startswith("$2b$05$")
+    assert not security.needs_rehash(user.hashed_password)
+
+    again = await async_client.post("/login", data={"username": email, "password": "Password123"})
+    assert again.status_code == 303
@@ -0,0 +1,72 @@
+import socket
+
+import pytest
+
+from app.main import app
+from app import serve
+from app.serve import build_config, worker_count
+from app.settings import settings
+
+def test_config_is_built_from_settings(monkeypatch):
+    """
+    Test that the launcher passes the server tuning settings to uvicorn.
+    """
+    monkeypatch.setattr(settings, "SERVER_LOOP", "uvloop")
+    monkeypatch.setattr(settings, "SERVER_HTTP", "httptools")
+    monkeypatch.setattr(settings, "SERVER_BACKLOG", 4096)
+    monkeypatch.setattr(settings, "SERVER_LIMIT_CONCURRENCY", 0)
+
+    config = build_config(app, port=9000)
+
+    assert (config.loop, config.http, config.backlog, config.port) == ("uvloop", "httptools", 4096, 9000)
+    assert config.limit_concurrency is None
+    assert config.ws_max_size == settings.WS_MAX_MESSAGE_SIZE
+    assert config.ws == "app.ws_compression:CompressedWebSocketProtocol"
+
+def test_zero_workers_means_one_per_cpu(monkeypatch):
+    """
+    Test the SERVER_WORKERS=0 default.
+    """
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 0)
+    assert worker_count() >= 1
+    monkeypatch.setattr(settings, "SERVER_WORKERS", 3)
+    assert worker_count() == 3
+
+@pytest.mark.parametrize("dead, takes_over", [(101, True), (102, False)])
+def test_one_worker_runs_the_stats_reconciler(monkeypatch, dead, takes_over):
+    """
+    Test that only one worker reconciles stats, and that the replacement of that worker takes over.
+    """
+    forks = iter([101, 102, 0])  # two workers, then (seen from the child) the replacement
+    waits = iter([(dead, 256)])
+    monkeypatch.setattr(serve.os, "fork", lambda: next(forks))
+    monkeypatch.setattr(serve.os, "wait", lambda: next(waits))
+    monkeypatch.setattr(serve.signal, "signal", lambda signum, handler: None)
+    monkeypatch.setattr(serve.time, "sleep", lambda seconds: None)
+    monkeypatch.setattr(settings, "RUN_STATS_RECONCILER", False)
+    supervisor = serve.Supervisor(build_config(app), sock=None, workers=2)
+
+    def run_worker():
+        raise SystemExit(settings.RUN_STATS_RECONCILER)
+
+    monkeypatch.setattr(supervisor, "_run_worker", run_worker)
+    with pytest.raises(SystemExit) as replacement:
+        supervisor.run()
+    assert replacement.value.code is takes_over
+
+def test_no_respawn_when_stopped_during_the_respawn_delay(monkeypatch):
+    """
+    Test that a worker dying right before shutdown is not replaced if SIGTERM arrives during the delay.
+    """
+    forks = iter([101])
+    waits = iter([(101, 256)])
+    monkeypatch.setattr(serve.os, "fork", lambda: next(forks))
+    monkeypatch.setattr(serve.os, "wait", lambda: next(waits))
+    monkeypatch.setattr(serve.signal, "signal", lambda signum, handler: None)
+    monkeypatch.setattr(serve.os, "kill", lambda pid, signum: None)
+    supervisor = serve.Supervisor(build_config(app), sock=socket.socket(), workers=1)
+    monkeypatch.setattr(serve.time, "sleep", lambda seconds: supervisor._on_signal(serve.signal.SIGTERM, None))
+
+    supervisor.run()
+
+    assert supervisor.children == {}
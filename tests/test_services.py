@@ -0,0 +1,39 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas, services, versions
+
+@pytest.mark.asyncio
+async def test_leaderboard_fragment_cached_until_user_write(db_session: AsyncSession):
+    """
+    Test that the leaderboard fragment is reused until a user's balance changes.
+    """
+    user = await crud.create_user(db_session, schemas.UserCreate(
+        email="leader@example.com", nickname="leader", password="Password123"
+    ))
+
+    first = await services.render_leaderboard_fragment(db_session)
+    assert "leader" in first
+    assert "$0.00" in first
+    assert services.leaderboard_fragment.version == versions.users.collection
+
+    # A cache hit returns the very same rendered object
+    assert await services.render_leaderboard_fragment(db_session) is first
+
+    await crud.update_user(db_session, user.id, schemas.UserUpdate(balance=250.0))
+
+    second = await services.render_leaderboard_fragment(db_session)
+    assert second is not first
+    assert "$250.00" in second
+
+@pytest.mark.asyncio
+async def test_leaderboard_fragment_expires(db_session: AsyncSession, monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that the fragment is re-rendered after its TTL, picking up writes this worker never saw.
+    """
+    first = await services.render_leaderboard_fragment(db_session)
+    assert await services.render_leaderboard_fragment(db_session) is first
+
+    later = services.leaderboard_fragment.rendered_at + services.settings.LEADERBOARD_CACHE_TTL_SECONDS
+    monkeypatch.setattr(services.time, "monotonic", lambda: later)
+    assert await services.render_leaderboard_fragment(db_session) is not first
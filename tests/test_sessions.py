@@ -0,0 +1,92 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+
+from app import sessions
+from app.models import UserType
+
+fake = Faker()
+
+@pytest.mark.asyncio
+async def test_session_token_roundtrip():
+    """
+    Test that a freshly issued token verifies and carries the user's data.
+    """
+    token = sessions.create_session_token(42, "lucky", UserType.PREMIUM)
+    session = await sessions.verify_session_token(token)
+
+    assert session is not None
+    assert session.id == 42
+    assert session.nickname == "lucky"
+    assert session.user_type == UserType.PREMIUM
+    assert session.expires_at > time.time()
+
+@pytest.mark.asyncio
+async def test_session_token_rejects_tampering():
+    """
+    Test that forged, truncated or legacy raw user-id cookies are rejected.
+    """
+    token = sessions.create_session_token(1, "someone", UserType.NORMAL)
+    forged = sessions.create_session_token(2, "admin", UserType.ADMIN)
+    version, _, signature = token.split(".")
+    _, forged_payload, _ = forged.split(".")
+
+    assert await sessions.verify_session_token(f"{version}.{forged_payload}.{signature}") is None
+    assert await sessions.verify_session_token(token[:-2]) is None
+    assert await sessions.verify_session_token("1") is None
+    assert await sessions.verify_session_token(None) is None
+
+@pytest.mark.asyncio
+async def test_session_token_expiry_and_revocation(monkeypatch: pytest.MonkeyPatch):
+    """
+    Test that expired tokens, revoked tokens and revoked users are rejected.
+    """
+    token = sessions.create_session_token(7, "seven", UserType.NORMAL)
+    session = await sessions.verify_session_token(token)
+    assert session is not None
+
+    later = time.time() + sessions.settings.SESSION_MAX_AGE_SECONDS + 1
+    monkeypatch.setattr(sessions.time, "time", lambda: later)
+    assert await sessions.verify_session_token(token) is None
+    monkeypatch.undo()
+
+    await sessions.denylist.revoke(session)
+    assert await sessions.verify_session_token(token) is None
+
+    other = sessions.create_session_token(8, "eight", UserType.NORMAL)
+    await sessions.denylist.revoke_user(8)
+    assert await sessions.verify_session_token(other) is None
+    time.sleep(0.002) # Token timestamps have millisecond resolution
+    assert await sessions.verify_session_token(sessions.create_session_token(8, "eight", UserType.NORMAL)) is not None
+
+@pytest.mark.asyncio
+async def test_login_index_logout(async_client: AsyncClient):
+    """
+    Test the cookie flow: login sets a token, / renders with it, logout revokes it.
+    """
+    email = fake.unique.email()
+    nickname = fake.unique.user_name()
+    await async_client.post("/users/", json={
+        "email": email,
+        "nickname": nickname,
+        "password": "Password123"
+    })
+
+    login_response = await async_client.post("/login", data={"username": email, "password": "Password123"})
+    assert login_response.status_code == 303
+    assert login_response.headers["location"] == "/"
+    token = login_response.cookies[sessions.SESSION_COOKIE_NAME]
+
+    index_response = await async_client.get("/")
+    assert index_response.status_code == 200
+    assert f"Hello, {nickname}" in index_response.text
+
+    logout_response = await async_client.get("/logout")
+    assert logout_response.status_code == 303
+
+    async_client.cookies.set(sessions.SESSION_COOKIE_NAME, token)
+    revoked_response = await async_client.get("/")
+    assert revoked_response.status_code == 303
+    assert revoked_response.headers["location"] == "/login"
@@ -0,0 +1,47 @@
+import pytest
+
+from app import simulation
+from app.models import UserType
+
+
+def test_simulation_matches_game_rules():
+    """
+    Test that simulated payouts converge to the theoretical expectation of the live rules.
+    """
+    rules = simulation.current_rules(stake=10.0)
+    report = simulation.simulate(600_000, rules=rules, workers=1, seed=42).to_dict()
+
+    assert report["rounds"] == 600_000
+    assert [p["user_type"] for p in report["populations"]] == [
+        UserType.NORMAL.value, UserType.PREMIUM.value, UserType.PROFESSIONAL_GAMBLER.value
+    ]
+    for population in report["populations"]:
+        assert population["win_rate"] == pytest.approx(rules.win_probability, abs=0.01)
+        assert population["drawdown"]["max"] > 0
+    total_payout = sum(p["expected_payout"] * p["rounds"] for p in report["populations"])
+    assert report["house_pnl"] == pytest.approx(-total_payout)
+
+
+def test_simulation_is_reproducible_with_seed():
+    """
+    Test that a seeded run gives the same results in-process and with a process pool.
+    """
+    rules = simulation.GameRules(bonus_amount=50.0, emojis_count=4, stake=15.0)
+    populations = (simulation.Population(UserType.NORMAL, share=1.0, rounds_per_player=100),)
+
+    first = simulation.simulate(50_000, populations, rules=rules, workers=1, seed=7).to_dict()
+    second = simulation.simulate(50_000, populations, rules=rules, workers=2, seed=7).to_dict()
+
+    assert first["populations"] == second["populations"]
+
+
+def test_simulation_supports_more_than_256_emojis():
+    """
+    Test that bonus indexes beyond the uint8 range are drawn without overflowing.
+    """
+    rules = simulation.GameRules(bonus_amount=1000.0, emojis_count=1000, stake=1.0)
+    populations = (simulation.Population(UserType.NORMAL, share=1.0, rounds_per_player=1000),)
+
+    report = simulation.simulate(2_000_000, populations, rules=rules, workers=1, seed=3).to_dict()
+
+    assert report["populations"][0]["win_rate"] == pytest.approx(rules.win_probability, abs=0.0003)
@@ -0,0 +1,54 @@
+import pytest
+from httpx import AsyncClient
+from faker import Faker
+from sqlalchemy import update
+
+from app import crud, models, schemas, stats
+from app.models import UserType
+
+fake = Faker()
+
+async def _create_user(db_session) -> int:
+    user = await crud.create_user(db_session, schemas.UserCreate(
+        email=fake.unique.email(), nickname=fake.unique.user_name(), password="Password123"
+    ))
+    return user.id
+
+def _by_type(body: dict) -> dict:
+    return {row["user_type"]: (row["users"], row["total_balance"]) for row in body["by_type"]}
+
+@pytest.mark.asyncio
+async def test_stats_follow_user_writes(async_client: AsyncClient, db_session):
+    """
+    Test that creates, balance changes, type changes and deletes keep the totals exact.
+    """
+    first = await _create_user(db_session)
+    second = await _create_user(db_session)
+    await crud.add_to_balance(db_session, first, 150.0)
+    await crud.update_user(db_session, second, schemas.UserUpdate(balance=50.0))
+    await crud.update_user(db_session, first, schemas.UserUpdate(user_type=UserType.PREMIUM))
+
+    body = (await async_client.get("/api/stats")).json()
+    assert (body["users"], body["total_balance"], body["average_balance"]) == (2, 200.0, 100.0)
+    assert _by_type(body)["Premium"] == (1, 150.0)
+    assert _by_type(body)["Normal"] == (1, 50.0)
+    assert _by_type(body)["Admin"] == (0, 0.0)
+
+    await crud.delete_user(db_session, second)
+    body = (await async_client.get("/api/stats")).json()
+    assert _by_type(body)["Normal"] == (0, 0.0)
+    assert await stats.reconcile(db_session) == []
+
+@pytest.mark.asyncio
+async def test_reconcile_corrects_drift(async_client: AsyncClient, db_session):
+    """
+    Test that reconciliation detects totals changed behind crud's back and repairs them.
+    """
+    user = await _create_user(db_session)
+    # A write that bypasses app.crud
+    await db_session.execute(update(models.User).where(models.User.id == user).values(balance=75.0))
+    await db_session.commit()
+
+    assert await stats.reconcile(db_session) == [UserType.NORMAL]
+    assert _by_type((await async_client.get("/api/stats")).json())["Normal"] == (1, 75.0)
+    assert await stats.reconcile(db_session) == []
@@ -0,0 +1,39 @@
+import asyncio
+
+import pytest
+
+from app.tasks import TaskRegistry
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_services_and_waits_for_jobs():
+    """
+    Test that shutdown cancels service loops at once but lets one-off jobs finish.
+    """
+    registry = TaskRegistry()
+    finished = []
+
+    async def service():
+        while True:
+            await asyncio.sleep(3600)
+
+    async def job():
+        await asyncio.sleep(0.05)
+        finished.append("job")
+
+    loop_task = registry.spawn(service(), name="service", service=True)
+    job_task = registry.spawn(job(), name="job")
+    await registry.shutdown(timeout=1.0)
+
+    assert loop_task.cancelled()
+    assert job_task.done() and not job_task.cancelled()
+    assert finished == ["job"]
+
+@pytest.mark.asyncio
+async def test_shutdown_cancels_jobs_past_the_deadline():
+    """
+    Test that jobs still running at the deadline are cancelled.
+    """
+    registry = TaskRegistry()
+    slow = registry.spawn(asyncio.sleep(3600), name="slow")
+    await registry.shutdown(timeout=0.01)
+    assert slow.cancelled()